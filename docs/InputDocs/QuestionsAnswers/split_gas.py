@@ -1,39 +1,168 @@
+#!/usr/bin/env python3
+"""
+Split Q&A batch files (Q1to160.md, Q161to250.md, ...) into one file per Q&A.
+
+A Q&A starts at a line `id: Q<digits>` (any width: Q001, Q1000, ...) and runs
+up to the next such line or the end of the file; text before the first id is
+skipped. Inputs are read line by line, so only the current Q&A is in memory.
+
+- duplicate ids (same text again) are reported and written once
+- conflicting ids (different text) are reported with each file:line;
+  --keep last (default, as before) or first decides which one is written,
+  --strict exits 1 when there are any
+- a first pass hashes every Q&A to pick the version of each id; the second
+  streams the inputs again and hands those to a thread pool of writers
+  (tools/common/fileio.atomic_write), skipping files whose content is
+  already identical
+
+Usage:
+  python split_gas.py Q1to160.md Q161to250.md
+  python split_gas.py --out split_qas --keep first --strict Q*.md
+  python split_gas.py --metrics-json split.json Q*.md   # scan/write stage times (tools/common/instrument.py)
+"""
+import argparse
+import hashlib
 import os
-import sys
 import re
+import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import Dict, Iterator, List, NamedTuple, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), *[".."] * 3, "tools"))
+from common import instrument  # noqa: E402
+from common.fileio import atomic_write  # noqa: E402
+
+OUTPUT_DIR = "split_qas"
+ID_LINE = re.compile(r"^id: (Q\d+)\b")
+MAX_PENDING = 64  # queued writes before the reader waits for the pool
+
+
+class QA(NamedTuple):
+    qa_id: str
+    text: str
+    source: str
+    line: int
+
+
+def iter_qas(path: str) -> Iterator[QA]:
+    """Yield each Q&A of one input file, streaming its lines."""
+    qa_id, start, lines = None, 0, []
+    with open(path, "r", encoding="utf-8") as f:
+        for n, line in enumerate(f, 1):
+            m = ID_LINE.match(line)
+            if m:
+                if qa_id:
+                    yield QA(qa_id, block_text(lines), path, start)
+                qa_id, start, lines = m.group(1), n, []
+            if qa_id:
+                lines.append(line)
+    if qa_id:
+        yield QA(qa_id, block_text(lines), path, start)
+
+
+def block_text(lines: List[str]) -> str:
+    # the newline before the next id (or at EOF) is not part of the Q&A
+    text = "".join(lines)
+    return text[:-1] if text.endswith("\n") else text
+
+
+def write_if_changed(path: str, text: str) -> bool:
+    """Atomically replace path with text unless it already holds exactly that; True if written."""
+    data = text.encode("utf-8")
+    try:
+        if os.path.getsize(path) == len(data):
+            with open(path, "rb") as f:
+                if f.read() == data:
+                    return False
+    except OSError:
+        pass
+    atomic_write(path, data)
+    return True
+
+
+def scan(inputs: List[str], keep: str = "last"):
+    """First pass, hashes only: return (kept, qas, duplicates, conflicts).
+
+    kept holds the (source, line) of the version written for each id;
+    duplicates/conflicts map an id to every (source, line) it was found at.
+    """
+    seen: Dict[str, Tuple[Tuple[str, int], List[Tuple[str, int]], set]] = {}  # id -> (kept, locations, digests)
+    qas = 0
+    for path in inputs:
+        for qa in iter_qas(path):
+            qas += 1
+            loc = (qa.source, qa.line)
+            digest = hashlib.sha256(qa.text.encode("utf-8")).hexdigest()
+            prev = seen.get(qa.qa_id)
+            if prev is None:
+                seen[qa.qa_id] = (loc, [loc], {digest})
+            else:
+                prev[1].append(loc)
+                prev[2].add(digest)  # only tells duplicates from conflicts
+                if keep == "last":
+                    seen[qa.qa_id] = (loc, prev[1], prev[2])
+    kept = {v[0] for v in seen.values()}
+    duplicates = {k: v[1] for k, v in seen.items() if len(v[1]) > 1 and len(v[2]) == 1}
+    conflicts = {k: v[1] for k, v in seen.items() if len(v[2]) > 1}
+    return kept, qas, duplicates, conflicts
+
+
+def split(inputs: List[str], out_dir: str = OUTPUT_DIR, keep: str = "last", workers: int = 8, metrics=None):
+    """Split inputs into out_dir, one write per id; return (stats, duplicates, conflicts).
+
+    With an instrument.Metrics, the two passes are timed as its "scan" and "write" stages.
+    """
+    with metrics.stage("scan") if metrics else nullcontext():
+        kept, qas, duplicates, conflicts = scan(inputs, keep)
+    os.makedirs(out_dir, exist_ok=True)
+    stats = {"qas": qas, "ids": len(kept), "written": 0, "unchanged": 0}
+    pending: deque = deque()
+
+    def finish() -> None:
+        stats["written" if pending.popleft().result() else "unchanged"] += 1
 
-# Usage: python split_qas.py input1.md input2.md ...
-def extract_qas_from_file(file_path):
-    with open(file_path, 'r', encoding='utf-8') as f:
-        content = f.read()
+    with metrics.stage("write") if metrics else nullcontext(), ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for path in inputs:
+            for qa in iter_qas(path):
+                if (qa.source, qa.line) in kept:
+                    if len(pending) >= MAX_PENDING:
+                        finish()
+                    pending.append(pool.submit(write_if_changed, os.path.join(out_dir, f"{qa.qa_id}.md"), qa.text))
+        while pending:
+            finish()
+    return stats, duplicates, conflicts
 
-    # Match from 'id: Qxxx' to the next 'id: Qxxx' or EOF
-    pattern = re.compile(r'(id: Q\d{3}.*?)\n(?=id: Q\d{3}|\Z)', re.DOTALL)
-    matches = pattern.findall(content)
 
-    return matches
+def where(locations: List[Tuple[str, int]]) -> str:
+    return ", ".join(f"{src}:{line}" for src, line in locations)
 
-def save_qas_to_files(qas):
-    output_dir = 'split_qas'
-    os.makedirs(output_dir, exist_ok=True)
 
-    for qa in qas:
-        match = re.search(r'id: (Q\d{3})', qa)
-        if match:
-            qa_id = match.group(1)
-            file_path = os.path.join(output_dir, f'{qa_id}.md')
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(qa)
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Split Q&A batch files into one file per Q&A id")
+    ap.add_argument("inputs", nargs="+", help="Batch files, in order")
+    ap.add_argument("--out", default=OUTPUT_DIR, help="Output folder")
+    ap.add_argument("--keep", choices=("last", "first"), default="last",
+                    help="Which version of a conflicting id to write")
+    ap.add_argument("--workers", type=int, default=min(8, os.cpu_count() or 1), help="Writer threads")
+    ap.add_argument("--strict", action="store_true", help="Exit 1 if any id has conflicting versions")
+    instrument.add_arguments(ap)
+    a = ap.parse_args(argv)
+    metrics = instrument.from_args(a, "split_gas")
 
-if __name__ == '__main__':
-    if len(sys.argv) < 2:
-        print("Usage: python split_qas.py <file1.md> [<file2.md> ...]")
+    stats, duplicates, conflicts = split(a.inputs, a.out, a.keep, a.workers, metrics)
+    metrics.counters.update(stats, duplicates=len(duplicates), conflicts=len(conflicts))
+    instrument.finish(metrics)
+    for qa_id, locs in sorted(duplicates.items()):
+        print(f"ℹ️  duplicate {qa_id} (identical): {where(locs)}")
+    for qa_id, locs in sorted(conflicts.items()):
+        print(f"⚠️  conflicting {qa_id}, kept {a.keep}: {where(locs)}")
+    print(f"✅ Extracted {stats['qas']} QAs ({stats['ids']} ids) to '{a.out}/': {stats['written']} written, "
+          f"{stats['unchanged']} unchanged; {len(duplicates)} duplicate, {len(conflicts)} conflicting ids.")
+    if a.strict and conflicts:
         sys.exit(1)
 
-    all_qas = []
-    for file_path in sys.argv[1:]:
-        qas = extract_qas_from_file(file_path)
-        all_qas.extend(qas)
 
-    save_qas_to_files(all_qas)
-    print(f"✅ Extracted and saved {len(all_qas)} QAs to 'split_qas/' folder.")
+if __name__ == "__main__":
+    main()
@@ -1,43 +1,124 @@
 #!/usr/bin/env python3
+"""
+Drop trailing `yaml` / `copy` / `edit` lines (chat copy-paste leftovers) from Q&A files.
+
+Each file is read backwards from its end, a block at a time, only as far as the
+trailer lines go, and is then cut with truncate() in place. Line endings and
+everything before the trailers are left as they are, so cleaning a tree costs
+I/O proportional to the trailer bytes, not to the size of the files.
+
+Usage:
+  python clean_files.py                    # *.md in the current folder
+  python clean_files.py -r ../ --workers 8  # every *.md below ../
+  python clean_files.py -r . --dry-run      # only report what would be cut
+  python clean_files.py -r . --metrics-json clean.json   # per-stage times, slowest files
+"""
+import argparse
 import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), *[".."] * 4, "tools"))
+try:
+    from common import instrument
+except ImportError:  # copied out of the repo: no --profile / --metrics-json
+    instrument = None
 
 # these are the exact trailer‐lines to remove if found at the end (case‐insensitive)
 TRAILERS = {"yaml", "copy", "edit"}
+BLOCK = 256          # bytes read per backwards step
+MAX_TRAILER_LINE = 64  # a longer last line cannot be a trailer: stop looking
 
-def clean_file(path):
-    with open(path, "r", encoding="utf-8") as f:
-        lines = f.readlines()
+def trailer_start(f, size):
+    """Offset where the trailing trailer lines begin (size if there are none)."""
+    end, buf, buf_start = size, b"", size
+    while end > 0:
+        # the last line is buf[nl + 1:end]; its own newline (if any) sits at end - 1
+        nl = buf.rfind(b"\n", 0, max(end - 1 - buf_start, 0))
+        while nl < 0 and buf_start > 0 and end - buf_start <= MAX_TRAILER_LINE:
+            step = min(BLOCK, buf_start)
+            f.seek(buf_start - step)
+            buf, buf_start = f.read(step) + buf, buf_start - step
+            nl = buf.rfind(b"\n", 0, max(end - 1 - buf_start, 0))
+        start = buf_start + nl + 1 if nl >= 0 else (0 if buf_start == 0 else None)
+        if start is None or end - start > MAX_TRAILER_LINE:
+            break
+        line = buf[start - buf_start:end - buf_start].decode("utf-8", "replace")
+        if line.strip().lower() not in TRAILERS:
+            break
+        end = start
+    return end
 
-    # strip off any trailing trailer‐lines
-    new_lines = list(lines)
-    while new_lines and new_lines[-1].strip().lower() in TRAILERS:
-        new_lines.pop()
+def clean_file(path, dry_run=False):
+    """Cut trailer lines off path in place; return the number of bytes removed."""
+    with open(path, "r+b") as f:
+        size = f.seek(0, os.SEEK_END)
+        end = trailer_start(f, size)
+        if end < size and not dry_run:
+            f.truncate(end)
+    return size - end
 
-    # if we removed anything, overwrite the file
-    if new_lines != lines:
-        with open(path, "w", encoding="utf-8") as f:
-            f.writelines(new_lines)
-        return True
-    return False
+def timed_clean(path, dry_run=False):
+    """(bytes removed, seconds) for one file."""
+    t0 = time.perf_counter()
+    return clean_file(path, dry_run), time.perf_counter() - t0
 
-def main():
-    md_files = [f for f in os.listdir(".") if f.endswith(".md")]
+def find_md_files(roots, recursive=False) -> List[str]:
+    out = []
+    for root in roots:
+        if os.path.isfile(root):
+            out.append(root)
+        elif recursive:
+            for dirpath, _, files in os.walk(root):
+                out.extend(os.path.join(dirpath, fn) for fn in sorted(files) if fn.endswith(".md"))
+        else:
+            out.extend(os.path.join(root, fn) for fn in sorted(os.listdir(root))
+                       if fn.endswith(".md") and os.path.isfile(os.path.join(root, fn)))
+    return out
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Strip trailing yaml/copy/edit lines from Q&A files in place")
+    ap.add_argument("paths", nargs="*", default=["."], help="Files or folders (default: current folder)")
+    ap.add_argument("-r", "--recursive", action="store_true", help="Descend into subfolders")
+    ap.add_argument("--workers", type=int, default=min(8, os.cpu_count() or 1), help="Threads (1 = serial)")
+    ap.add_argument("--dry-run", action="store_true", help="Report, but leave files untouched")
+    if instrument:
+        instrument.add_arguments(ap)
+    a = ap.parse_args(argv)
+    metrics = instrument.from_args(a, "clean_files") if instrument else None
+
+    t0 = time.perf_counter()
+    with metrics.stage("find") if metrics else nullcontext():
+        md_files = find_md_files(a.paths, a.recursive)
     if not md_files:
-        print("No .md files found in current directory.")
+        print("No .md files found.")
+        if metrics:
+            instrument.finish(metrics)
         return
 
-    updated = []
-    for md in md_files:
-        if clean_file(md):
-            updated.append(md)
+    with metrics.stage("clean") if metrics else nullcontext(), \
+            ThreadPoolExecutor(max_workers=max(1, a.workers)) as pool:
+        timed = list(pool.map(lambda p: timed_clean(p, a.dry_run), md_files))
+    removed = [n for n, _ in timed]
+    if metrics:
+        for p, (_, secs) in zip(md_files, timed):
+            metrics.record_file(p, secs)
+    updated = [(p, n) for p, n in zip(md_files, removed) if n]
 
     if updated:
-        print("Cleaned trailer lines from:")
-        for fn in updated:
-            print(f"  – {fn}")
+        print("Would clean trailer lines from:" if a.dry_run else "Cleaned trailer lines from:")
+        for fn, n in updated:
+            print(f"  – {fn} ({n} bytes)")
     else:
         print("No files needed cleaning.")
+    print(f"{len(md_files)} files checked, {len(updated)} {'to clean' if a.dry_run else 'cleaned'}, "
+          f"{sum(removed)} bytes {'to remove' if a.dry_run else 'removed'} in {time.perf_counter() - t0:.2f}s")
+    if metrics:
+        metrics.counters.update(files=len(md_files), cleaned=len(updated), bytes_removed=sum(removed))
+        instrument.finish(metrics)
 
 if __name__ == "__main__":
     main()
-
@@ -1,28 +1,56 @@
 #!/usr/bin/env python3
-import re
+"""
+List the Q&A files in a lint report with their first finding, third line and line count.
+
+Reads the SQLite result store written by validate.py (the split-file rules:
+sections and action types, in qa_split_results.sqlite), whose results it
+used to read from validate.py's text report. validatefiles.py's store holds
+the authoring-guide rules instead (--store qa_results.sqlite); those expect
+fenced front matter, which the split files do not have. The store has
+per-file status, findings, line count and first lines, so no Q&A file is
+opened (see qastore.py). Filters combine with AND; results are
+sorted by path unless --sort says otherwise.
+
+Usage:
+  python process_report.py                                 # qa_split_results.sqlite, Qxxx.md files
+  python process_report.py --status FAIL --rule sections   # FAILs with a sections finding
+  python process_report.py --not-line '3:^\\s+\\S'           # third line is not the indented query
+  python process_report.py --sort lines --desc --limit 10 --format tsv
+  python process_report.py --report qa_validation_report.jsonl   # JSONL results (opens each file)
+"""
+import argparse
+import json
 import os
+import re
 import sys
+from contextlib import nullcontext
 
-REPORT_FILE = "qa_validation_report.txt"
-# matches lines exactly like: 📄 ./Q001.md
-PATTERN = re.compile(r"^📄\s+\.\/(Q\d{3}\.md)\s*$")
+from qalint import instrument, read_jsonl
+from qastore import SORT_KEYS, SPLIT_STORE_FILE, ResultStore
 
-def parse_report(report_path):
+REPORT_FILE = "qa_validation_report.jsonl"
+# only split Q&A files (Q001.md ... Q1000.md) unless --all
+QA_NAME = re.compile(r"^Q\d{3,}\.md$")
+EMOJI = {"FAIL": "❌", "WARN": "⚠️", "PASS": "✅"}
+LEVELS = ("FAIL", "WARN", "PASS")
+
+def summary_line(rec):
+    """The file's first most severe finding (and how many more), or OK."""
+    findings = rec.get("findings") or []
+    if not findings:
+        return "✅ OK"
+    first = next((f for f in findings if f["level"] == rec["status"]), findings[0])
+    more = f" (+{len(findings) - 1} more)" if len(findings) > 1 else ""
+    return f"{EMOJI.get(first['level'], '')} {first['level']}: {first['message']}{more}"
+
+def parse_report(report_path, all_files=False):
     """
-    Return a list of tuples (filename, next_report_line) for each
-    '📄 ./Qxxx.md' entry in the report.
+    Return a list of tuples (path, summary_line) for each Q&A file in a JSONL report.
     """
     entries = []
-    with open(report_path, "r", encoding="utf-8") as f:
-        lines = [line.rstrip("\n") for line in f]
-    for idx, line in enumerate(lines):
-        m = PATTERN.match(line)
-        if not m:
-            continue
-        filename = m.group(1)
-        # the very next line in the report (or empty string)
-        next_line = lines[idx + 1].strip() if idx + 1 < len(lines) else ""
-        entries.append((filename, next_line))
+    for rec in read_jsonl(report_path):
+        if all_files or QA_NAME.match(os.path.basename(rec["path"])):
+            entries.append((rec["path"], summary_line(rec)))
     return entries
 
 def inspect_file(path):
@@ -41,26 +69,93 @@ def inspect_file(path):
     total = len(file_lines)
     return third_line, total
 
-def main():
-    if not os.path.isfile(REPORT_FILE):
-        print(f"Error: report file not found: {REPORT_FILE}", file=sys.stderr)
-        sys.exit(1)
+def query_store(store, a):
+    """(path, summary_line, third_line, line_count, record) per matching file, from the store alone."""
+    name = a.name if a.name is not None else (None if a.all else QA_NAME.pattern)
+    rows = store.query(status=a.status, rule=a.rule, level=a.level, message=a.message, name=name,
+                       line_match=a.line, line_mismatch=a.not_line, min_lines=a.min_lines,
+                       max_lines=a.max_lines, sort=a.sort, desc=a.desc, limit=a.limit)
+    for path, status, _, lines in rows:
+        rec = {"path": path, "status": status, "findings": [f._asdict() for f in store.findings(path)],
+               "lines": lines, "head": store.head(path)}
+        third_line = rec["head"][2] if len(rec["head"]) >= 3 else ""
+        yield path, summary_line(rec), third_line, lines, rec
 
-    entries = parse_report(REPORT_FILE)
-    if not entries:
-        print("No matching entries found in report.")
-        return
+def line_filter(value):
+    n, sep, pattern = value.partition(":")
+    if not sep or not n.isdigit() or int(n) < 1:
+        raise argparse.ArgumentTypeError("expected N:REGEX, e.g. 3:^query")
+    try:
+        re.compile(pattern)
+    except re.error as e:
+        raise argparse.ArgumentTypeError(f"bad regex: {e}")
+    return int(n), pattern
+
+def print_entries(entries, fmt):
+    for path, report_line, third_line, line_count, rec in entries:
+        if fmt == "json":
+            print(json.dumps(rec or {"path": path, "summary": report_line, "third_line": third_line,
+                                     "lines": line_count}, ensure_ascii=False))
+        elif fmt == "tsv":
+            print("\t".join([path, report_line, third_line, str(line_count)]))
+        else:
+            print(path[2:] if path.startswith("./") else path)
+            print(report_line)
+            print(third_line)
+            print(f"Line count: {line_count}")
+            print()  # blank line between entries
 
-    for filename, next_report_line in entries:
-        third_line, line_count = inspect_file(filename)
-        if third_line is None:
-            continue
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--store", default=SPLIT_STORE_FILE,
+                    help="SQLite result store (default: validate.py's; qa_results.sqlite for validatefiles.py)")
+    ap.add_argument("--report", default=None, help="Read a JSONL report instead (opens every Q&A file)")
+    ap.add_argument("--all", action="store_true", help="Include every file, not just Qxxx.md")
+    ap.add_argument("--status", action="append", choices=LEVELS, default=[], help="Worst level (repeatable)")
+    ap.add_argument("--rule", default=None, help="Files with a finding of this rule id ...")
+    ap.add_argument("--level", action="append", choices=LEVELS[:2], default=[],
+                    help="... at this level (repeatable) ...")
+    ap.add_argument("--message", default=None, metavar="REGEX", help="... whose message matches REGEX")
+    ap.add_argument("--name", default=None, metavar="REGEX", help="File name filter (replaces the Qxxx.md default)")
+    ap.add_argument("--line", action="append", type=line_filter, default=[], metavar="N:REGEX",
+                    help="Line N of the file matches REGEX (repeatable)")
+    ap.add_argument("--not-line", action="append", type=line_filter, default=[], metavar="N:REGEX",
+                    help="Line N is missing or does not match REGEX (repeatable)")
+    ap.add_argument("--min-lines", type=int, default=None)
+    ap.add_argument("--max-lines", type=int, default=None)
+    ap.add_argument("--sort", choices=sorted(SORT_KEYS), default="path")
+    ap.add_argument("--desc", action="store_true", help="Reverse the sort order")
+    ap.add_argument("--limit", type=int, default=None)
+    ap.add_argument("--format", choices=("text", "tsv", "json"), default="text")
+    if instrument:
+        instrument.add_arguments(ap)
+    a = ap.parse_args(argv)
+    metrics = instrument.from_args(a, "process_report") if instrument else None
 
-        print(filename)
-        print(next_report_line)
-        print(third_line)
-        print(f"Line count: {line_count}")
-        print()  # blank line between entries
+    with metrics.stage("query") if metrics else nullcontext():
+        if a.report is not None:
+            if not os.path.isfile(a.report):
+                print(f"Error: report file not found: {a.report}", file=sys.stderr)
+                sys.exit(1)
+            entries = []
+            for path, report_line in parse_report(a.report, a.all):
+                third_line, line_count = inspect_file(path)
+                if third_line is not None:
+                    entries.append((path, report_line, third_line, line_count, None))
+        else:
+            if not os.path.isfile(a.store):
+                print(f"Error: result store not found: {a.store} (run validate.py first)", file=sys.stderr)
+                sys.exit(1)
+            with ResultStore(a.store) as store:
+                entries = list(query_store(store, a))
+
+    if not entries:
+        print("No matching entries found in report.")
+    with metrics.stage("print") if metrics else nullcontext():
+        print_entries(entries, a.format)
+    if metrics:
+        metrics.counters.update(entries=len(entries))
+        instrument.finish(metrics)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Corpus-wide Q&A index — cross-file consistency checks without comparing files pairwise.
+
+Each file contributes a small "facts" dict, extracted by its rule set while the
+file is linted (RuleSet.facts, see qalint.py):
+  {"id", "query", "primary_ids", "overlap_ids", "sources": [[id, title, locator], ...]}
+
+CorpusIndex keeps those facts per file plus inverted indexes over them:
+  qa_ids    Q&A id          -> files
+  queries   normalized query -> files
+  refs      canonical ID    -> {file: "primary" | "overlap"}
+  sources   source id       -> {"title\\tlocator": files}
+update() subtracts a file's old contributions and adds its new ones, so an
+incremental run touches only the keys of files that changed. conflicts() walks
+the inverted indexes once, O(total IDs):
+  duplicate_ids      one Q&A id used by several files                  (FAIL)
+  duplicate_queries  the same question asked by several files          (WARN)
+  uncited_ids        primary/overlap IDs no sources[].id in the corpus cites (WARN)
+  source_variants    one sources[].id with different title/locator values   (WARN)
+
+The index is saved as JSON (default .qa_index.json next to the reports) and
+reused by the next run, like the findings cache (qalint.LintCache), which also
+keeps each file's facts so unchanged files are not even re-read.
+"""
+from __future__ import annotations
+import json
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from qalint import Finding, RuleSet, write_atomic
+
+INDEX_VERSION = 1
+INDEX_KEYS = ("id", "query", "primary_ids", "overlap_ids", "sources")  # the facts the index keeps
+# rule ids of the corpus findings, with their SARIF descriptions
+CORPUS_RULES = [
+    ("corpus-duplicate-id", "Q&A id is unique across the corpus."),
+    ("corpus-duplicate-query", "No other Q&A asks the same query."),
+    ("corpus-uncited-id", "primary_ids/overlap_ids are cited by some sources[].id in the corpus."),
+    ("corpus-source-variant", "A sources[].id has the same title and locator in every file."),
+]
+
+
+def normalize_query(q: str) -> str:
+    return " ".join(str(q).split()).casefold()
+
+
+def _ids(v) -> List[str]:
+    return [str(x) for x in v if isinstance(x, (str, int, float))] if isinstance(v, list) else []
+
+
+def facts_from_data(data: Dict) -> Dict:
+    """The facts one Q&A contributes to the index, from its parsed front matter."""
+    sources = []
+    for s in data.get("sources") if isinstance(data.get("sources"), list) else []:
+        if isinstance(s, dict) and s.get("id"):
+            sources.append([str(s.get("id")).strip(), str(s.get("title") or "").strip(),
+                            str(s.get("locator") or "").strip()])
+    return {
+        "id": str(data["id"]) if data.get("id") is not None else None,
+        "query": normalize_query(data["query"]) if data.get("query") else None,
+        "primary_ids": _ids(data.get("primary_ids")),
+        "overlap_ids": _ids(data.get("overlap_ids")),
+        "sources": sources,
+    }
+
+
+def _split_variant(key: str) -> Tuple[str, str]:
+    title, _, locator = key.partition("\t")
+    return title, locator
+
+
+class CorpusIndex:
+    """Per-file facts plus inverted indexes, updated file by file and persisted."""
+
+    def __init__(self, path: Optional[str], ruleset: RuleSet):
+        self.path = path or None
+        self.key = f"{ruleset.name}@{ruleset.version}"
+        self.files: Dict[str, Dict] = {}
+        self.qa_ids: Dict[str, List[str]] = {}
+        self.queries: Dict[str, List[str]] = {}
+        self.refs: Dict[str, Dict[str, str]] = {}
+        self.sources: Dict[str, Dict[str, List[str]]] = {}
+        self.dirty = False
+        self.updated = 0
+        self._load()
+
+    def _load(self) -> None:
+        if not self.path:
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") != INDEX_VERSION or data.get("ruleset") != self.key:
+            return
+        self.files = data["files"]
+        self.qa_ids, self.queries = data["qa_ids"], data["queries"]
+        self.refs, self.sources = data["refs"], data["sources"]
+
+    def save(self) -> None:
+        if not self.path or not self.dirty:
+            return
+        data = {"version": INDEX_VERSION, "ruleset": self.key, "files": self.files, "qa_ids": self.qa_ids,
+                "queries": self.queries, "refs": self.refs, "sources": self.sources}
+        write_atomic(self.path, json.dumps(data, ensure_ascii=False))
+        self.dirty = False
+
+    # -- maintenance --
+    @staticmethod
+    def _drop(index: Dict[str, List[str]], key: str, path: str) -> None:
+        files = index.get(key)
+        if files is not None:
+            if path in files:
+                files.remove(path)
+            if not files:
+                del index[key]
+
+    def _apply(self, path: str, facts: Dict, add: bool) -> None:
+        if facts.get("id"):
+            if add:
+                self.qa_ids.setdefault(facts["id"], []).append(path)
+            else:
+                self._drop(self.qa_ids, facts["id"], path)
+        if facts.get("query"):
+            if add:
+                self.queries.setdefault(facts["query"], []).append(path)
+            else:
+                self._drop(self.queries, facts["query"], path)
+        for role in ("overlap_ids", "primary_ids"):  # primary wins when an ID is in both
+            for cid in facts.get(role, ()):
+                if add:
+                    self.refs.setdefault(cid, {})[path] = role[:-4]
+                elif cid in self.refs:
+                    self.refs[cid].pop(path, None)
+                    if not self.refs[cid]:
+                        del self.refs[cid]
+        for sid, title, locator in facts.get("sources", ()):
+            variant = f"{title}\t{locator}"
+            variants = self.sources.setdefault(sid, {}) if add else self.sources.get(sid)
+            if variants is None:
+                continue
+            if add:
+                if path not in variants.setdefault(variant, []):
+                    variants[variant].append(path)
+            else:
+                self._drop(variants, variant, path)
+                if not variants:
+                    del self.sources[sid]
+
+    def update(self, path: str, facts: Optional[Dict]) -> bool:
+        """Replace path's contribution; returns False (and does nothing) if unchanged."""
+        if facts is not None:
+            facts = {k: facts[k] for k in INDEX_KEYS if k in facts}
+        old = self.files.get(path)
+        if old == facts:
+            return False
+        if old is not None:
+            self._apply(path, old, add=False)
+        if facts is None:
+            self.files.pop(path, None)
+        else:
+            self._apply(path, facts, add=True)
+            self.files[path] = facts
+        self.dirty = True
+        self.updated += 1
+        return True
+
+    def remove(self, path: str) -> None:
+        self.update(path, None)
+
+    def prune(self, keep: Iterable[str]) -> None:
+        """Drop files no longer in the scan."""
+        for p in set(self.files) - set(keep):
+            self.remove(p)
+
+    # -- checks --
+    def conflicts(self) -> Dict[str, List[Dict]]:
+        """Every cross-file conflict, sorted for stable reports."""
+        out: Dict[str, List[Dict]] = {
+            "duplicate_ids": [{"id": k, "files": sorted(v)} for k, v in sorted(self.qa_ids.items()) if len(v) > 1],
+            "duplicate_queries": [{"query": k, "files": sorted(v)}
+                                  for k, v in sorted(self.queries.items()) if len(v) > 1],
+            "uncited_ids": [{"id": k, "files": sorted(v)} for k, v in sorted(self.refs.items())
+                            if k not in self.sources],
+            "source_variants": [],
+        }
+        for sid, variants in sorted(self.sources.items()):
+            if len(variants) > 1:
+                out["source_variants"].append({"id": sid, "variants": [
+                    {"title": t, "locator": l, "files": sorted(files)}
+                    for (t, l), files in sorted((_split_variant(k), v) for k, v in variants.items())]})
+        return out
+
+    def findings(self, conflicts: Optional[Dict[str, List[Dict]]] = None) -> Dict[str, List[Finding]]:
+        """Conflicts as per-file findings (rule ids corpus-*), in path order."""
+        c = conflicts if conflicts is not None else self.conflicts()
+        out: Dict[str, List[Finding]] = {}
+
+        def add(path: str, level: str, msg: str, rule: str) -> None:
+            out.setdefault(path, []).append(Finding(level, msg, rule))
+
+        for e in c["duplicate_ids"]:
+            for p in e["files"]:
+                add(p, "FAIL", f"Duplicate id {e['id']} (also in {others(e['files'], p)})", "corpus-duplicate-id")
+        for e in c["duplicate_queries"]:
+            for p in e["files"]:
+                add(p, "WARN", f"Same query as {others(e['files'], p)}", "corpus-duplicate-query")
+        for e in c["uncited_ids"]:
+            for p in e["files"]:
+                role = self.refs.get(e["id"], {}).get(p, "primary")
+                add(p, "WARN", f"{role}_ids entry {e['id']} is not cited by any sources[].id in the corpus",
+                    "corpus-uncited-id")
+        for e in c["source_variants"]:
+            n = len(e["variants"])
+            for v in e["variants"]:
+                for p in v["files"]:
+                    add(p, "WARN", f"source {e['id']} has {n} title/locator variants across the corpus "
+                                   f"(here: '{v['title']}' / '{v['locator']}')", "corpus-source-variant")
+        return dict(sorted(out.items()))
+
+
+def others(files: List[str], path: str, limit: int = 3) -> str:
+    rest = [f for f in files if f != path]
+    return ", ".join(rest[:limit]) + (f" and {len(rest) - limit} more" if len(rest) > limit else "")
+
+
+def summarize(conflicts: Dict[str, List[Dict]]) -> Dict[str, int]:
+    return {k: len(v) for k, v in conflicts.items()}
+
+
+def render_md(conflicts: Dict[str, List[Dict]], limit: int = 50) -> List[str]:
+    """MD section for the lint summary."""
+    counts = summarize(conflicts)
+    lines = ["\n## Corpus consistency",
+             "- " + ", ".join(f"{k.replace('_', ' ')}: {v}" for k, v in counts.items())]
+    titles = {"duplicate_ids": "Duplicate ids", "duplicate_queries": "Duplicate queries",
+              "uncited_ids": "IDs not cited by any source", "source_variants": "Source ids with differing title/locator"}
+    for kind, entries in conflicts.items():
+        if not entries:
+            continue
+        lines.append(f"\n### {titles[kind]}")
+        for e in entries[:limit]:
+            if kind == "source_variants":
+                lines.append(f"- `{e['id']}`")
+                for v in e["variants"]:
+                    lines.append(f"  - '{v['title']}' / '{v['locator']}' — {', '.join(v['files'])}")
+            else:
+                key = e.get("id", e.get("query"))
+                lines.append(f"- `{key}` — {', '.join(e['files'])}")
+        if len(entries) > limit:
+            lines.append(f"- … {len(entries) - limit} more (see the JSON report)")
+    return lines
@@ -0,0 +1,612 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+QA lint engine — tokenize each Q&A file once, run precompiled rule sets over it.
+
+A RuleSet bundles:
+  - how front matter is located ("fenced": ---\\n ... \\n---, or "leading":
+    YAML up to the first ---, as the split files are written),
+  - the body section markers it cares about (compiled into one alternation,
+    so a single scan finds the first occurrence of every marker),
+  - an ordered list of rules: functions doc -> iterable of (level, message)
+    or (level, message, line).
+    A "gate" rule that reports anything stops the remaining rules (used for
+    unusable front matter).
+
+QADoc is the tokenized file: parsed front matter, body, marker spans and,
+computed on first use, section text, bullets, bracketed tags and the
+**Sources** block. Rules only read from it, so every file is read and parsed
+once no matter how many rules run.
+
+lint_paths() spreads files across a process pool (results stay in input
+order). Rule sets are passed to workers by spec ("module:attr"), the same way
+custom rule sets are loaded from the command line.
+
+Reports: file_record()/jsonl_line() give each file's results as one JSON line
+({"path", "status", "findings": [{"level", "message", "rule", "line"}]}),
+read back with read_jsonl(); sarif_fragment() and SarifWriter stream a SARIF
+2.1.0 log for editors and CI. Both are written as each file completes.
+
+LintCache keeps each file's findings keyed on its content hash and the rule
+set's name@version, so lint_incremental() only lints new or edited files
+(a stat signature match skips even the hash). A --watch loop learns about
+edits from DirWatcher (inotify via libc on Linux, no extra packages) or,
+where that is unavailable, by polling snapshot(), a single stat scan.
+
+check_file() also returns per-file facts: line count and first lines (kept in
+the qastore.py result store) plus whatever the rule set's facts extractor adds
+(fed to the qaindex.py corpus index). LintCache keeps them with the findings.
+
+Used by validatefiles.py (authoring-guide rules), validate.py and
+validatechanges.py.
+
+Requires: pyyaml
+"""
+from __future__ import annotations
+import ctypes, ctypes.util, hashlib, importlib, json, os, re, select, struct, sys, time
+from concurrent.futures import ProcessPoolExecutor
+from functools import cached_property, lru_cache, partial
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import yaml
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), *[".."] * 4, "tools"))
+try:
+    from common import instrument
+    from common.fileio import atomic_write
+except ImportError:  # copied out of the repo: no --profile / --metrics-json, plain report writes
+    instrument = atomic_write = None
+
+FENCED_RE = re.compile(r"(?s)^---\n(.*?)\n---\s*")
+BULLET_RE = re.compile(r"^\s*[-*]\s+(.*)$", re.M)
+BRACKET_RE = re.compile(r"\[(.*?)\]")
+QA_EXTENSIONS = (".md", ".yml", ".yaml")
+CACHE_VERSION = 4
+HEAD_LINES = 5  # first lines of each file kept in its facts (process_report.py shows the third)
+SARIF_SCHEMA = "https://json.schemastore.org/sarif-2.1.0.json"
+SARIF_LEVELS = {"FAIL": "error", "WARN": "warning", "PASS": "note"}
+# libyaml when available; errors are re-parsed with the pure-Python loader so messages stay stable
+FAST_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+class Finding(NamedTuple):
+    level: str      # PASS / WARN / FAIL
+    message: str
+    rule: str = ""
+    line: int = 0   # 1-based line in the file, 0 = whole file
+
+
+class Rule(NamedTuple):
+    id: str
+    fn: Callable
+    gate: bool = False
+
+
+class RuleSet:
+    """Ordered, versioned collection of rules plus the tokenizer settings they need."""
+
+    def __init__(self, name: str, version: str, front: str = "fenced",
+                 markers: Optional[List[Tuple[str, str]]] = None, yaml_loader=FAST_LOADER):
+        if front not in ("fenced", "leading"):
+            raise ValueError(f"unknown front matter mode {front!r}")
+        self.name = name
+        self.version = version
+        self.front = front
+        self.yaml_loader = yaml_loader
+        self.markers = list(markers or [])
+        self.marker_re = re.compile("|".join(f"(?P<m{i}>{pat})" for i, (_, pat) in enumerate(self.markers))) \
+            if self.markers else None
+        self.rules: List[Rule] = []
+        self.facts_fn: Optional[Callable] = None
+
+    def rule(self, rule_id: str, gate: bool = False):
+        """Decorator registering fn(doc) -> iterable of (level, message[, line])."""
+        def deco(fn):
+            self.rules.append(Rule(rule_id, fn, gate))
+            return fn
+        return deco
+
+    def facts(self, fn):
+        """Decorator registering fn(doc) -> dict of per-file facts for corpus-wide checks (see qaindex.py).
+
+        fn runs whatever the front-matter status; it returns None to contribute nothing."""
+        self.facts_fn = fn
+        return fn
+
+    def extract(self, doc: "QADoc") -> Optional[Dict]:
+        """Facts of doc, also when the rules reject its front matter (the extractor decides)."""
+        if self.facts_fn is None:
+            return None
+        try:
+            return self.facts_fn(doc)
+        except Exception:  # odd front matter: the rules already report it
+            return None
+
+    def run(self, doc: "QADoc") -> List[Finding]:
+        out: List[Finding] = []
+        for r in self.rules:
+            try:
+                found = [Finding(f[0], f[1], r.id, f[2] if len(f) > 2 else 0) for f in r.fn(doc) or ()]
+            except Exception as e:  # a rule tripping over odd input is a finding, not a crash
+                found = [Finding("FAIL", f"rule {r.id} failed: {e}", r.id)]
+            out += found
+            if r.gate and found:
+                break
+        return out
+
+
+class QADoc:
+    """One Q&A file, tokenized for a rule set."""
+
+    def __init__(self, path: str, text: str, ruleset: RuleSet):
+        self.path = path
+        self.text = text
+        self.ruleset = ruleset
+        self.data: Dict = {}
+        self.front_status = "ok"        # ok / missing / error
+        self.front_error = ""
+        self.body = ""
+        self.body_offset = 0
+        self._split_front()
+        self.markers: Dict[str, Tuple[int, int]] = {}
+        if ruleset.marker_re is not None:
+            names = [n for n, _ in ruleset.markers]
+            for m in ruleset.marker_re.finditer(self.body):
+                name = names[int(m.lastgroup[1:])]
+                if name not in self.markers:
+                    self.markers[name] = m.span()
+
+    def _split_front(self) -> None:
+        if self.ruleset.front == "fenced":
+            m = FENCED_RE.match(self.text)
+            if not m:
+                self.front_status = "missing"
+                return
+            front, self.body_offset = m.group(1), m.end()
+        else:
+            idx = self.text.find("---")
+            if idx == -1:
+                self.front_status = "missing"
+                return
+            front, self.body_offset = self.text[:idx], idx + 3
+        self.body = self.text[self.body_offset:]
+        t0 = time.perf_counter()
+        try:
+            data = yaml.load(front, Loader=self.ruleset.yaml_loader)
+        except yaml.YAMLError as e:
+            self.front_status, self.front_error = "error", str(e)
+            if self.ruleset.yaml_loader is not yaml.SafeLoader:
+                try:
+                    yaml.load(front, Loader=yaml.SafeLoader)
+                except yaml.YAMLError as e2:
+                    self.front_error = str(e2)
+            return
+        finally:
+            if instrument:
+                instrument.note_parse("yaml", time.perf_counter() - t0)
+        if data is None:
+            data = {}
+        if not isinstance(data, dict):
+            self.front_status, self.front_error = "error", "front matter is not a mapping"
+            return
+        self.data = data
+
+    @property
+    def ok(self) -> bool:
+        return self.front_status == "ok"
+
+    def has(self, marker: str) -> bool:
+        return marker in self.markers
+
+    @cached_property
+    def _order(self) -> List[Tuple[int, int, str]]:
+        return sorted((s, e, n) for n, (s, e) in self.markers.items())
+
+    def section(self, marker: str) -> Optional[str]:
+        """Body text between marker and the next known marker (None if absent)."""
+        if marker not in self.markers:
+            return None
+        start = self.markers[marker][1]
+        later = [s for s, _, _ in self._order if s >= start]
+        return self.body[start:later[0] if later else len(self.body)]
+
+    def bullets(self, marker: str) -> List[str]:
+        return BULLET_RE.findall(self.section(marker) or "")
+
+    @cached_property
+    def brackets(self) -> List[Tuple[str, int]]:
+        """(text inside [...], body offset) for every bracketed span."""
+        return [(m.group(1), m.start()) for m in BRACKET_RE.finditer(self.body)]
+
+    def tail_lines(self, marker: str) -> List[str]:
+        """Non-empty lines after marker to the end of the body, stripped of ' -*'."""
+        if marker not in self.markers:
+            return []
+        tail = self.body[self.markers[marker][1]:]
+        return [l.strip(" -*") for l in tail.strip().splitlines() if l.strip()]
+
+    def line_of(self, body_pos: int) -> int:
+        """1-based line number in the file of a body offset."""
+        return self.text.count("\n", 0, self.body_offset + body_pos) + 1
+
+    @property
+    def line_count(self) -> int:
+        return self.text.count("\n") + (not self.text.endswith("\n") and bool(self.text))
+
+    def head(self, n: int) -> List[str]:
+        """The first n lines, without their newlines."""
+        lines = self.text.split("\n", n)
+        if len(lines) > n:
+            return lines[:n]
+        return lines[:-1] if lines[-1] == "" else lines
+
+
+def tokenize(path: str, ruleset: RuleSet) -> QADoc:
+    t0 = time.perf_counter()
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+        size = os.fstat(f.fileno()).st_size  # bytes, not decoded characters
+    if instrument:
+        instrument.note_read(size, time.perf_counter() - t0)
+    return QADoc(path, text, ruleset)
+
+
+def check_file(path: str, ruleset: RuleSet) -> Tuple[List[Finding], Optional[Dict]]:
+    """(findings, facts) for one file; unreadable files become a single FAIL and no facts.
+
+    facts always has "lines" (line count) and "head" (first HEAD_LINES lines),
+    plus whatever the rule set's facts extractor returns.
+    """
+    try:
+        doc = tokenize(path, ruleset)
+    except (OSError, UnicodeDecodeError) as e:
+        return [Finding("FAIL", str(e), "read")], None
+    facts = {"lines": doc.line_count, "head": doc.head(HEAD_LINES)}
+    facts.update(ruleset.extract(doc) or {})
+    return ruleset.run(doc), facts
+
+
+def lint_file(path: str, ruleset: RuleSet) -> List[Finding]:
+    """Findings for one file; unreadable files become a single FAIL."""
+    return check_file(path, ruleset)[0]
+
+
+@lru_cache(maxsize=None)
+def load_ruleset(spec: str) -> RuleSet:
+    """Resolve "module:attr" to a RuleSet (imported once per process)."""
+    mod, _, attr = spec.partition(":")
+    rs = getattr(importlib.import_module(mod), attr or "RULES")
+    if not isinstance(rs, RuleSet):
+        raise TypeError(f"{spec} is not a RuleSet")
+    return rs
+
+
+def _lint_one(path: str, ruleset: RuleSet):
+    if instrument is None:
+        findings, facts = check_file(path, ruleset)
+        return path, findings, None, facts
+    with instrument.capture(path) as cap:
+        findings, facts = check_file(path, ruleset)
+    return path, findings, cap.perf, facts
+
+
+def _lint_worker(path: str, spec: str):
+    return _lint_one(path, load_ruleset(spec))
+
+
+def lint_paths(paths: List[str], spec: str, workers: int = 1, ruleset: Optional[RuleSet] = None):
+    """Yield (path, findings, perf, facts) in input order, optionally across a process pool.
+
+    ruleset, if given, is used for in-process runs instead of importing spec
+    (a script running as __main__ passes its own rule set). facts is the
+    check_file() dict, None for unreadable files.
+    """
+    if workers <= 1 or len(paths) < 2:
+        rs = ruleset or load_ruleset(spec)
+        for p in paths:
+            yield _lint_one(p, rs)
+        return
+    chunk = max(1, len(paths) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        yield from ex.map(partial(_lint_worker, spec=spec), paths, chunksize=chunk)
+
+
+class LintCache:
+    """Findings per file, reused while content hash and rule set name@version are unchanged.
+
+    JSON: {"version", "ruleset", "files": {path: {"sig": [mtime_ns, size], "sha256",
+    "findings": [[level, message, rule, line], ...], "facts"}}}. path=None/"" keeps it
+    in memory only.
+    """
+
+    def __init__(self, path: Optional[str], ruleset: RuleSet):
+        self.path = path or None
+        self.key = f"{ruleset.name}@{ruleset.version}"
+        self.files: Dict[str, Dict] = self._load()
+        self.hits = self.misses = 0
+        self.dirty = False
+
+    def _load(self) -> Dict[str, Dict]:
+        if not self.path:
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if data.get("version") != CACHE_VERSION or data.get("ruleset") != self.key:
+            return {}
+        return data.get("files", {})
+
+    def lookup(self, path: str) -> Tuple[Optional[Tuple[List[Finding], Optional[Dict]]], Optional[List[int]],
+                                         Optional[str]]:
+        """((findings, facts) or None if not cached, stat signature, sha256 if it had to be computed)."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None, None, None
+        sig = [st.st_mtime_ns, st.st_size]
+        e = self.files.get(path)
+        if e is None:
+            return None, sig, None
+        if e["sig"] != sig:
+            try:
+                with open(path, "rb") as f:
+                    digest = hashlib.sha256(f.read()).hexdigest()
+            except OSError:
+                return None, None, None
+            if digest != e["sha256"]:
+                return None, sig, digest
+            e["sig"] = sig  # touched, not edited
+            self.dirty = True
+        return ([Finding(*x) for x in e["findings"]], e.get("facts")), sig, None
+
+    def store(self, path: str, sig: Optional[List[int]], digest: Optional[str], findings: List[Finding],
+              facts: Optional[Dict] = None) -> None:
+        if sig is None:
+            return
+        if digest is None:
+            try:
+                with open(path, "rb") as f:
+                    digest = hashlib.sha256(f.read()).hexdigest()
+            except OSError:
+                return
+        self.files[path] = {"sig": sig, "sha256": digest, "findings": [list(x) for x in findings], "facts": facts}
+        self.dirty = True
+
+    def forget(self, path: str) -> None:
+        if self.files.pop(path, None) is not None:
+            self.dirty = True
+
+    def prune(self, keep: Iterable[str]) -> None:
+        """Drop entries for files no longer in the scan."""
+        for p in set(self.files) - set(keep):
+            self.forget(p)
+
+    def save(self) -> None:
+        if not self.path or not self.dirty:
+            return
+        data = {"version": CACHE_VERSION, "ruleset": self.key, "files": self.files}
+        write_atomic(self.path, json.dumps(data, ensure_ascii=False))
+        self.dirty = False
+
+
+def lint_incremental(paths: List[str], spec: str, workers: int = 1, ruleset: Optional[RuleSet] = None,
+                     cache: Optional[LintCache] = None):
+    """lint_paths() that reuses cached findings and facts; perf is None for cache hits."""
+    if cache is None:
+        yield from lint_paths(paths, spec, workers, ruleset)
+        return
+    hits, todo = {}, []
+    for p in paths:
+        cached, sig, digest = cache.lookup(p)
+        if cached is None:
+            todo.append((p, sig, digest))
+        else:
+            hits[p] = cached
+    cache.hits += len(hits)
+    cache.misses += len(todo)
+    fresh = {}
+    for (p, sig, digest), (_, findings, perf, facts) in zip(todo, lint_paths([t[0] for t in todo], spec, workers,
+                                                                              ruleset)):
+        cache.store(p, sig, digest, findings, facts)
+        fresh[p] = (findings, perf, facts)
+    for p in paths:
+        if p in hits:
+            findings, facts = hits[p]
+            yield p, findings, None, facts
+        else:
+            yield (p, *fresh[p])
+
+
+def stat_sigs(paths: Iterable[str]) -> Dict[str, Tuple[int, int]]:
+    """{path: (mtime_ns, size)} for the given paths that exist."""
+    out = {}
+    for p in paths:
+        try:
+            st = os.stat(p)
+        except OSError:
+            continue
+        out[p] = (st.st_mtime_ns, st.st_size)
+    return out
+
+
+def snapshot(root: str, extensions: Iterable[str] = QA_EXTENSIONS,
+             exclude: Iterable[str] = ()) -> Dict[str, Tuple[int, int]]:
+    """{path: (mtime_ns, size)} in iter_qa_files() order, from one scandir pass."""
+    exts, skip = tuple(extensions), {os.path.abspath(x) for x in exclude}
+    out: Dict[str, Tuple[int, int]] = {}
+
+    def walk(top):
+        try:
+            entries = list(os.scandir(top))
+        except OSError:
+            return
+        subdirs = []
+        for e in entries:
+            try:
+                if e.is_dir():
+                    if not e.is_symlink():
+                        subdirs.append(e.path)
+                    continue
+                if e.name.lower().endswith(exts) and not (skip and os.path.abspath(e.path) in skip):
+                    st = e.stat()
+                    out[e.path] = (st.st_mtime_ns, st.st_size)
+            except OSError:  # vanished mid-scan
+                continue
+        for d in subdirs:
+            walk(d)
+
+    walk(root)
+    return out
+
+
+class DirWatcher:
+    """inotify watch on a directory tree: wait() returns the paths touched since the last call.
+
+    Only finished writes are reported (close-after-write, create, delete, rename), not
+    every partial write. wait() returns None when the event queue overflowed, meaning
+    "rescan everything". Raises OSError where inotify is unavailable.
+    """
+    IN_CLOSE_WRITE, IN_MOVED_FROM, IN_MOVED_TO = 0x8, 0x40, 0x80
+    IN_CREATE, IN_DELETE, IN_Q_OVERFLOW, IN_ISDIR = 0x100, 0x200, 0x4000, 0x40000000
+    MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+    _EVENT = struct.Struct("iIII")
+
+    def __init__(self, root: str):
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify needs Linux")
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.dirs: Dict[int, str] = {}
+        self._add_tree(root)
+
+    def _add_tree(self, top: str) -> None:
+        for dirpath, _, _ in os.walk(top):
+            wd = self._libc.inotify_add_watch(self.fd, os.fsencode(dirpath), self.MASK)
+            if wd < 0:
+                self.close()
+                raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {dirpath}")
+            self.dirs[wd] = dirpath
+
+    def wait(self, timeout: float) -> Optional[set]:
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return set()
+        touched: set = set()
+        while True:
+            try:
+                buf = os.read(self.fd, 1 << 16)
+            except BlockingIOError:
+                return touched
+            i = 0
+            while i < len(buf):
+                wd, mask, _, n = self._EVENT.unpack_from(buf, i)
+                name = os.fsdecode(buf[i + 16:i + 16 + n].rstrip(b"\0"))
+                i += 16 + n
+                if mask & self.IN_Q_OVERFLOW:
+                    return None
+                if wd not in self.dirs:
+                    continue
+                path = os.path.join(self.dirs[wd], name)
+                if mask & self.IN_ISDIR:
+                    if mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                        self._add_tree(path)
+                        for dirpath, _, files in os.walk(path):
+                            touched.update(os.path.join(dirpath, fn) for fn in files)
+                    else:  # a directory went away: let the caller rescan
+                        return None
+                elif not mask & self.IN_CREATE:  # a new file is reported once it is closed
+                    touched.add(path)
+
+    def close(self) -> None:
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+def write_atomic(path: str, text: str, fsync: bool = True) -> None:
+    """Replace path so readers (and a crash) never see a half-written report (common.fileio.atomic_write)."""
+    if atomic_write is None:  # copied out of the repo: a plain write
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            f.write(text)
+        return
+    atomic_write(path, text, fsync=fsync)
+
+
+def iter_qa_files(root: str, extensions: Iterable[str] = QA_EXTENSIONS, exclude: Iterable[str] = ()) -> List[str]:
+    """Files under root (os.walk order) with one of the given extensions, minus exclude."""
+    exts, skip = tuple(extensions), {os.path.abspath(x) for x in exclude}
+    out = []
+    for dirpath, _, files in os.walk(root):
+        for fn in files:
+            if fn.lower().endswith(exts):
+                path = os.path.join(dirpath, fn)
+                if not skip or os.path.abspath(path) not in skip:
+                    out.append(path)
+    return out
+
+
+def file_record(path: str, findings: List[Finding]) -> Dict:
+    """One file's results as the JSONL reports store them."""
+    return {"path": path, "status": max_level(findings), "findings": [f._asdict() for f in findings]}
+
+
+def jsonl_line(path: str, findings: List[Finding]) -> str:
+    return json.dumps(file_record(path, findings), ensure_ascii=False) + "\n"
+
+
+def read_jsonl(path: str):
+    """Yield the records of a JSONL report, one file at a time."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def sarif_fragment(path: str, findings: List[Finding]) -> str:
+    """SARIF result objects for one file, comma-joined ("" if none), for SarifWriter."""
+    uri = path.replace(os.sep, "/")
+    uri = uri[2:] if uri.startswith("./") else uri
+    out = []
+    for f in findings:
+        loc: Dict = {"artifactLocation": {"uri": uri}}
+        if f.line:
+            loc["region"] = {"startLine": f.line}
+        out.append(json.dumps({"ruleId": f.rule, "level": SARIF_LEVELS.get(f.level, "note"),
+                               "message": {"text": f.message}, "locations": [{"physicalLocation": loc}]},
+                              ensure_ascii=False))
+    return ",".join(out)
+
+
+class SarifWriter:
+    """Streams a SARIF 2.1.0 log: header first, one result at a time, closed on close()."""
+
+    def __init__(self, f, ruleset: RuleSet, tool: str, extra_rules: Iterable[Tuple[str, str]] = ()):
+        self.f = f
+        self.first = True
+        rules = [{"id": r.id, "shortDescription": {"text": (r.fn.__doc__ or r.id).strip()}} for r in ruleset.rules]
+        rules += [{"id": rid, "shortDescription": {"text": text}} for rid, text in extra_rules]
+        driver = {"name": tool, "version": ruleset.version, "rules": rules}
+        head = json.dumps({"$schema": SARIF_SCHEMA, "version": "2.1.0",
+                           "runs": [{"tool": {"driver": driver}, "results": []}]}, ensure_ascii=False)
+        f.write(head[:-len("]}]}")])  # ... "results": [
+
+    def add(self, fragment: str) -> None:
+        if fragment:
+            self.f.write(fragment if self.first else "," + fragment)
+            self.first = False
+
+    def close(self) -> None:
+        self.f.write("]}]}\n")
+
+
+def max_level(findings: Iterable[Tuple[str, str]]) -> str:
+    level = "PASS"
+    for lvl, *_ in findings:
+        if lvl == "FAIL":
+            return "FAIL"
+        if lvl == "WARN":
+            level = "WARN"
+    return level
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Q&A lint result store — SQLite, written by the linters, queried by process_report.py.
+
+Per file: worst status, findings (level, rule, message, line), line count and
+the first HEAD_LINES lines (qalint.check_file() facts), so reports and ad-hoc
+queries never have to open the Q&A files again.
+
+Tables:
+  files(path, name, status, findings, lines)   one row per linted file
+  findings(path, seq, level, rule, message, line)
+  head(path, n, text)                          line n (1-based) of the file
+Indexed on status, rule and (n, path); a REGEXP function is registered so
+header lines and messages can be matched with Python regexes:
+  SELECT path FROM files WHERE NOT EXISTS
+    (SELECT 1 FROM head h WHERE h.path = files.path AND h.n = 3 AND h.text REGEXP '^  \\S')
+
+Usage:
+  with ResultStore("qa_results.sqlite") as store:
+      store.put(path, findings, facts)     # per file, as results arrive
+      store.prune(paths)                   # drop files no longer scanned
+  ResultStore(path).query(status=["FAIL"], rule="sections", sort="lines")
+"""
+from __future__ import annotations
+import re
+import sqlite3
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from qalint import Finding, max_level
+
+STORE_FILE = "qa_results.sqlite"              # validatefiles.py (authoring-guide rules)
+SPLIT_STORE_FILE = "qa_split_results.sqlite"  # validate.py (split-file rules)
+SCHEMA_VERSION = 1
+SORT_KEYS = {"path": "path", "name": "name", "lines": "lines", "findings": "findings",
+             "status": "CASE status WHEN 'FAIL' THEN 0 WHEN 'WARN' THEN 1 ELSE 2 END"}
+
+
+@lru_cache(maxsize=64)
+def _compiled(pattern: str):
+    return re.compile(pattern)
+
+
+def _regexp(pattern: str, value: Optional[str]) -> bool:
+    return value is not None and _compiled(pattern).search(value) is not None
+
+
+class ResultStore:
+    """One SQLite file of lint results; path=None/"" keeps it in memory."""
+
+    def __init__(self, path: Optional[str] = STORE_FILE):
+        self.db = sqlite3.connect(path or ":memory:", timeout=60)
+        self.db.create_function("REGEXP", 2, _regexp, deterministic=True)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        row = self.db.execute("SELECT value FROM meta WHERE key='schema'").fetchone()
+        if row is None or int(row[0]) != SCHEMA_VERSION:
+            for t in ("files", "findings", "head"):
+                self.db.execute(f"DROP TABLE IF EXISTS {t}")
+            self.db.execute("INSERT OR REPLACE INTO meta VALUES ('schema', ?)", (str(SCHEMA_VERSION),))
+        self.db.executescript(
+            "CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, name TEXT, status TEXT,"
+            " findings INTEGER, lines INTEGER);"
+            "CREATE TABLE IF NOT EXISTS findings (path TEXT, seq INTEGER, level TEXT, rule TEXT,"
+            " message TEXT, line INTEGER, PRIMARY KEY (path, seq));"
+            "CREATE TABLE IF NOT EXISTS head (path TEXT, n INTEGER, text TEXT, PRIMARY KEY (path, n));"
+            "CREATE INDEX IF NOT EXISTS files_status ON files (status);"
+            "CREATE INDEX IF NOT EXISTS findings_rule ON findings (rule, level);"
+            "CREATE INDEX IF NOT EXISTS head_n ON head (n, path);")
+        self.db.commit()
+
+    def close(self) -> None:
+        self.db.commit()
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    # -- writing --
+    def put(self, path: str, findings: List[Finding], facts: Optional[Dict] = None) -> None:
+        """Replace path's results (commit() or close() to persist)."""
+        facts = facts or {}
+        self.remove(path)
+        name = path.replace("\\", "/").rsplit("/", 1)[-1]
+        self.db.execute("INSERT INTO files VALUES (?,?,?,?,?)",
+                        (path, name, max_level(findings), len(findings), facts.get("lines")))
+        self.db.executemany("INSERT INTO findings VALUES (?,?,?,?,?,?)",
+                            [(path, i, f.level, f.rule, f.message, f.line or None) for i, f in enumerate(findings)])
+        self.db.executemany("INSERT INTO head VALUES (?,?,?)",
+                            [(path, n, text) for n, text in enumerate(facts.get("head") or [], 1)])
+
+    def remove(self, path: str) -> None:
+        for t in ("files", "findings", "head"):
+            self.db.execute(f"DELETE FROM {t} WHERE path=?", (path,))
+
+    def prune(self, keep: Iterable[str]) -> None:
+        """Drop files no longer in the scan."""
+        keep = set(keep)
+        for (p,) in self.db.execute("SELECT path FROM files").fetchall():
+            if p not in keep:
+                self.remove(p)
+
+    def commit(self) -> None:
+        self.db.commit()
+
+    # -- reading --
+    def query(self, status: Sequence[str] = (), rule: Optional[str] = None, level: Sequence[str] = (),
+              message: Optional[str] = None, name: Optional[str] = None,
+              line_match: Sequence[Tuple[int, str]] = (), line_mismatch: Sequence[Tuple[int, str]] = (),
+              min_lines: Optional[int] = None, max_lines: Optional[int] = None,
+              sort: str = "path", desc: bool = False, limit: Optional[int] = None) -> List[Tuple]:
+        """(path, status, findings, lines) of the files matching every given filter.
+
+        rule/level/message select files with at least one finding matching all three;
+        line_match/line_mismatch are (n, regex) pairs on header line n (a missing
+        line never matches); name is a regex on the file name.
+        """
+        where, args = [], []
+        if status:
+            where.append(f"status IN ({','.join('?' * len(status))})")
+            args += list(status)
+        if rule is not None or level or message is not None:
+            sub, sub_args = ["f.path = files.path"], []
+            if rule is not None:
+                sub.append("f.rule = ?")
+                sub_args.append(rule)
+            if level:
+                sub.append(f"f.level IN ({','.join('?' * len(level))})")
+                sub_args += list(level)
+            if message is not None:
+                sub.append("f.message REGEXP ?")
+                sub_args.append(message)
+            where.append(f"EXISTS (SELECT 1 FROM findings f WHERE {' AND '.join(sub)})")
+            args += sub_args
+        if name is not None:
+            where.append("name REGEXP ?")
+            args.append(name)
+        for (n, pattern), negate in [(x, False) for x in line_match] + [(x, True) for x in line_mismatch]:
+            where.append(f"{'NOT ' if negate else ''}EXISTS (SELECT 1 FROM head h WHERE h.path = files.path"
+                         " AND h.n = ? AND h.text REGEXP ?)")
+            args += [n, pattern]
+        if min_lines is not None:
+            where.append("lines >= ?")
+            args.append(min_lines)
+        if max_lines is not None:
+            where.append("lines <= ?")
+            args.append(max_lines)
+        sql = "SELECT path, status, findings, lines FROM files"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY {SORT_KEYS[sort]} {'DESC' if desc else 'ASC'}, path"
+        if limit is not None:
+            sql += " LIMIT ?"
+            args.append(limit)
+        return self.db.execute(sql, args).fetchall()
+
+    def findings(self, path: str) -> List[Finding]:
+        rows = self.db.execute("SELECT level, message, rule, line FROM findings WHERE path=? ORDER BY seq", (path,))
+        return [Finding(level, message, rule, line or 0) for level, message, rule, line in rows]
+
+    def head(self, path: str) -> List[str]:
+        return [t for (t,) in self.db.execute("SELECT text FROM head WHERE path=? ORDER BY n", (path,))]
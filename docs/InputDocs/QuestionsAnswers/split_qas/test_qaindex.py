@@ -0,0 +1,38 @@
+"""Corpus-wide checks over split-layout files (run with: python -m pytest test_qaindex.py)."""
+from qaindex import CorpusIndex
+from qalint import lint_paths
+from validatefiles import GUIDE_RULES
+
+QA = """id: {id}
+query: >-
+  {query}
+packs:
+  - "ISO27001:2022"
+primary_ids: ["ISO27001:2022/A.5.19"]
+---
+**Short answer:** Yes.
+"""
+
+
+def _index(tmp_path, *qas):
+    paths = []
+    for name, qa_id, query in qas:
+        p = tmp_path / name
+        p.write_text(QA.format(id=qa_id, query=query), encoding="utf-8")
+        paths.append(str(p))
+    index = CorpusIndex(None, GUIDE_RULES)
+    for path, _, _, facts in lint_paths(paths, "validatefiles:GUIDE_RULES", 1, GUIDE_RULES):
+        index.update(path, facts)
+    return index, paths
+
+
+def test_duplicate_id_in_leading_front_matter_is_reported(tmp_path):
+    index, paths = _index(tmp_path, ("Q124.md", "Q124", "Vendor contracts?"), ("Q128.md", "Q124", "Audit logs?"))
+    conflicts = index.conflicts()
+    assert conflicts["duplicate_ids"] == [{"id": "Q124", "files": paths}]
+    assert any(f.rule == "corpus-duplicate-id" for f in index.findings(conflicts)[paths[1]])
+
+
+def test_duplicate_query_across_leading_files_is_reported(tmp_path):
+    index, _ = _index(tmp_path, ("Q001.md", "Q001", "Vendor contracts?"), ("Q002.md", "Q002", "vendor  contracts?"))
+    assert len(index.conflicts()["duplicate_queries"]) == 1
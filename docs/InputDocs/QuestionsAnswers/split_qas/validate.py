@@ -1,10 +1,15 @@
+import argparse
 import os
-import yaml
 import re
+from contextlib import nullcontext
+
+from qalint import RuleSet, instrument, jsonl_line, lint_paths
+from qastore import SPLIT_STORE_FILE, ResultStore
 
 # ========== CONFIG ==========
 FOLDER = "./"  # change this if needed
 OUTPUT_FILE = "qa_validation_report.txt"
+QA_FILE_RE = re.compile(r"Q\d{3,}\.md")
 VALID_ACTION_TYPES = {
     "open_register", "start_workflow", "open_dashboard", "draft_doc",
     "reminder", "report", "approval", "view_dashboard", "link_to_tool",
@@ -22,58 +27,106 @@ REQUIRED_SECTIONS = [
 ]
 # =============================
 
-def validate_qa_file(file_path):
-    results = {
-        "file": file_path,
-        "missing_sections": [],
-        "invalid_actions": [],
-        "error": None
-    }
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-
-        # Split YAML and markdown
-        parts = content.split('---', 1)
-        if len(parts) != 2:
-            results["error"] = "Missing YAML/body separator"
-            return results
-
-        yaml_part = yaml.safe_load(parts[0])
-        body = parts[1]
-
-        # Check required markdown sections
-        for section in REQUIRED_SECTIONS:
-            if section not in body:
-                results["missing_sections"].append(section)
-
-        # Check action types
-        actions = yaml_part.get("ui", {}).get("actions", [])
-        for action in actions:
-            if action.get("type") not in VALID_ACTION_TYPES:
-                results["invalid_actions"].append(action.get("type"))
-
-    except Exception as e:
-        results["error"] = str(e)
+# Split files: YAML up to the first ---, Markdown after it (qalint "leading" front matter)
+SPLIT_RULES = RuleSet("split-qa", "1", front="leading",
+                      markers=[(s, re.escape(s)) for s in REQUIRED_SECTIONS])
+
+
+@SPLIT_RULES.rule("separator", gate=True)
+def rule_separator(doc):
+    if doc.front_status == "missing":
+        yield ("FAIL", "Missing YAML/body separator")
+    elif doc.front_status == "error":
+        yield ("FAIL", doc.front_error)
+
+
+# Check required markdown sections
+@SPLIT_RULES.rule("missing-section")
+def rule_sections(doc):
+    for section in REQUIRED_SECTIONS:
+        if not doc.has(section):
+            yield ("WARN", section)
+
+
+# Check action types
+@SPLIT_RULES.rule("invalid-action")
+def rule_actions(doc):
+    for action in (doc.data.get("ui") or {}).get("actions", []) or []:
+        if action.get("type") not in VALID_ACTION_TYPES:
+            yield ("FAIL", action.get("type"))
+
 
+def to_result(path, findings):
+    """The per-file result dict of the text report."""
+    results = {"file": path, "missing_sections": [], "invalid_actions": [], "error": None}
+    for f in findings:
+        if f.rule == "missing-section":
+            results["missing_sections"].append(f.message)
+        elif f.rule == "invalid-action":
+            results["invalid_actions"].append(f.message)
+        else:
+            results["error"] = f.message
     return results
 
+
+def validate_qa_file(file_path):
+    return next(iter_results([file_path]))
+
+
+def iter_results(paths, workers=1, jsonl=None, store=None, metrics=None):
+    """Yield result dicts in input order; also stream JSONL records to the open file `jsonl`,
+    put each file into the ResultStore `store` and its timings into `metrics`."""
+    for path, findings, perf, facts in lint_paths(paths, "validate:SPLIT_RULES", workers, SPLIT_RULES):
+        if metrics is not None and perf:
+            metrics.merge_file(perf)
+        if jsonl is not None:
+            jsonl.write(jsonl_line(path, findings))
+        if store is not None:
+            store.put(path, findings, facts)
+        yield to_result(path, findings)
+
+
 # ========== MAIN ==========
-with open(OUTPUT_FILE, 'w', encoding='utf-8') as report:
-    all_files = sorted([f for f in os.listdir(FOLDER) if re.match(r"Q\\d{3}\\.md", f)])
-    for filename in all_files:
-        filepath = os.path.join(FOLDER, filename)
-        result = validate_qa_file(filepath)
-
-        report.write(f"\n📄 {result['file']}\n")
-        if result['error']:
-            report.write(f"  ❌ ERROR: {result['error']}\n")
-        if result['missing_sections']:
-            report.write(f"  ⚠️  Missing sections: {result['missing_sections']}\n")
-        if result['invalid_actions']:
-            report.write(f"  ❗ Invalid actions: {result['invalid_actions']}\n")
-        if not result['error'] and not result['missing_sections'] and not result['invalid_actions']:
-            report.write("  ✅ OK\n")
-
-print(f"\n✅ Validation complete. Report written to: {OUTPUT_FILE}")
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Check split Q&A files for sections and action types")
+    ap.add_argument("--folder", default=FOLDER)
+    ap.add_argument("--output", default=OUTPUT_FILE)
+    ap.add_argument("--workers", type=int, default=1, help="Process pool size (1 = serial)")
+    ap.add_argument("--jsonl", default=None, help="Also write structured results as JSONL")
+    ap.add_argument("--store", default=SPLIT_STORE_FILE,
+                    help="SQLite result store read by process_report.py; '' = none")
+    if instrument:
+        instrument.add_arguments(ap)
+    a = ap.parse_args(argv)
+    metrics = instrument.from_args(a, "validate") if instrument else None
+
+    # by length first so Q1000.md comes after Q999.md
+    all_files = sorted([f for f in os.listdir(a.folder) if QA_FILE_RE.match(f)], key=lambda f: (len(f), f))
+    paths = [os.path.join(a.folder, filename) for filename in all_files]
+    jsonl = open(a.jsonl, 'w', encoding='utf-8') if a.jsonl else None
+    store = ResultStore(a.store) if a.store else None
+    with metrics.stage("validate") if metrics else nullcontext(), open(a.output, 'w', encoding='utf-8') as report:
+        for result in iter_results(paths, a.workers, jsonl, store, metrics):
+            report.write(f"\n📄 {result['file']}\n")
+            if result['error']:
+                report.write(f"  ❌ ERROR: {result['error']}\n")
+            if result['missing_sections']:
+                report.write(f"  ⚠️  Missing sections: {result['missing_sections']}\n")
+            if result['invalid_actions']:
+                report.write(f"  ❗ Invalid actions: {result['invalid_actions']}\n")
+            if not result['error'] and not result['missing_sections'] and not result['invalid_actions']:
+                report.write("  ✅ OK\n")
+
+    if jsonl is not None:
+        jsonl.close()
+    if store is not None:
+        store.prune(paths)
+        store.close()
+    print(f"\n✅ Validation complete. Report written to: {a.output}")
+    if metrics:
+        metrics.counters.update(files=len(paths))
+        instrument.finish(metrics)
+
 
+if __name__ == "__main__":
+    main()
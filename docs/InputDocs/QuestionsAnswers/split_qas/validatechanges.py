@@ -1,6 +1,7 @@
-import os
-import yaml
-import re
+import argparse
+from contextlib import nullcontext
+
+from qalint import RuleSet, instrument, iter_qa_files, lint_paths
 
 # Path to your QAs root folder
 QA_DIR = "/path/to/qa/files"
@@ -8,57 +9,70 @@ QA_DIR = "/path/to/qa/files"
 # Optional: If some IDs can be empty, list them here
 ALLOW_EMPTY_PRIMARY = {"Q191", "Q194", "Q198"}  # example exceptions
 
-def validate_qa_file(path):
-    errors = []
-    with open(path, "r", encoding="utf-8") as f:
-        content = f.read()
-
-    # Parse YAML frontmatter
-    match = re.match(r"(?s)^---\n(.*?)\n---", content)
-    if not match:
-        errors.append("Missing or malformed YAML frontmatter")
-        return errors
-
-    try:
-        data = yaml.safe_load(match.group(1))
-    except yaml.YAMLError as e:
-        errors.append(f"YAML parse error: {e}")
-        return errors
-
-    qa_id = data.get("id", "UNKNOWN")
-    
-    # Required top-level keys
+CHANGE_RULES = RuleSet("changes", "1", front="fenced")
+
+
+# Parse YAML frontmatter
+@CHANGE_RULES.rule("frontmatter", gate=True)
+def rule_frontmatter(doc):
+    if doc.front_status == "missing":
+        yield ("FAIL", "Missing or malformed YAML frontmatter")
+    elif doc.front_status == "error":
+        yield ("FAIL", f"YAML parse error: {doc.front_error}")
+
+
+# Required top-level keys
+@CHANGE_RULES.rule("keys")
+def rule_keys(doc):
     required_keys = ["query", "packs", "primary_ids", "capability_tags", "sources", "ui", "output_mode"]
     for key in required_keys:
-        if key not in data:
-            errors.append(f"Missing key: {key}")
+        if key not in doc.data:
+            yield ("FAIL", f"Missing key: {key}")
+
 
-    # Primary IDs check
-    if not data.get("primary_ids") and qa_id not in ALLOW_EMPTY_PRIMARY:
-        errors.append("primary_ids is empty")
+# Primary IDs check
+@CHANGE_RULES.rule("primary-ids")
+def rule_primary_ids(doc):
+    qa_id = doc.data.get("id", "UNKNOWN")
+    if not doc.data.get("primary_ids") and qa_id not in ALLOW_EMPTY_PRIMARY:
+        yield ("FAIL", "primary_ids is empty")
 
-    # Sources check
-    sources = data.get("sources", [])
+
+# Sources check
+@CHANGE_RULES.rule("sources")
+def rule_sources(doc):
+    sources = doc.data.get("sources", [])
     if not sources:
-        errors.append("No sources defined")
-    else:
-        for s in sources:
-            for subkey in ["title", "id", "locator"]:
-                if subkey not in s or not s[subkey]:
-                    errors.append(f"Source missing {subkey}")
+        yield ("FAIL", "No sources defined")
+        return
+    for s in sources:
+        for subkey in ["title", "id", "locator"]:
+            if subkey not in s or not s[subkey]:
+                yield ("FAIL", f"Source missing {subkey}")
+
+
+def validate_qa_file(path):
+    return [f.message for _, findings, *_ in lint_paths([path], "validatechanges:CHANGE_RULES", 1, CHANGE_RULES)
+            for f in findings]
 
-    return errors
 
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Check Q&A front matter for required keys and sources")
+    ap.add_argument("--root", default=QA_DIR)
+    ap.add_argument("--workers", type=int, default=1, help="Process pool size (1 = serial)")
+    if instrument:
+        instrument.add_arguments(ap)
+    a = ap.parse_args(argv)
+    metrics = instrument.from_args(a, "validatechanges") if instrument else None
 
-def main():
     all_errors = {}
-    for root, _, files in os.walk(QA_DIR):
-        for file in files:
-            if file.lower().endswith((".md", ".yml", ".yaml")):
-                path = os.path.join(root, file)
-                errs = validate_qa_file(path)
-                if errs:
-                    all_errors[path] = errs
+    paths = iter_qa_files(a.root)
+    with metrics.stage("validate") if metrics else nullcontext():
+        for path, findings, perf, _ in lint_paths(paths, "validatechanges:CHANGE_RULES", a.workers, CHANGE_RULES):
+            if metrics and perf:
+                metrics.merge_file(perf)
+            if findings:
+                all_errors[path] = [f.message for f in findings]
 
     if not all_errors:
         print("✅ All QA files passed validation!")
@@ -68,8 +82,10 @@ def main():
             print(f"\n{path}")
             for e in errs:
                 print(f"  - {e}")
+    if metrics:
+        metrics.counters.update(files=len(paths), failed=len(all_errors))
+        instrument.finish(metrics)
 
 
 if __name__ == "__main__":
     main()
-
@@ -4,24 +4,68 @@
 QA Linter — robust, granular checks against Compliance Q&A Authoring Guide (v1)
 
 Outputs:
-  - qa_validation_report.md  (pretty summary)
-  - qa_validation_report.csv (spreadsheet-friendly)
+  - qa_validation_report.jsonl (one record per file, written as each file is linted)
+  - qa_validation_report.csv   (spreadsheet-friendly, also streamed)
+  - qa_validation_report.md    (pretty summary, built from the JSONL afterwards)
+  - qa_corpus_report.json      (corpus-wide conflicts; also appended to the MD and SARIF)
+  - qa_results.sqlite          (per-file status, findings, line count and first lines,
+                                queried by process_report.py --store; see qastore.py)
+  - SARIF 2.1.0 log with --sarif PATH (streamed; for editors and CI code scanning)
 Exit codes:
   0 = no FAIL issues
-  1 = at least one FAIL
+  1 = at least one FAIL (a duplicate Q&A id across files counts)
+
+The checks are rules on the qalint.py engine (GUIDE_RULES below): each file
+is read and tokenized once, then every rule runs against that structure.
+Cross-file checks (duplicate ids and queries, canonical IDs no source cites,
+sources[].id with differing title/locator) run on the persisted inverted
+indexes of qaindex.py, fed with each file's facts as it is linted. Files with
+"leading" front matter (the split_gas.py layout), which the fenced gate
+fails, still contribute their facts.
+
+Options:
+  --root DIR           folder to scan (default: QA_DIR)
+  --workers N          lint across a process pool (report order is unchanged)
+  --ruleset MOD:ATTR   lint with another rule set, e.g. validatechanges:CHANGE_RULES
+  --cache PATH         reuse findings for files whose content and rule set version
+                       are unchanged (default: CACHE_FILE; '' disables)
+  --index PATH         corpus index updated file by file between runs
+                       (default: INDEX_FILE; '' = rebuild in memory each run)
+  --store PATH         result store (default: qastore.STORE_FILE; '' = none)
+  --watch              after the first run, re-lint only new/edited files and rewrite
+                       both reports in place (temp file + rename) as files are saved;
+                       uses inotify on Linux, else polls every --interval seconds
+  --profile [DIR]      cProfile the scan into DIR       (when run inside the repo,
+  --metrics-json PATH  files/sec, bytes read, YAML       via tools/common/instrument.py)
+                       parse time, peak RSS, slowest files
 
 Requires: pyyaml
   pip install pyyaml
 """
 
-import os, re, sys, csv, yaml
+import argparse, io, json, os, re, sys, csv, time
+from contextlib import nullcontext
 from datetime import datetime
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, NamedTuple, Optional, Tuple
+
+from qalint import (QA_EXTENSIONS, DirWatcher, LintCache, QADoc, RuleSet, SarifWriter, instrument, iter_qa_files,
+                    jsonl_line, lint_file, lint_incremental, load_ruleset, max_level, sarif_fragment, snapshot,
+                    stat_sigs, write_atomic)
+from qaindex import CORPUS_RULES, CorpusIndex, facts_from_data, render_md as render_corpus_md, summarize
+from qastore import STORE_FILE, ResultStore
 
 # --------- CONFIG ---------
 QA_DIR = "./"               # <- change this to your repo path
 REPORT_MD = "qa_validation_report.md"
 REPORT_CSV = "qa_validation_report.csv"
+REPORT_JSONL = "qa_validation_report.jsonl"  # one JSON record per file; the MD is built from it
+REPORT_CORPUS = "qa_corpus_report.json"      # cross-file conflicts (qaindex.py)
+RULESET_VERSION = "2"       # bump when a rule or message changes
+DEFAULT_RULESET = "validatefiles:GUIDE_RULES"
+CACHE_FILE = ".qa_lint_cache.json"  # findings per file, keyed on content hash + rule set version
+INDEX_FILE = ".qa_index.json"       # corpus-wide inverted indexes, updated incrementally
+CACHE_SAVE_IDLE = 1.0               # --watch: seconds without edits before the cache is saved
+WATCH_LOG_FILES = 10                # --watch: files listed per update
 
 # Allowed packs (Guide §6.1)
 ALLOWED_PACKS = {
@@ -83,45 +127,13 @@ MAX_CARDS_HINT = 3
 MAX_CARD_CHARS = 40
 
 # --------- Helpers ---------
-FM_RE = re.compile(r"(?s)^---\n(.*?)\n---\s*")
-BULLET_LINE = re.compile(r"^\s*[-*]\s+", re.M)
-
-def load_frontmatter_and_body(path: str) -> Tuple[Dict[str, Any], str]:
-    with open(path, "r", encoding="utf-8") as f:
-        txt = f.read()
-    m = FM_RE.match(txt)
-    if not m:
-        raise ValueError("Missing or malformed YAML frontmatter")
-    data = yaml.safe_load(m.group(1)) or {}
-    body = txt[m.end():]
-    return data, body
-
 def norm(s: str) -> str:
     return (s or "").strip()
 
-def check_sections_order(body: str) -> List[str]:
-    errs = []
-    last_end = 0
-    for pat in REQUIRED_SECTIONS_ORDER:
-        m = re.search(pat, body)
-        if not m:
-            errs.append(f"Body missing section marker matching /{pat}/")
-        else:
-            if m.start() < last_end:
-                errs.append(f"Section out of order around /{pat}/")
-            last_end = m.end()
-    return errs
-
-def extract_sources_from_body(body: str) -> List[str]:
-    # After **Sources**, collect bullet lines or lines until blank section end
-    idx = body.find("**Sources**")
-    if idx == -1:
-        return []
-    tail = body[idx+len("**Sources**"):]
-    lines = [l.strip(" -*") for l in tail.strip().splitlines() if l.strip()]
-    # Keep only first continuous block until next heading-like line
+def extract_sources(doc: QADoc) -> List[str]:
+    # After **Sources**, collect non-empty lines up to the next heading-like line
     collected = []
-    for l in lines:
+    for l in doc.tail_lines(SOURCES):
         if l.startswith("**"):  # next section (unlikely) or malformed
             break
         collected.append(l)
@@ -161,189 +173,479 @@ def check_ui_action(a_type: str, target: str) -> Tuple[str, str]:
         return ("WARN", f"upload_evidence target '{target}' is not snake_case")
     # open_template/create_policy: skip strict checks; they are catalog-driven (Appx I)
     return ("PASS", "")
-# --------- Validation per file ---------
-def validate_file(path: str) -> List[Tuple[str, str]]:
-    """
-    Returns list of tuples: (level, message)
-      level in {"PASS","WARN","FAIL"}
-    """
-    msgs: List[Tuple[str,str]] = []
-    try:
-        data, body = load_frontmatter_and_body(path)
-    except Exception as e:
-        return [("FAIL", str(e))]
 
-    # Required YAML keys
+# --------- Rules (run in this order) ---------
+SOURCES = r"\*\*Sources\*\*"
+GUIDE_RULES = RuleSet("authoring-guide", RULESET_VERSION, front="fenced",
+                      markers=[(pat, pat) for pat in REQUIRED_SECTIONS_ORDER])
+
+@GUIDE_RULES.rule("frontmatter", gate=True)
+def rule_frontmatter(doc):
+    """Front matter present and valid YAML."""
+    if doc.front_status == "missing":
+        yield ("FAIL", "Missing or malformed YAML frontmatter")
+    elif doc.front_status == "error":
+        yield ("FAIL", doc.front_error)
+
+@GUIDE_RULES.rule("yaml-keys")
+def rule_yaml_keys(doc):
+    """Required YAML keys present."""
     required_yaml = ["id","query","packs","primary_ids","capability_tags","sources","ui","output_mode","graph_required"]
     for k in required_yaml:
-        if k not in data:
-            msgs.append(("FAIL", f"Missing YAML key: {k}"))
+        if k not in doc.data:
+            yield ("FAIL", f"Missing YAML key: {k}")
 
-    # Packs
-    packs = data.get("packs") or []
+@GUIDE_RULES.rule("packs")
+def rule_packs(doc):
+    """packs is a non-empty list of allowed packs (Guide §6.1)."""
+    packs = doc.data.get("packs") or []
     if not isinstance(packs, list) or not packs:
-        msgs.append(("FAIL","packs must be a non-empty list"))
-    else:
-        for p in packs:
-            if p not in ALLOWED_PACKS:
-                msgs.append(("WARN", f"Unknown pack '{p}' (not in guide’s allowed set)"))
-
-    # IDs canonical
-    primary_ids = data.get("primary_ids") or []
-    overlap_ids = data.get("overlap_ids") or []
-    for field_name, id_list in [("primary_ids", primary_ids), ("overlap_ids", overlap_ids)]:
+        yield ("FAIL","packs must be a non-empty list")
+        return
+    for p in packs:
+        if p not in ALLOWED_PACKS:
+            yield ("WARN", f"Unknown pack '{p}' (not in guide’s allowed set)")
+
+@GUIDE_RULES.rule("canonical-ids")
+def rule_canonical_ids(doc):
+    """primary_ids/overlap_ids are canonical IDs of known packs (Guide §6.5, §6.6)."""
+    for field_name in ("primary_ids", "overlap_ids"):
+        id_list = doc.data.get(field_name) or []
         if not isinstance(id_list, list):
-            msgs.append(("FAIL", f"{field_name} must be a list"))
+            yield ("FAIL", f"{field_name} must be a list")
             id_list = []
         bad = find_noncanonical_ids(id_list)
         if bad:
-            msgs.append(("FAIL", f"Non-canonical IDs in {field_name}: {bad}"))
-        pack_mismatch = ensure_pack_ids_match(id_list)
-        for w in pack_mismatch:
-            msgs.append(("WARN", w))
-
-    if not primary_ids:
-        msgs.append(("FAIL","primary_ids is empty"))
-
-    # capability_tags: 3–6 (guide §6.2). Use WARN if outside range.
-    caps = data.get("capability_tags") or []
+            yield ("FAIL", f"Non-canonical IDs in {field_name}: {bad}")
+        for w in ensure_pack_ids_match(id_list):
+            yield ("WARN", w)
+    if not doc.data.get("primary_ids"):
+        yield ("FAIL","primary_ids is empty")
+
+# capability_tags: 3–6 (guide §6.2). Use WARN if outside range.
+@GUIDE_RULES.rule("capability-tags")
+def rule_capability_tags(doc):
+    """3–6 capability_tags from the allowed set (Guide §6.2)."""
+    caps = doc.data.get("capability_tags") or []
     if not isinstance(caps, list) or not caps:
-        msgs.append(("FAIL","capability_tags must be a non-empty list"))
-    else:
-        unknown = [c for c in caps if c not in ALLOWED_CAPABILITY_TAGS]
-        if unknown:
-            msgs.append(("FAIL", f"Unknown capability_tags: {unknown}"))
-        if len(caps) < 3 or len(caps) > 6:
-            msgs.append(("WARN", f"capability_tags should be 3–6 (found {len(caps)})"))
-
-    # sources in YAML
-    sources = data.get("sources") or []
+        yield ("FAIL","capability_tags must be a non-empty list")
+        return
+    unknown = [c for c in caps if c not in ALLOWED_CAPABILITY_TAGS]
+    if unknown:
+        yield ("FAIL", f"Unknown capability_tags: {unknown}")
+    if len(caps) < 3 or len(caps) > 6:
+        yield ("WARN", f"capability_tags should be 3–6 (found {len(caps)})")
+
+@GUIDE_RULES.rule("yaml-sources")
+def rule_yaml_sources(doc):
+    """Every YAML source has a title, a canonical id and a locator."""
+    sources = doc.data.get("sources") or []
     if not isinstance(sources, list) or not sources:
-        msgs.append(("FAIL","sources missing or empty"))
-    else:
-        for i, s in enumerate(sources, 1):
-            for sub in ("title","id","locator"):
-                if not norm(s.get(sub)):
-                    msgs.append(("FAIL", f"source #{i} missing {sub}"))
-            sid = norm(s.get("id"))
-            if sid and not is_canonical_id(sid):
-                msgs.append(("FAIL", f"source #{i} id not canonical: {sid}"))
-
-    # output_mode
-    if data.get("output_mode") not in ALLOWED_OUTPUT_MODES:
-        msgs.append(("FAIL", f"output_mode must be one of {sorted(ALLOWED_OUTPUT_MODES)}"))
-
-    # cards_hint constraints
-    cards = (data.get("ui") or {}).get("cards_hint") or []
-    if cards:
-        if len(cards) > MAX_CARDS_HINT:
-            msgs.append(("WARN", f"cards_hint should have ≤{MAX_CARDS_HINT} items"))
-        for c in cards:
-            if len(c) > MAX_CARD_CHARS:
-                msgs.append(("WARN", f"cards_hint item over {MAX_CARD_CHARS} chars: '{c}'"))
-
-    # ui.actions checks
-    for a_type, target in parse_ui_actions(data.get("ui") or {}):
+        yield ("FAIL","sources missing or empty")
+        return
+    for i, s in enumerate(sources, 1):
+        for sub in ("title","id","locator"):
+            if not norm(s.get(sub)):
+                yield ("FAIL", f"source #{i} missing {sub}")
+        sid = norm(s.get("id"))
+        if sid and not is_canonical_id(sid):
+            yield ("FAIL", f"source #{i} id not canonical: {sid}")
+
+@GUIDE_RULES.rule("output-mode")
+def rule_output_mode(doc):
+    """output_mode is cards, prose or both."""
+    if doc.data.get("output_mode") not in ALLOWED_OUTPUT_MODES:
+        yield ("FAIL", f"output_mode must be one of {sorted(ALLOWED_OUTPUT_MODES)}")
+
+@GUIDE_RULES.rule("cards-hint")
+def rule_cards_hint(doc):
+    """At most 3 cards_hint items of at most 40 chars (Appendix E)."""
+    cards = (doc.data.get("ui") or {}).get("cards_hint") or []
+    if cards and len(cards) > MAX_CARDS_HINT:
+        yield ("WARN", f"cards_hint should have ≤{MAX_CARDS_HINT} items")
+    for c in cards:
+        if len(c) > MAX_CARD_CHARS:
+            yield ("WARN", f"cards_hint item over {MAX_CARD_CHARS} chars: '{c}'")
+
+@GUIDE_RULES.rule("ui-actions")
+def rule_ui_actions(doc):
+    """ui.actions use allowed types and canonical targets (Guide §6.4, Appendix A)."""
+    for a_type, target in parse_ui_actions(doc.data.get("ui") or {}):
         level, message = check_ui_action(a_type, target)
         if level != "PASS":
-            msgs.append((level, message))
+            yield (level, message)
         # If non-canonical target: check @product-taxonomy note present
         if level == "WARN" and ("not canonical" in message):
-            notes = norm(data.get("notes",""))
-            if "@product-taxonomy" not in notes:
-                msgs.append(("WARN", "Non-canonical UI target without '@product-taxonomy' note in `notes`"))
-
-    # body sections (presence + order)
-    msgs += [("FAIL", e) for e in check_sections_order(body)]
+            if "@product-taxonomy" not in norm(doc.data.get("notes","")):
+                yield ("WARN", "Non-canonical UI target without '@product-taxonomy' note in `notes`")
 
-    # Flags in YAML (if any)
-    for f in data.get("flags") or []:
-        if f not in ALLOWED_FLAGS:
-            msgs.append(("WARN", f"Unknown flag in YAML: '{f}'"))
-
-    # Flags in body like [LOCAL LAW CHECK]
-    for flag in re.findall(r"\[(.*?)\]", body):
-        if flag in {"",}:
+# body sections (presence + order); each marker's first occurrence comes from the one tokenizer scan
+@GUIDE_RULES.rule("sections")
+def rule_sections(doc):
+    """Body has every required section, in order (Guide §3)."""
+    last_end = 0
+    for pat in REQUIRED_SECTIONS_ORDER:
+        span = doc.markers.get(pat)
+        if span is None:
+            yield ("FAIL", f"Body missing section marker matching /{pat}/")
             continue
-        if flag not in ALLOWED_FLAGS:
+        if span[0] < last_end:
+            yield ("FAIL", f"Section out of order around /{pat}/", doc.line_of(span[0]))
+        last_end = span[1]
+
+@GUIDE_RULES.rule("yaml-flags")
+def rule_yaml_flags(doc):
+    """YAML flags are from the allowed set (Guide §6.3)."""
+    for f in doc.data.get("flags") or []:
+        if f not in ALLOWED_FLAGS:
+            yield ("WARN", f"Unknown flag in YAML: '{f}'")
+
+# Flags in body like [LOCAL LAW CHECK]
+@GUIDE_RULES.rule("body-flags")
+def rule_body_flags(doc):
+    """Bracketed tags in the body are allowed flags (Guide §6.3)."""
+    for flag, pos in doc.brackets:
+        if flag and flag not in ALLOWED_FLAGS:
             # Don’t fail—authors sometimes bracket non-flags; warn only.
-            msgs.append(("WARN", f"Bracketed tag in body not in allowed flags: [{flag}]"))
+            yield ("WARN", f"Bracketed tag in body not in allowed flags: [{flag}]", doc.line_of(pos))
 
-    # Sources cross-check: ensure body has a Sources section & at least one entry
-    body_sources = extract_sources_from_body(body)
+# Sources cross-check: body has a Sources section with at least one entry that mentions a YAML pack
+@GUIDE_RULES.rule("body-sources")
+def rule_body_sources(doc):
+    """Body **Sources** lists entries that reference the YAML packs."""
+    body_sources = extract_sources(doc)
     if not body_sources:
-        msgs.append(("FAIL","Body lacks **Sources** entries"))
-    # Soft check: ensure at least one YAML source ID pack appears in body Sources text
+        yield ("FAIL","Body lacks **Sources** entries")
+    sources = doc.data.get("sources") or []
     yaml_pack_prefixes = {sid.split("/",1)[0] for sid in [s.get("id","") for s in sources if s.get("id")]}
     if body_sources and yaml_pack_prefixes:
         joined = " | ".join(body_sources)
         if not any(pfx.split(":")[0] in joined for pfx in yaml_pack_prefixes):
-            msgs.append(("WARN","Body Sources don’t appear to reference YAML packs (manual check advised)"))
+            yield ("WARN","Body Sources don’t appear to reference YAML packs (manual check advised)")
 
-    return msgs
+# Facts for the corpus-wide checks (qaindex.py). The split files keep their front
+# matter "leading" (YAML up to the first ---, as split_gas.py writes them), which the
+# guide's fenced gate rejects; their facts still feed the corpus checks.
+LEADING_FRONT = RuleSet("leading-front", RULESET_VERSION, front="leading")
 
-# --------- Runner ---------
-def main():
-    rows = []   # for CSV
-    issues_summary = []  # for MD
-    files_scanned = 0
-    fails = 0
-
-    for root, _, files in os.walk(QA_DIR):
-        for fn in files:
-            if not fn.lower().endswith((".md",".yml",".yaml")):
-                continue
-            path = os.path.join(root, fn)
-            files_scanned += 1
-            msgs = validate_file(path)
-
-            max_level = "PASS"
-            for lvl, _ in msgs:
-                if lvl == "FAIL":
-                    max_level = "FAIL"; break
-                elif lvl == "WARN" and max_level != "FAIL":
-                    max_level = "WARN"
-            if max_level == "FAIL":
-                fails += 1
-
-            # record
-            issues_summary.append((path, max_level, msgs))
-            for lvl, msg in msgs:
-                rows.append({"file": path, "level": lvl, "message": msg})
-
-    # Write CSV
-    with open(REPORT_CSV, "w", newline="", encoding="utf-8") as f:
-        w = csv.DictWriter(f, fieldnames=["file","level","message"])
-        w.writeheader()
-        for r in rows:
-            w.writerow(r)
-
-    # Write MD
+@GUIDE_RULES.facts
+def guide_facts(doc):
+    if not doc.ok:
+        doc = QADoc(doc.path, doc.text, LEADING_FRONT)
+    return facts_from_data(doc.data) if doc.ok else None
+
+# --------- Validation per file ---------
+def validate_file(path: str, ruleset: RuleSet = GUIDE_RULES) -> List[Tuple[str, str]]:
+    """
+    Returns list of tuples: (level, message)
+      level in {"PASS","WARN","FAIL"}
+    """
+    return [(f.level, f.message) for f in lint_file(path, ruleset)]
+
+# --------- Reports ---------
+class FileResult(NamedTuple):
+    status: str                      # worst level
+    msgs: List[Tuple[str, str]]
+    csv: str                         # this file's CSV rows
+    md: str                          # this file's MD section
+    jsonl: str                       # this file's JSONL record
+    sarif: str                       # this file's SARIF results
+
+def render_md(path: str, status: str, msgs: List[Tuple[str, str]]) -> str:
+    badge = "✅ PASS" if status=="PASS" else ("⚠️ WARN" if status=="WARN" else "❌ FAIL")
+    lines = [f"\n## {badge} — {path}"]
+    if not msgs:
+        lines.append("- No issues.")
+    else:
+        for lvl, m in msgs:
+            emoji = "❌" if lvl=="FAIL" else ("⚠️" if lvl=="WARN" else "✅")
+            lines.append(f"- {emoji} **{lvl}**: {m}")
+    return "\n".join(lines)
+
+def md_header(files_scanned: int, fails: int) -> List[str]:
     lines = []
     lines.append(f"# QA Validation Report")
     lines.append(f"_Generated: {datetime.utcnow().isoformat()}Z_")
     lines.append(f"\n**Files scanned:** {files_scanned}")
     lines.append(f"**Files with FAIL issues:** {fails}\n")
-
-    if not issues_summary:
+    if not files_scanned:
         lines.append("✅ No QA files found (check QA_DIR).")
-    else:
-        for path, status, msgs in sorted(issues_summary, key=lambda x: (x[1], x[0])):
-            badge = "✅ PASS" if status=="PASS" else ("⚠️ WARN" if status=="WARN" else "❌ FAIL")
-            lines.append(f"\n## {badge} — {path}")
-            if not msgs:
-                lines.append("- No issues.")
+    return lines
+
+def record(path: str, findings) -> FileResult:
+    """Status plus the file's rendered report fragments (--watch re-renders only edited files)."""
+    msgs = [(f.level, f.message) for f in findings]
+    status = max_level(msgs)
+    buf = io.StringIO()
+    w = csv.writer(buf)
+    for lvl, msg in msgs:
+        w.writerow([path, lvl, msg])
+    return FileResult(status, msgs, buf.getvalue(), render_md(path, status, msgs),
+                      jsonl_line(path, findings), sarif_fragment(path, findings))
+
+class ReportStream:
+    """CSV, JSONL and (optionally) SARIF, written as each file's result arrives.
+
+    With atomic=True everything goes to temp files renamed into place on close
+    (--watch rewrites); otherwise the reports fill in while the run progresses.
+    """
+    def __init__(self, ruleset: RuleSet, report_csv: str, report_jsonl: str, report_sarif: Optional[str] = None,
+                 atomic: bool = False, extra_rules=()):
+        self.targets = [t for t in (report_csv, report_jsonl, report_sarif) if t]
+        self.tmp = [f"{t}.{os.getpid()}.tmp" if atomic else t for t in self.targets]
+        self.files = [open(t, "w", encoding="utf-8", newline="") for t in self.tmp]
+        self.csv, self.jsonl = self.files[0], self.files[1]
+        self.sarif = SarifWriter(self.files[2], ruleset, "validatefiles", extra_rules) if report_sarif else None
+        self.csv.write("file,level,message\r\n")
+        self.files_scanned = self.fails = 0
+
+    def add(self, r: FileResult) -> None:
+        self.csv.write(r.csv)
+        self.jsonl.write(r.jsonl)
+        if self.sarif:
+            self.sarif.add(r.sarif)
+        self.files_scanned += 1
+        self.fails += r.status == "FAIL"
+
+    def close(self, ok: bool = True) -> None:
+        if self.sarif and ok:
+            self.sarif.close()
+        for f in self.files:
+            f.close()
+        for tmp, target in zip(self.tmp, self.targets):
+            if tmp != target:
+                if ok:
+                    os.replace(tmp, target)
+                else:
+                    os.remove(tmp)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *_):
+        self.close(ok=exc_type is None)
+
+def write_md_from_jsonl(report_jsonl: str = REPORT_JSONL, report_md: str = REPORT_MD,
+                        extra: List[str] = ()) -> Tuple[int, int]:
+    """Build the MD summary from the JSONL stream (by status, then path), then `extra`; return (files, fails).
+
+    Only (status, path, offset) is held per file; each record is re-read when its section is written.
+    """
+    index, offset = [], 0
+    with open(report_jsonl, "rb") as f:
+        for line in f:
+            if line.strip():
+                rec = json.loads(line)
+                index.append((rec["status"], rec["path"], offset))
+            offset += len(line)
+        index.sort()
+        fails = sum(1 for status, _, _ in index if status == "FAIL")
+        lines = md_header(len(index), fails)
+        for status, path, off in index:
+            f.seek(off)
+            rec = json.loads(f.readline())
+            lines.append(render_md(path, status, [(x["level"], x["message"]) for x in rec["findings"]]))
+    write_atomic(report_md, "\n".join(lines + list(extra)))
+    return len(index), fails
+
+def write_corpus(index: Optional[CorpusIndex], out: ReportStream) -> Tuple[List[str], int]:
+    """Corpus conflicts to REPORT_CORPUS and the open SARIF log; return (MD section, conflicting-id count)."""
+    if index is None:
+        return [], 0
+    conflicts = index.conflicts()
+    if out.sarif:
+        for path, findings in index.findings(conflicts).items():
+            out.sarif.add(sarif_fragment(path, findings))
+    write_atomic(REPORT_CORPUS, json.dumps({"summary": summarize(conflicts), **conflicts}, ensure_ascii=False,
+                                           indent=2) + "\n")
+    return render_corpus_md(conflicts), len(conflicts["duplicate_ids"])
+
+def write_reports(results: Dict[str, FileResult], ruleset: RuleSet, report_sarif: Optional[str] = None,
+                  index: Optional[CorpusIndex] = None) -> Tuple[int, int]:
+    """Rewrite every report from already-rendered results (--watch); return (FAIL files, duplicate ids)."""
+    with ReportStream(ruleset, REPORT_CSV, REPORT_JSONL, report_sarif, atomic=True,
+                      extra_rules=CORPUS_RULES if index is not None else ()) as out:
+        for r in results.values():
+            out.add(r)
+        corpus_md, dup_ids = write_corpus(index, out)
+    lines = md_header(out.files_scanned, out.fails)
+    lines += [r.md for _, r in sorted(results.items(), key=lambda x: (x[1].status, x[0]))]
+    write_atomic(REPORT_MD, "\n".join(lines + corpus_md))
+    return out.fails, dup_ids
+
+def watch(root: str, spec: str, ruleset: RuleSet, cache: LintCache, results: Dict[str, FileResult],
+          interval: float, exclude: List[str], seen: Dict[str, Tuple[int, int]],
+          report_sarif: Optional[str] = None, index: Optional[CorpusIndex] = None,
+          store: Optional[ResultStore] = None) -> int:
+    """Re-lint new/edited files and rewrite the reports as files change, until Ctrl-C.
+
+    Uses inotify where available (woken by each saved file) and otherwise polls a stat
+    scan every `interval` seconds. `seen` is the snapshot taken before `results` were
+    linted, so edits made during that first run are picked up. The corpus index and
+    result store, if any, are updated for just the changed and removed files. Returns the FAIL count
+    (files plus duplicate ids).
+    """
+    try:
+        watcher = DirWatcher(root)
+        how = "inotify"
+    except OSError:
+        watcher, how = None, f"polling every {interval:g}s"
+    skip = {os.path.abspath(x) for x in exclude}
+    fails = sum(1 for r in results.values() if r.status == "FAIL")
+    if index is not None:
+        fails += len(index.conflicts()["duplicate_ids"])
+    last_change = time.monotonic()
+    print(f"Watching {root} ({how}; Ctrl-C to stop)")
+    rescan = True  # first pass: compare a full scan with `seen`, the watcher missed the initial run
+    try:
+        while True:
+            if rescan or watcher is None:
+                if not rescan:
+                    time.sleep(interval)
+                touched, rescan = None, False
             else:
-                for lvl, m in msgs:
-                    emoji = "❌" if lvl=="FAIL" else ("⚠️" if lvl=="WARN" else "✅")
-                    lines.append(f"- {emoji} **{lvl}**: {m}")
-
-    with open(REPORT_MD, "w", encoding="utf-8") as f:
-        f.write("\n".join(lines))
+                touched = watcher.wait(interval)
+                if touched is not None:
+                    touched = {p for p in touched if p.lower().endswith(QA_EXTENSIONS) and os.path.abspath(p) not in skip}
+            if touched is None:  # polling, or the watcher lost track: full stat scan
+                now = snapshot(root, exclude=exclude)
+            else:
+                now = dict(seen)
+                fresh = stat_sigs(touched)
+                for p in touched:
+                    if p in fresh:
+                        now[p] = fresh[p]  # in place: an edit keeps the file's scan position
+                    else:
+                        now.pop(p, None)
+                if now.keys() != seen.keys():  # files came or went: scan order (and stragglers) from a walk
+                    order = iter_qa_files(root, exclude=exclude)
+                    now.update(stat_sigs(p for p in order if p not in now))
+                    now = {p: now[p] for p in order if p in now}
+            changed = [p for p, sig in now.items() if seen.get(p) != sig]
+            gone = [p for p in seen if p not in now]
+            if not changed and not gone:
+                # cache and index are only a speed-up for the next run: write them once edits settle
+                if time.monotonic() - last_change > CACHE_SAVE_IDLE:
+                    cache.save()
+                    if index is not None:
+                        index.save()
+                continue
+            t0 = time.perf_counter()
+            for path, findings, _, facts in lint_incremental(changed, spec, 1, ruleset, cache):
+                results[path] = record(path, findings)
+                if index is not None:
+                    index.update(path, facts)
+                if store is not None:
+                    store.put(path, findings, facts)
+            for p in gone:
+                results.pop(p, None)
+                cache.forget(p)
+                if index is not None:
+                    index.remove(p)
+                if store is not None:
+                    store.remove(p)
+            if store is not None:
+                store.commit()
+            results = {p: results[p] for p in now if p in results}
+            file_fails, dup_ids = write_reports(results, ruleset, report_sarif, index)
+            fails = file_fails + dup_ids
+            ms = (time.perf_counter() - t0) * 1000
+            stamp = time.strftime("%H:%M:%S")
+            for p in changed[:WATCH_LOG_FILES]:
+                print(f"[{stamp}] {results[p].status} {p} ({len(results[p].msgs)} issues)")
+            for p in gone[:WATCH_LOG_FILES]:
+                print(f"[{stamp}] removed {p}")
+            if len(changed) > WATCH_LOG_FILES or len(gone) > WATCH_LOG_FILES:
+                print(f"[{stamp}] ... {len(changed)} files re-linted, {len(gone)} removed")
+            print(f"[{stamp}] reports updated in {ms:.0f} ms — files with FAIL issues: {file_fails}" +
+                  (f", duplicate ids: {dup_ids}" if dup_ids else ""))
+            seen, last_change = now, time.monotonic()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if watcher is not None:
+            watcher.close()
+        cache.save()
+        if index is not None:
+            index.save()
+    return fails
 
-    print(f"Report written: {REPORT_MD}\nCSV: {REPORT_CSV}")
-    sys.exit(1 if fails else 0)
+# --------- Runner ---------
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Lint Q&A files against the authoring guide")
+    ap.add_argument("--root", default=QA_DIR, help="Folder to scan")
+    ap.add_argument("--workers", type=int, default=1, help="Process pool size (1 = serial)")
+    ap.add_argument("--ruleset", default=DEFAULT_RULESET, help="Rule set as module:attr")
+    ap.add_argument("--cache", default=CACHE_FILE, help="Findings cache (JSON); '' = none")
+    ap.add_argument("--index", default=INDEX_FILE, help="Corpus index for cross-file checks (JSON); '' = in memory")
+    ap.add_argument("--store", default=STORE_FILE, help="Result store for process_report.py (SQLite); '' = none")
+    ap.add_argument("--watch", action="store_true", help="Keep running; re-lint changed files and update the reports")
+    ap.add_argument("--interval", type=float, default=0.05, help="Polling interval for --watch (seconds)")
+    ap.add_argument("--sarif", default=None, help="Also write a SARIF 2.1.0 log here (editors, CI code scanning)")
+    if instrument:
+        instrument.add_arguments(ap)
+    a = ap.parse_args(argv)
+    metrics = instrument.from_args(a, "validatefiles") if instrument else None
+    # run as a script this module is __main__; use its rule set in-process instead of importing it again
+    ruleset = GUIDE_RULES if a.ruleset == DEFAULT_RULESET else load_ruleset(a.ruleset)
+    cache = LintCache(a.cache, ruleset) if a.cache else None
+    # cross-file checks need the rule set's facts extractor (GUIDE_RULES has one)
+    index = CorpusIndex(a.index, ruleset) if ruleset.facts_fn else None
+    store = ResultStore(a.store) if a.store else None
+    own_reports = [REPORT_MD, REPORT_CSV]  # never lint our own output
+
+    # results stream to CSV/JSONL/SARIF as each file completes; only --watch keeps them in memory
+    results: Dict[str, FileResult] = {}
+    with metrics.stage("validate") if metrics else nullcontext(), \
+            ReportStream(ruleset, REPORT_CSV, REPORT_JSONL, a.sarif,
+                         extra_rules=CORPUS_RULES if index is not None else ()) as out:
+        if a.watch:
+            seen = snapshot(a.root, exclude=own_reports)  # baseline for --watch, taken before linting
+            paths = list(seen)
+        else:
+            paths = iter_qa_files(a.root, exclude=own_reports)
+        for path, findings, perf, facts in lint_incremental(paths, a.ruleset, a.workers, ruleset, cache):
+            if metrics and perf:
+                metrics.merge_file(perf)
+            r = record(path, findings)
+            out.add(r)
+            if a.watch:
+                results[path] = r
+            if index is not None:
+                index.update(path, facts)
+            if store is not None:
+                store.put(path, findings, facts)
+        if index is not None:
+            index.prune(paths)
+        if store is not None:
+            store.prune(paths)
+            store.commit()
+        corpus_md, dup_ids = write_corpus(index, out)
+    if cache is not None:
+        cache.prune(paths)
+        cache.save()
+    if index is not None:
+        index.save()
+
+    _, fails = write_md_from_jsonl(extra=corpus_md)
+    print(f"Report written: {REPORT_MD}\nCSV: {REPORT_CSV}\nJSONL: {REPORT_JSONL}" +
+          (f"\nSARIF: {a.sarif}" if a.sarif else "") + (f"\nCorpus: {REPORT_CORPUS}" if index is not None else "") +
+          (f"\nStore: {a.store}" if store is not None else ""))
+    if cache is not None and cache.hits:
+        print(f"Reused cached results for {cache.hits} of {len(paths)} files ({a.cache})")
+    if index is not None and dup_ids:
+        print(f"Duplicate Q&A ids across files: {dup_ids} (see {REPORT_CORPUS})")
+    if metrics:
+        metrics.counters.update(files=len(paths), fails=fails, duplicate_ids=dup_ids,
+                                cached=cache.hits if cache is not None else 0)
+        instrument.finish(metrics)
+    if a.watch:
+        fails = watch(a.root, a.ruleset, ruleset, cache or LintCache(None, ruleset), results, a.interval, own_reports,
+                      seen, a.sarif, index, store)
+        dup_ids = 0
+    if store is not None:
+        store.close()
+    sys.exit(1 if fails or dup_ids else 0)
 
 if __name__ == "__main__":
     main()
-
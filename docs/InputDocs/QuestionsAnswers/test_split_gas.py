@@ -0,0 +1,66 @@
+"""Regression checks for split_gas.py (run with: python -m pytest test_split_gas.py)."""
+import pytest
+
+from split_gas import main, split
+
+
+def _batch(tmp_path, *queries):
+    src = tmp_path / "batch.md"
+    src.write_text("".join(f"id: Q001\nquery: {q}\n" for q in queries), encoding="utf-8")
+    return str(src)
+
+
+def test_keep_last_writes_final_version_after_a_b_a(tmp_path):
+    out = tmp_path / "out"
+    stats, duplicates, conflicts = split([_batch(tmp_path, "A", "B", "A")], str(out), keep="last", workers=1)
+    assert (out / "Q001.md").read_text(encoding="utf-8") == "id: Q001\nquery: A"
+    assert stats["written"] == 1 and "Q001" in conflicts and not duplicates
+
+
+def test_keep_first_writes_first_version(tmp_path):
+    out = tmp_path / "out"
+    split([_batch(tmp_path, "A", "B", "C")], str(out), keep="first", workers=1)
+    assert (out / "Q001.md").read_text(encoding="utf-8") == "id: Q001\nquery: A"
+
+
+def test_identical_repeat_is_a_duplicate_not_a_conflict(tmp_path):
+    src = tmp_path / "batch.md"
+    src.write_text("id: Q001\nquery: A\nid: Q002\nquery: B\nid: Q001\nquery: A\n", encoding="utf-8")
+    stats, duplicates, conflicts = split([str(src)], str(tmp_path / "out"), workers=1)
+    assert duplicates == {"Q001": [(str(src), 1), (str(src), 5)]} and not conflicts
+    assert stats == {"qas": 3, "ids": 2, "written": 2, "unchanged": 0}
+
+
+def test_strict_exits_1_on_conflicts_only(tmp_path, capsys):
+    out = str(tmp_path / "out")
+    main(["--out", out, "--strict", _batch(tmp_path, "A", "A")])
+    assert "1 duplicate, 0 conflicting" in capsys.readouterr().out
+    with pytest.raises(SystemExit) as exc:
+        main(["--out", out, "--strict", _batch(tmp_path, "A", "B")])
+    assert exc.value.code == 1
+    assert "conflicting Q001, kept last" in capsys.readouterr().out
+
+
+def test_rerun_leaves_unchanged_files_alone(tmp_path):
+    src, out = _batch(tmp_path, "A"), tmp_path / "out"
+    split([src], str(out), workers=1)
+    mtime = (out / "Q001.md").stat().st_mtime_ns
+    stats, _, _ = split([src], str(out), workers=1)
+    assert stats["written"] == 0 and stats["unchanged"] == 1
+    assert (out / "Q001.md").stat().st_mtime_ns == mtime
+
+
+def test_ids_of_any_width(tmp_path):
+    src = tmp_path / "batch.md"
+    src.write_text("id: Q999\nquery: A\nid: Q1000\nquery: B\nid: Q12345\nquery: C\n", encoding="utf-8")
+    split([str(src)], str(tmp_path / "out"), workers=1)
+    assert sorted(p.name for p in (tmp_path / "out").iterdir()) == ["Q1000.md", "Q12345.md", "Q999.md"]
+    assert (tmp_path / "out" / "Q1000.md").read_text(encoding="utf-8") == "id: Q1000\nquery: B"
+
+
+def test_last_qa_without_trailing_newline_is_kept(tmp_path):
+    src = tmp_path / "batch.md"
+    src.write_text("intro text\nid: Q159\nquery: A\nid: Q160\nquery: B", encoding="utf-8")
+    stats, _, _ = split([str(src)], str(tmp_path / "out"), workers=1)
+    assert stats["ids"] == 2
+    assert (tmp_path / "out" / "Q160.md").read_text(encoding="utf-8") == "id: Q160\nquery: B"
@@ -4,116 +4,505 @@ Build canonical term and phrase sets from curated Markdown corpora.
 - Reads TOML or YAML front matter for metadata.
 - Mines tokens and bigrams from body text.
 - Writes CSVs into outputs/vocab/ and overlap report.
+- Uniques and Jaccard overlaps come from a sparse term x standard incidence
+  matrix built in memory (column sums + one sparse product).
 
 Usage:
   python tools/analyze/build_vocab.py --root data/corpus --out outputs/vocab
+  python tools/analyze/build_vocab.py --root data/corpus --out outputs/vocab --workers 8
 
-Dependencies: pyyaml, tomli (for TOML read), pandas
+With --workers N (N > 1) files are mined across a process pool. Each worker
+returns a compact per-file result and the parent reduces them in glob order,
+so the output is identical to the serial run.
+
+With --incremental, per-file mining results are cached in <out>/.vocab_cache.json
+together with a manifest of content hashes. Only added or changed files are
+re-mined (deleted files drop out), and all CSVs are re-aggregated from the
+cache. A cache written by another CACHE_VERSION or --min-phrase-freq is ignored.
+
+terms.csv and phrases.csv are streamed row by row rather than collected in
+memory. With --parquet, terms.parquet and phrases.parquet are written
+alongside them in bounded row batches, with dictionary-encoded standards,
+clauses and path columns (requires pyarrow).
+
+Corpus-level phrases: token streams are integer-encoded and all 2..--max-ngram
+n-grams are counted across the corpus in one pass (each level is keyed on the
+dense id of its (n-1)-gram prefix, so keys stay in int64). N-grams with at
+least [mining] min_freq occurrences and PMI >= pmi_threshold are kept, and the
+max_phrases_per_clause most frequent per clause are written to phrases_pmi.csv. Settings
+come from tools/config/config.toml (--config); --min-phrase-freq defaults to
+[mining] min_freq.
+
+With --lemmatize (default: [mining] lemmatize_default) tokens are reduced by a
+small rule-based English stemmer, so "control", "controls" and "controlled"
+count as one term. Results are memoised in a bounded LRU cache keyed on the
+surface form; the cache hit rate is printed at the end of the run.
+
+Front matter is read through the shared parsed-corpus cache
+(tools/common/corpus.py, --corpus-cache; pass "" to disable persistence).
+
+--profile and --metrics-json (tools/common/instrument.py) report time per
+stage (discover, mine, pmi, overlap) and, per file, read / YAML vs TOML parse
+/ tokenize time; with --workers these phases are summed across workers.
+
+Dependencies: pyyaml, tomli (for TOML read), numpy, scipy; pyarrow (optional, --parquet)
 """
 from __future__ import annotations
-import argparse, csv, re
+import argparse, csv, hashlib, json, os, re, sys, time
+from array import array
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
 from pathlib import Path
-import pandas as pd
-import yaml
+import numpy as np
+from scipy import sparse
 try:
-    import tomllib as tomli  # py311+
-except Exception:
-    import tomli
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # only needed for --parquet
+    pa = pq = None
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common import instrument  # noqa: E402
+from common.config import load_config  # noqa: E402
+from common.corpus import DEFAULT_CACHE, shared_cache  # noqa: E402
 
 WORD = re.compile(r"\b[a-z0-9\-]+\b")
 
+CACHE_FILE = ".vocab_cache.json"
+CACHE_VERSION = 2
+DEFAULT_CONFIG = Path(__file__).resolve().parents[1] / "config" / "config.toml"
+
+TERM_COLS = ["standards", "clauses", "term", "doc_id", "path"]
+PHRASE_COLS = ["standards", "clauses", "phrase", "method", "count", "doc_id", "path"]
+DICT_COLS = {"standards", "clauses", "method", "path"}
+BATCH_ROWS = 65536
+
+LEMMA_CACHE_SIZE = 1 << 16
+# forms the suffix rules below would mangle
+LEMMA_EXCEPTIONS = {
+    "always": "always", "analyses": "analysis", "bases": "basis", "criteria": "criterion",
+    "data": "data", "does": "do", "during": "during", "goes": "go", "isms": "isms",
+    "news": "news", "nothing": "nothing", "perhaps": "perhaps", "series": "series",
+    "something": "something", "whereas": "whereas",
+}
+VOWELS = set("aeiouy")
 
-def split_front(text: str):
-    if text.startswith("---"):
-        end = text.find("\n---", 3)
-        if end != -1:
-            body_start = text.find("\n", end + 4)
-            return ("yaml", text[4:end], text[body_start+1:])
-    if text.startswith("+++"):
-        end = text.find("\n+++", 3)
-        if end != -1:
-            body_start = text.find("\n", end + 4)
-            return ("toml", text[4:end], text[body_start+1:])
-    return (None, None, text)
 
+def _has_vowel(s: str) -> bool:
+    return any(ch in VOWELS for ch in s)
 
-def parse_meta(kind: str, front: str) -> dict:
-    if kind == "yaml":
-        return yaml.safe_load(front) or {}
-    if kind == "toml":
-        return tomli.loads(front) or {}
-    return {}
 
+@lru_cache(maxsize=LEMMA_CACHE_SIZE)
+def lemmatize(tok: str) -> str:
+    """Light rule-based English stemmer; hyphenated tokens stem their last part."""
+    head, sep, w = tok.rpartition("-")
+    if w in LEMMA_EXCEPTIONS:
+        return head + sep + LEMMA_EXCEPTIONS[w]
+    if len(w) <= 3 or not w.isalpha():
+        return tok
+    # plurals / third person
+    if w.endswith("ies") and len(w) > 4:
+        w = w[:-3] + "y"
+    elif w.endswith("sses"):
+        w = w[:-2]
+    elif w.endswith(("ss", "us", "is")):
+        pass
+    elif w.endswith("es") and w[:-2].endswith(("x", "ch", "sh", "zz")):
+        w = w[:-2]
+    elif w.endswith("s"):
+        w = w[:-1]
+    # past tense / progressive
+    stripped = False
+    if w.endswith("ied") and len(w) > 4:
+        w = w[:-3] + "y"
+    elif w.endswith("eed"):
+        w = w[:-1]
+    elif w.endswith("ed") and len(w) > 4 and _has_vowel(w[:-2]):
+        w, stripped = w[:-2], True
+    elif w.endswith("ing") and len(w) > 5 and _has_vowel(w[:-3]):
+        w, stripped = w[:-3], True
+    # undouble (planned -> plan, controlled -> control, but installed -> install)
+    if stripped and len(w) > 3 and w[-1] == w[-2] and w[-1] not in VOWELS and w[-1] not in "sz":
+        if w[-1] != "l" or (len(w) > 4 and w[-3] in "eo"):
+            w = w[:-1]
+    # silent e (require / requires / required -> requir)
+    if len(w) > 4 and w.endswith("e") and not w.endswith("ee"):
+        w = w[:-1]
+    return head + sep + w
 
-def mine_tokens(body: str) -> list[str]:
+
+def mine_tokens(body: str, lemma: bool = False) -> list[str]:
     body = body.lower()
-    return WORD.findall(body)
+    toks = WORD.findall(body)
+    return list(map(lemmatize, toks)) if lemma else toks
 
 
 def bigrams(tokens: list[str]) -> list[str]:
     return [f"{tokens[i]} {tokens[i+1]}" for i in range(len(tokens)-1)]
 
 
-def main():
+def mine_file(p: Path, min_phrase_freq: int = 2, lemma: bool = False,
+              corpus_cache: str | None = None) -> dict:
+    """Mine one document into a compact, picklable partial result."""
+    with instrument.capture(p) as cap:
+        doc = shared_cache(corpus_cache).get(p).check()
+        meta, body = doc.meta, doc.body()
+        before = lemmatize.cache_info()
+        t0 = time.perf_counter()
+        toks = mine_tokens(body, lemma)
+        bi_cnt = Counter(bigrams(toks))
+        cap.add_phase("tokenize", time.perf_counter() - t0)
+        after = lemmatize.cache_info()
+    terms = sorted(set(meta.get("terms", [])) | set(toks), key=str)
+    pos = {t: i for i, t in enumerate(terms)}
+    return {
+        "path": str(p),
+        "standards": list(meta.get("standards", [])),
+        "clauses": list(meta.get("clauses", [])),
+        "doc_id": meta.get("id", ""),
+        # sorted so row order does not depend on set/hash ordering per process
+        "terms": terms,
+        # token stream as indices into "terms" (integer-encoded for phrase mining)
+        "tokens": [pos[t] for t in toks],
+        "bigrams": [(ph, c) for ph, c in bi_cnt.items() if c >= min_phrase_freq],
+        "curated": sorted(set(meta.get("phrases", [])), key=str),
+        # lemma cache (hits, misses) while mining this file; not carried over by the cache
+        "lemma_cache": [after.hits - before.hits, after.misses - before.misses],
+        # read/parse/tokenize timings for --metrics-json; not carried over by the cache
+        "perf": cap.perf,
+    }
+
+
+def iter_mined(files: list[Path], min_phrase_freq: int, workers: int = 1, lemma: bool = False,
+               corpus_cache: str | None = None):
+    """Yield per-file results in input order, optionally across a process pool."""
+    fn = partial(mine_file, min_phrase_freq=min_phrase_freq, lemma=lemma, corpus_cache=corpus_cache)
+    if workers <= 1 or len(files) < 2:
+        yield from map(fn, files)
+        return
+    chunk = max(1, len(files) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        yield from ex.map(fn, files, chunksize=chunk)
+
+
+def content_hash(p: Path) -> str:
+    return hashlib.sha256(p.read_bytes()).hexdigest()
+
+
+def load_cache(out: Path, settings: dict) -> dict:
+    """Return cached {path: entry}, or {} if missing, corrupt or stale."""
+    try:
+        data = json.loads((out / CACHE_FILE).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    if data.get("settings") != settings:
+        return {}
+    return data.get("files", {})
+
+
+def save_cache(out: Path, settings: dict, entries: dict) -> None:
+    out.mkdir(parents=True, exist_ok=True)
+    tmp = out / (CACHE_FILE + ".tmp")
+    tmp.write_text(json.dumps({"settings": settings, "files": entries}, default=str), encoding="utf-8")
+    os.replace(tmp, out / CACHE_FILE)
+
+
+def mine_incremental(files: list[Path], out: Path, min_phrase_freq: int, workers: int = 1,
+                     lemma: bool = False, corpus_cache: str | None = None):
+    """Mine only added/changed files; return (results in input order, stats)."""
+    settings = {"version": CACHE_VERSION, "min_phrase_freq": min_phrase_freq, "lemmatize": lemma}
+    cached = load_cache(out, settings)
+    entries, stale = {}, []
+    for p in files:
+        key, st = str(p), p.stat()
+        sig = [st.st_mtime_ns, st.st_size]
+        e = cached.get(key)
+        if e and e["sig"] == sig:
+            entries[key] = e
+            e["result"].pop("lemma_cache", None)
+            e["result"].pop("perf", None)
+            continue
+        digest = content_hash(p)
+        if e and e["sha256"] == digest:
+            entries[key] = dict(e, sig=sig)
+            e["result"].pop("lemma_cache", None)
+            e["result"].pop("perf", None)
+            continue
+        entries[key] = {"sig": sig, "sha256": digest, "result": None}
+        stale.append(p)
+    for r in iter_mined(stale, min_phrase_freq, workers, lemma, corpus_cache):
+        entries[r["path"]]["result"] = r
+    save_cache(out, settings, entries)
+    stats = {"mined": len(stale), "reused": len(files) - len(stale),
+             "deleted": len(set(cached) - set(entries))}
+    return [entries[str(p)]["result"] for p in files], stats
+
+
+class TermStdIndex:
+    """Sparse term-id x standard incidence built from mining results."""
+
+    def __init__(self):
+        self.term_ids: dict[str, int] = {}
+        self.std_ids: dict[str, int] = {}
+        self._rows = array("q")
+        self._cols = array("q")
+
+    def add(self, terms, standards) -> None:
+        sids = [self.std_ids.setdefault(s, len(self.std_ids)) for s in standards if s]
+        if not sids:
+            return
+        tids = [self.term_ids.setdefault(str(t), len(self.term_ids)) for t in terms]
+        for sid in sids:
+            self._rows.extend(tids)
+            self._cols.extend(array("q", [sid]) * len(tids))
+
+    def matrix(self) -> sparse.csc_matrix:
+        shape = (len(self.term_ids), len(self.std_ids))
+        # "q" and int64 are 8 bytes everywhere ("l" is 4 on Windows)
+        rows = np.frombuffer(self._rows, dtype=np.int64) if self._rows else np.empty(0, np.int64)
+        cols = np.frombuffer(self._cols, dtype=np.int64) if self._cols else np.empty(0, np.int64)
+        m = sparse.csc_matrix((np.ones(len(rows), dtype=np.int32), (rows, cols)), shape=shape)
+        m.data[:] = 1  # collapse duplicate (term, standard) pairs to incidence
+        return m
+
+    def standards(self) -> list[str]:
+        return sorted(self.std_ids)
+
+    def uniques(self, m: sparse.csc_matrix) -> dict[str, list[str]]:
+        """Terms that occur under exactly one standard, per standard."""
+        terms = np.array(list(self.term_ids), dtype=object)
+        only_one = np.asarray(m.sum(axis=1)).ravel() == 1
+        out = {}
+        for s in self.standards():
+            col = m.indices[m.indptr[self.std_ids[s]]:m.indptr[self.std_ids[s] + 1]]
+            out[s] = sorted(terms[col[only_one[col]]])
+        return out
+
+    def jaccard(self, m: sparse.csc_matrix) -> np.ndarray:
+        """Full standard x standard Jaccard matrix, ordered like standards()."""
+        order = [self.std_ids[s] for s in self.standards()]
+        inter = (m.T @ m).toarray()[np.ix_(order, order)].astype(np.float64)
+        size = np.diag(inter)
+        union = size[:, None] + size[None, :] - inter
+        return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+
+class PhraseMiner:
+    """Corpus-level 2..max_n n-gram counts scored by PMI / NPMI."""
+
+    def __init__(self, max_n: int = 4):
+        self.max_n = max_n
+        self.vocab: dict[str, int] = {}
+        self._docs: list[np.ndarray] = []
+        self._clauses: list[list[str]] = []
+
+    def add(self, terms, tokens, clauses) -> None:
+        gmap = np.fromiter((self.vocab.setdefault(str(t), len(self.vocab)) for t in terms),
+                           dtype=np.int64, count=len(terms))
+        self._docs.append(gmap[np.asarray(tokens, dtype=np.int64)])
+        self._clauses.append([str(c) for c in clauses if c])
+
+    def mine(self, min_freq: int, pmi_threshold: float, top_k: int) -> list[list]:
+        """Return [clause, phrase, n, clause_count, corpus_count, pmi, npmi] rows."""
+        if not self._docs:
+            return []
+        toks = np.concatenate(self._docs)
+        n_tok, n_voc = len(toks), len(self.vocab)
+        doc_of = np.repeat(np.arange(len(self._docs)), [len(d) for d in self._docs])
+        log_p1 = np.log2(np.maximum(np.bincount(toks, minlength=n_voc), 1) / max(n_tok, 1))
+        words = np.array(list(self.vocab), dtype=object)
+
+        accepted = []  # (phrase, n, corpus_count, pmi, npmi, doc ids, occurrences per doc)
+        prev = toks  # dense id of the (n-1)-gram starting at each position
+        for n in range(2, self.max_n + 1):
+            m = n_tok - n + 1
+            if m <= 0:
+                break
+            valid = doc_of[:m] == doc_of[n - 1:]
+            pos = np.nonzero(valid)[0]
+            keys = prev[:m][pos] * n_voc + toks[n - 1:][pos]
+            uniq, first, inv, cnt = np.unique(keys, return_index=True, return_inverse=True,
+                                              return_counts=True)
+            prev = np.zeros(m, dtype=np.int64)
+            prev[pos] = inv
+            if not len(pos):
+                break
+            # same denominator as the unigrams: count(ngram) <= count(word) keeps PMI under the bound
+            log_pn = np.log2(cnt / max(n_tok, 1))
+            comp = toks[pos[first][:, None] + np.arange(n)]
+            pmi = log_pn - log_p1[comp].sum(axis=1)
+            # PMI of an n-gram is bounded by -(n-1) log p(ngram); normalize to [-1, 1]
+            npmi = np.divide(pmi, -(n - 1) * log_pn, out=np.ones_like(pmi), where=log_pn < 0)
+            keep = (cnt >= min_freq) & (pmi >= pmi_threshold)
+            if not keep.any():
+                continue
+            hit = keep[inv]
+            pairs, occ = np.unique(np.stack([inv[hit], doc_of[pos[hit]]], axis=1),
+                                   axis=0, return_counts=True)
+            by_gram: dict[int, tuple[list, list]] = {}
+            for (g, d), c in zip(pairs.tolist(), occ.tolist()):
+                by_gram.setdefault(g, ([], []))[0].append(d)
+                by_gram[g][1].append(c)
+            for g, (docs, occs) in by_gram.items():
+                phrase = " ".join(words[comp[g]])
+                accepted.append((phrase, n, int(cnt[g]), float(pmi[g]), float(npmi[g]), docs, occs))
+
+        per_clause: dict[str, dict[str, list]] = {}
+        for phrase, n, total, p, q, docs, occs in accepted:
+            for d, c in zip(docs, occs):
+                for cl in self._clauses[d]:
+                    row = per_clause.setdefault(cl, {}).setdefault(phrase, [n, 0, total, p, q])
+                    row[1] += c
+        rows = []
+        for cl in sorted(per_clause):
+            # PMI already filtered for association; rank by in-clause frequency
+            ranked = sorted(per_clause[cl].items(), key=lambda kv: (-kv[1][1], -kv[1][4], kv[0]))
+            for phrase, (n, c, total, p, q) in ranked[:top_k]:
+                rows.append([cl, phrase, n, c, total, f"{p:.4f}", f"{q:.4f}"])
+        return rows
+
+
+class RowWriter:
+    """Stream rows to <name>.csv and optionally <name>.parquet in bounded batches.
+
+    Rows need no global de-duplication: each document emits a term or phrase
+    at most once per method, and the path column is unique per document.
+    """
+
+    def __init__(self, out: Path, name: str, columns: list[str], parquet: bool = False,
+                 batch_rows: int = BATCH_ROWS):
+        self.columns = columns
+        self.batch_rows = batch_rows
+        self._f = open(out / f"{name}.csv", "w", newline="", encoding="utf-8")
+        self._csv = csv.writer(self._f, lineterminator="\n")
+        self._csv.writerow(columns)
+        self._pq = None
+        self._buf = None
+        if parquet:
+            self.schema = pa.schema([
+                (c, pa.dictionary(pa.int32(), pa.string()) if c in DICT_COLS
+                 else pa.int64() if c == "count" else pa.string())
+                for c in columns
+            ])
+            self._pq = pq.ParquetWriter(out / f"{name}.parquet", self.schema)
+            self._buf = [[] for _ in columns]
+
+    def write(self, row: list) -> None:
+        self._csv.writerow(row)
+        if self._buf is None:
+            return
+        for col, v in zip(self._buf, row):
+            col.append(v)
+        if len(self._buf[0]) >= self.batch_rows:
+            self._flush()
+
+    def _flush(self) -> None:
+        if not self._buf[0]:
+            return
+        arrays = []
+        for c, vals, field in zip(self.columns, self._buf, self.schema):
+            if c == "count":
+                vals = [v if v != "" else None for v in vals]
+            elif field.type != pa.int64():
+                vals = [None if v is None else str(v) for v in vals]
+            arrays.append(pa.array(vals, type=field.type))
+        self._pq.write_table(pa.Table.from_arrays(arrays, schema=self.schema))
+        self._buf = [[] for _ in self.columns]
+
+    def close(self) -> None:
+        if self._pq is not None:
+            self._flush()
+            self._pq.close()
+        self._f.close()
+
+
+def main(argv=None):
     ap = argparse.ArgumentParser()
     ap.add_argument("--root", default="data/corpus")
     ap.add_argument("--glob", default="**/*.md")
     ap.add_argument("--out", default="outputs/vocab")
-    ap.add_argument("--min-phrase-freq", type=int, default=2)
-    a = ap.parse_args()
-
-    rows_terms, rows_phr = [], []
-    for p in Path(a.root).glob(a.glob):
-        txt = p.read_text(encoding="utf-8", errors="ignore")
-        kind, front, body = split_front(txt)
-        meta = parse_meta(kind, front or "")
-        stds = meta.get("standards", [])
-        cls = meta.get("clauses", [])
-        doc_id = meta.get("id", "")
-        # seed terms/phrases
-        seed_terms = meta.get("terms", [])
-        seed_phr = meta.get("phrases", [])
-        toks = mine_tokens(body)
-        bi = bigrams(toks)
-        for t in set(seed_terms) | set(toks):
-            rows_terms.append(["|".join(stds), "|".join(cls), t, doc_id, str(p)])
-        # count bigrams
-        from collections import Counter
-        bi_cnt = Counter(bi)
-        for ph, c in bi_cnt.items():
-            if c >= a.min_phrase_freq:
-                rows_phr.append(["|".join(stds), "|".join(cls), ph, "freq", c, doc_id, str(p)])
-        for ph in set(seed_phr):
-            rows_phr.append(["|".join(stds), "|".join(cls), ph, "curated", "", doc_id, str(p)])
-
-    Path(a.out).mkdir(parents=True, exist_ok=True)
-    pd.DataFrame(rows_terms, columns=["standards","clauses","term","doc_id","path"]).drop_duplicates().to_csv(Path(a.out)/"terms.csv", index=False)
-    pd.DataFrame(rows_phr, columns=["standards","clauses","phrase","method","count","doc_id","path"]).drop_duplicates().to_csv(Path(a.out)/"phrases.csv", index=False)
+    ap.add_argument("--config", default=str(DEFAULT_CONFIG), help="TOML config ([mining] section)")
+    ap.add_argument("--min-phrase-freq", type=int, default=None, help="Per-document bigram floor (default: [mining] min_freq)")
+    ap.add_argument("--max-ngram", type=int, default=4, help="Longest n-gram for PMI phrase mining (<2 disables)")
+    ap.add_argument("--corpus-cache", default=DEFAULT_CACHE, help="Parsed-corpus cache (SQLite); '' = in-memory")
+    ap.add_argument("--lemmatize", action=argparse.BooleanOptionalAction, default=None,
+                    help="Stem tokens before mining (default: [mining] lemmatize_default)")
+    ap.add_argument("--workers", type=int, default=1, help="Process pool size for mining (1 = serial)")
+    ap.add_argument("--incremental", action="store_true", help="Reuse cached results for unchanged files")
+    ap.add_argument("--parquet", action="store_true", help="Also write terms/phrases as Parquet")
+    instrument.add_arguments(ap)
+    a = ap.parse_args(argv)
+    if a.parquet and pa is None:
+        ap.error("--parquet requires pyarrow (pip install pyarrow)")
+    mining = load_config(Path(a.config)).get("mining", {})
+    if a.min_phrase_freq is None:
+        a.min_phrase_freq = int(mining.get("min_freq", 2))
+    if a.lemmatize is None:
+        a.lemmatize = bool(mining.get("lemmatize_default", False))
+
+    metrics = instrument.from_args(a, "build_vocab")
+    with metrics.stage("discover"):
+        files = list(Path(a.root).glob(a.glob))
+    # mining is lazy, so "mine" covers read/parse/tokenize and the row writers
+    with metrics.stage("mine"):
+        if a.incremental:
+            results, stats = mine_incremental(files, Path(a.out), a.min_phrase_freq, a.workers, a.lemmatize,
+                                              a.corpus_cache)
+            print("incremental: mined={mined} reused={reused} deleted={deleted}".format(**stats))
+        else:
+            results = iter_mined(files, a.min_phrase_freq, a.workers, a.lemmatize, a.corpus_cache)
+        Path(a.out).mkdir(parents=True, exist_ok=True)
+        w_terms = RowWriter(Path(a.out), "terms", TERM_COLS, a.parquet)
+        w_phr = RowWriter(Path(a.out), "phrases", PHRASE_COLS, a.parquet)
+        index = TermStdIndex()
+        miner = PhraseMiner(a.max_ngram) if a.max_ngram >= 2 else None
+        lemma_hits = lemma_misses = 0
+        for r in results:
+            hits, misses = r.pop("lemma_cache", (0, 0))
+            lemma_hits += hits; lemma_misses += misses
+            if "perf" in r:
+                metrics.merge_file(r.pop("perf"))
+            stds, cls = "|".join(r["standards"]), "|".join(r["clauses"])
+            doc_id, path = r["doc_id"], r["path"]
+            for t in r["terms"]:
+                w_terms.write([stds, cls, t, doc_id, path])
+            index.add(r["terms"], stds.split("|"))
+            if miner is not None:
+                miner.add(r["terms"], r["tokens"], r["clauses"])
+            for ph, c in r["bigrams"]:
+                w_phr.write([stds, cls, ph, "freq", c, doc_id, path])
+            for ph in r["curated"]:
+                w_phr.write([stds, cls, ph, "curated", "", doc_id, path])
+        w_terms.close()
+        w_phr.close()
+
+    if miner is not None:
+        with metrics.stage("pmi"), open(Path(a.out)/"phrases_pmi.csv", "w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            w.writerow(["clause", "phrase", "n", "count", "corpus_count", "pmi", "npmi"])
+            w.writerows(miner.mine(int(mining.get("min_freq", 2)), float(mining.get("pmi_threshold", 3.0)),
+                                   int(mining.get("max_phrases_per_clause", 15))))
+
+    if a.lemmatize and lemma_hits + lemma_misses:
+        rate = lemma_hits / (lemma_hits + lemma_misses)
+        print(f"lemmatize: cache hits={lemma_hits} misses={lemma_misses} hit rate={rate:.1%}")
 
     # uniques and overlaps
-    df = pd.read_csv(Path(a.out)/"terms.csv")
-    by_std = {}
-    for _, row in df.iterrows():
-        for s in str(row["standards"]).split("|"):
-            if not s or s == "nan":
-                continue
-            by_std.setdefault(s, set()).add(row["term"])
-    all_stds = sorted(by_std.keys())
-    with open(Path(a.out)/"unique_terms_by_standard.csv", "w", newline="", encoding="utf-8") as f:
-        w = csv.writer(f); w.writerow(["standard","term"])
-        for s in all_stds:
-            others = set().union(*(by_std[o] for o in all_stds if o!=s))
-            for t in sorted(by_std[s] - others):
-                w.writerow([s, t])
-    with open(Path(a.out)/"overlap_jaccard.csv", "w", newline="", encoding="utf-8") as f:
-        w = csv.writer(f); w.writerow(["standard"] + all_stds)
-        for astd in all_stds:
-            row = [astd]
-            for bstd in all_stds:
-                ua, ub = by_std[astd], by_std[bstd]
-                j = len(ua & ub) / len(ua | ub) if ua | ub else 0.0
-                row.append(f"{j:.4f}")
-            w.writerow(row)
+    with metrics.stage("overlap"):
+        m = index.matrix()
+        all_stds = index.standards()
+        with open(Path(a.out)/"unique_terms_by_standard.csv", "w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f); w.writerow(["standard","term"])
+            for s, terms in index.uniques(m).items():
+                for t in terms:
+                    w.writerow([s, t])
+        jac = index.jaccard(m)
+        with open(Path(a.out)/"overlap_jaccard.csv", "w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f); w.writerow(["standard"] + all_stds)
+            for astd, jrow in zip(all_stds, jac):
+                w.writerow([astd] + [f"{j:.4f}" for j in jrow])
+    instrument.finish(metrics)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Cluster synonym candidates among mined terms and phrases by embedding cosine.
+- Reads terms.csv, phrases.csv and phrases_pmi.csv written by build_vocab.py.
+- Embeds each distinct term/phrase with a pluggable embedder
+  (tools/common/embedders.py). The default "hashing" embedder uses signed,
+  hashed character trigrams, so it runs offline and is deterministic.
+- Cosine similarity is computed tile by tile with blocked NumPy matrix
+  products (never a Python pair loop); pairs at or above [embeddings]
+  cosine_accept are merged with union-find.
+- Writes synonyms.csv (one row per member of every cluster of size >= 2).
+
+The stage honours tools/config/config.toml: with [embeddings] use = false it
+exits without doing anything unless --force is given. --profile and
+--metrics-json time the read, embed, cluster and write stages
+(tools/common/instrument.py).
+
+Usage:
+  python tools/analyze/cluster_synonyms.py --in outputs/vocab --out outputs/vocab
+  python tools/analyze/cluster_synonyms.py --in outputs/vocab --force --embedder mypkg.embed:Embedder
+
+Custom embedders are given as module:attr; attr is called with no arguments
+and must return an object with embed(list[str]) -> float32 array (n, dim).
+
+Dependencies: numpy
+"""
+from __future__ import annotations
+import argparse, csv, sys
+from collections import Counter
+from pathlib import Path
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common import instrument  # noqa: E402
+from common.config import load_config  # noqa: E402
+from common.embedders import load_embedder, normalize_rows  # noqa: E402
+
+DEFAULT_CONFIG = Path(__file__).resolve().parents[1] / "config" / "config.toml"
+INPUTS = (("terms.csv", "term"), ("phrases.csv", "phrase"), ("phrases_pmi.csv", "phrase"))
+
+
+def read_vocab(inp: Path) -> Counter:
+    """Document frequency (rows) per distinct term/phrase across the inputs."""
+    freq = Counter()
+    for name, col in INPUTS:
+        if not (inp / name).exists():
+            continue
+        with open(inp / name, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                v = (row.get(col) or "").strip()
+                if v:
+                    freq[v] += 1
+    return freq
+
+
+def similar_pairs(x: np.ndarray, threshold: float, block: int = 4096):
+    """Yield (i, j, cos) with i < j and cos >= threshold, one tile at a time."""
+    n = len(x)
+    for i0 in range(0, n, block):
+        a = x[i0:i0 + block]
+        for j0 in range(i0, n, block):
+            sims = a @ x[j0:j0 + block].T
+            if j0 == i0:
+                sims = np.triu(sims, k=1)
+            ii, jj = np.nonzero(sims >= threshold)
+            for i, j, c in zip((ii + i0).tolist(), (jj + j0).tolist(), sims[ii, jj].tolist()):
+                yield i, j, c
+
+
+class UnionFind:
+    def __init__(self, n: int):
+        self.parent = list(range(n))
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i: int, j: int) -> None:
+        ri, rj = self.find(i), self.find(j)
+        if ri != rj:
+            self.parent[max(ri, rj)] = min(ri, rj)
+
+
+def cluster(texts: list[str], freq: Counter, x: np.ndarray, threshold: float, block: int):
+    """Return rows [cluster, canonical, member, cosine_to_canonical, freq]."""
+    uf = UnionFind(len(texts))
+    for i, j, _ in similar_pairs(x, threshold, block):
+        uf.union(i, j)
+    groups: dict[int, list[int]] = {}
+    for i in range(len(texts)):
+        groups.setdefault(uf.find(i), []).append(i)
+    rows = []
+    clusters = [g for g in groups.values() if len(g) > 1]
+    # canonical member: most frequent, then shortest, then alphabetical
+    clusters = [sorted(g, key=lambda i: (-freq[texts[i]], len(texts[i]), texts[i])) for g in clusters]
+    clusters.sort(key=lambda g: texts[g[0]])
+    for cid, g in enumerate(clusters, 1):
+        canon = g[0]
+        cos = x[g] @ x[canon]
+        for i, c in zip(g, cos.tolist()):
+            rows.append([cid, texts[canon], texts[i], f"{c:.4f}", freq[texts[i]]])
+    return rows
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--in", dest="inp", default="outputs/vocab")
+    ap.add_argument("--out", dest="out", default="outputs/vocab")
+    ap.add_argument("--config", default=str(DEFAULT_CONFIG), help="TOML config ([embeddings] section)")
+    ap.add_argument("--embedder", default="hashing", help="'hashing' or module:attr")
+    ap.add_argument("--dim", type=int, default=512, help="Dimension for the hashing embedder")
+    ap.add_argument("--block-size", type=int, default=4096, help="Tile size for blocked cosine products")
+    ap.add_argument("--cosine-accept", type=float, default=None, help="Override [embeddings] cosine_accept")
+    ap.add_argument("--force", action="store_true", help="Run even if [embeddings] use = false")
+    instrument.add_arguments(ap)
+    a = ap.parse_args(argv)
+
+    cfg = load_config(Path(a.config)).get("embeddings", {})
+    if not cfg.get("use", False) and not a.force:
+        print("Embeddings disabled ([embeddings] use = false); pass --force to run anyway.")
+        return
+    threshold = a.cosine_accept if a.cosine_accept is not None else float(cfg.get("cosine_accept", 0.80))
+
+    metrics = instrument.from_args(a, "cluster_synonyms")
+    with metrics.stage("read"):
+        freq = read_vocab(Path(a.inp))
+    if not freq:
+        print("No terms or phrases found in", a.inp)
+        instrument.finish(metrics)
+        sys.exit(1)
+    texts = sorted(freq)
+    with metrics.stage("embed"):
+        x = normalize_rows(np.asarray(load_embedder(a.embedder, a.dim).embed(texts), dtype=np.float32))
+    with metrics.stage("cluster"):
+        rows = cluster(texts, freq, x, threshold, a.block_size)
+
+    out = Path(a.out)
+    out.mkdir(parents=True, exist_ok=True)
+    with metrics.stage("write"), open(out/"synonyms.csv", "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["cluster", "canonical", "member", "cosine", "freq"])
+        w.writerows(rows)
+    metrics.counters.update(texts=len(texts), members=len(rows))
+    instrument.finish(metrics)
+    n_clusters = rows[-1][0] if rows else 0
+    print(f"Wrote {out/'synonyms.csv'}: {n_clusters} clusters over {len(texts)} terms/phrases")
+
+if __name__ == "__main__":
+    main()
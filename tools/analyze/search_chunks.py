@@ -0,0 +1,478 @@
+#!/usr/bin/env python3
+"""
+Search an export_chunks.py export the way match_chunks_with_context does, in process.
+
+Same semantics as match_chunks_with_context in
+ai-backend/supabase_migrations/schemas/supabase_vector_schema_final.sql:
+- org_context: industry_secondary, business_context.company_size (1-10/11-50
+  -> small, 51-200/201-500 -> medium, anything else -> large),
+  business_context.geographic_presence.countries and applicable_frameworks.
+- context_relevance_score = 0.3 industry + 0.3 size + 0.2 geography (overlap,
+  or 'global' in scope) + 0.2 frameworks, matched against the document's
+  content_metadata lists.
+- Rows need cosine distance < 1 - match_threshold and a relevant context:
+  industry (or 'general'), size (or 'all') or geography.
+- Order by distance * 0.7 + (1 - context_relevance_score) * 0.3; the
+  "similarity" column is the cosine distance, as in the SQL.
+
+The embedding matrix (embeddings.f32) is memory-mapped, never loaded whole.
+Each document's content_metadata is parsed once into per-facet bitmasks (one
+bit per distinct value), so a query's context filter and score are a few
+vectorized AND operations per document instead of a JSON parse per row.
+
+Indexes (--index):
+  brute  exact: block-wise matrix-vector products over the memmap
+  hnsw   approximate: an HNSW graph (m, ef_construction as in the schema's
+         index) built on first use and saved beside the export; a query
+         takes the --ef-search nearest chunks and filters and scores only
+         those, like an index scan with a filter on top, so it can return
+         fewer or different rows than the exact scan
+  ivfflat approximate: k-means centroids (--lists, as in the schema's
+         index) with every chunk filed under its nearest one; a query
+         filters and scores the chunks of the --probes nearest lists
+
+Query text is embedded with the embedder named in the export's manifest
+("hashing" unless --embedder is given; it must produce the same model).
+
+Usage:
+  python tools/analyze/search_chunks.py --in outputs/chunks --query "access review frequency"
+  python tools/analyze/search_chunks.py --query "breach notification" --context org.json --threshold 0.1
+  python tools/analyze/search_chunks.py --queries queries.txt --index hnsw --ef-search 100 --format json
+  python tools/analyze/search_chunks.py --query "risk owner" --index ivfflat --lists 100 --probes 10
+
+Dependencies: numpy, pandas
+"""
+from __future__ import annotations
+import argparse, hashlib, heapq, json, math, sys
+from dataclasses import dataclass, field
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common import instrument  # noqa: E402
+from common.embedders import load_embedder, normalize_rows  # noqa: E402
+
+FACETS = ("industry_relevance", "company_size_applicability", "geographic_scope", "frameworks")
+SIZE_BUCKETS = {"1-10": "small", "11-50": "small", "51-200": "medium", "201-500": "medium"}
+DISTANCE_WEIGHT, CONTEXT_WEIGHT = 0.7, 0.3
+BLOCK_ROWS = 65_536  # rows of the memmap per matrix-vector product
+
+
+@dataclass
+class OrgContext:
+    industry: str | None = None
+    size: str = "large"
+    geography: list[str] = field(default_factory=list)
+    frameworks: list[str] = field(default_factory=list)
+
+    @classmethod
+    def from_json(cls, ctx: dict | None) -> "OrgContext":
+        ctx = ctx or {}
+        business = ctx.get("business_context") or {}
+        countries = (business.get("geographic_presence") or {}).get("countries") or []
+        return cls(ctx.get("industry_secondary"), SIZE_BUCKETS.get(business.get("company_size"), "large"),
+                   [str(c) for c in countries], [str(f) for f in ctx.get("applicable_frameworks") or []])
+
+
+def as_list(value) -> list[str]:
+    if value is None:
+        return []
+    return [str(v) for v in value] if isinstance(value, list) else [str(value)]
+
+
+class FacetMasks:
+    """One content_metadata list facet as a bitmask per document."""
+
+    def __init__(self, values_per_doc: list[list[str]]):
+        self.bits = {v: i for i, v in enumerate(sorted({v for vs in values_per_doc for v in vs}))}
+        self.masks = np.zeros((len(values_per_doc), max(1, -(-len(self.bits) // 64))), dtype=np.uint64)
+        for d, vs in enumerate(values_per_doc):
+            for v in vs:
+                b = self.bits[v]
+                self.masks[d, b >> 6] |= np.uint64(1 << (b & 63))
+
+    def any(self, values) -> np.ndarray:
+        """Per document: does the facet contain any of values?"""
+        q = np.zeros(self.masks.shape[1], dtype=np.uint64)
+        for v in values:
+            b = self.bits.get(v)
+            if b is not None:
+                q[b >> 6] |= np.uint64(1 << (b & 63))
+        return (self.masks & q).any(axis=1)
+
+
+class HNSWIndex:
+    """HNSW graph over unit-length rows (cosine distance = 1 - dot), after pgvector's hnsw index.
+
+    Layer 0 keeps up to 2*m links per node, upper layers m; neighbours are
+    chosen with the paper's heuristic. Python/NumPy: one vectorized distance
+    computation per visited node.
+    """
+
+    def __init__(self, vectors, m: int = 32, ef_construction: int = 128, seed: int = 0):
+        self.vectors, self.m, self.ef_construction = vectors, m, ef_construction
+        self.ml = 1 / math.log(m)
+        self.rng = np.random.default_rng(seed)
+        self.node_level: list[int] = []
+        self.links: list[dict[int, list[int]]] = []
+        self.entry, self.max_level = -1, -1
+
+    def __len__(self) -> int:
+        return len(self.node_level)
+
+    def build(self) -> "HNSWIndex":
+        for i in range(len(self), len(self.vectors)):
+            self.add(i)
+        return self
+
+    def _dists(self, q: np.ndarray, ids: list[int]) -> list[float]:
+        return (1.0 - self.vectors[ids] @ q).tolist()
+
+    def _search_layer(self, q, entry: list[tuple[float, int]], ef: int, level: int) -> list[tuple[float, int]]:
+        links = self.links[level]
+        visited = {i for _, i in entry}
+        cand = list(entry)
+        heapq.heapify(cand)
+        res = [(-d, i) for d, i in entry]
+        heapq.heapify(res)
+        while cand:
+            d, i = heapq.heappop(cand)
+            if d > -res[0][0] and len(res) >= ef:
+                break
+            new = [j for j in links[i] if j not in visited]
+            if not new:
+                continue
+            visited.update(new)
+            worst = -res[0][0]
+            for dj, j in zip(self._dists(q, new), new):
+                if len(res) < ef or dj < worst:
+                    heapq.heappush(cand, (dj, j))
+                    heapq.heappush(res, (-dj, j))
+                    if len(res) > ef:
+                        heapq.heappop(res)
+                    worst = -res[0][0]
+        return sorted((-d, i) for d, i in res)
+
+    def _select(self, found: list[tuple[float, int]], m: int) -> list[int]:
+        """Keep a candidate only if it is closer to the base than to every kept one."""
+        if len(found) <= m:
+            return [i for _, i in found]
+        ids = [i for _, i in found]
+        vecs = self.vectors[ids]
+        pair = 1.0 - vecs @ vecs.T
+        kept = []
+        for a, (d, _) in enumerate(found):
+            if not kept or (pair[a, kept] > d).all():
+                kept.append(a)
+                if len(kept) == m:
+                    break
+        return [ids[a] for a in kept]
+
+    def add(self, i: int) -> None:
+        q = np.asarray(self.vectors[i], dtype=np.float32)
+        level = int(-math.log(1.0 - self.rng.random()) * self.ml)
+        self.node_level.append(level)
+        while len(self.links) <= level:
+            self.links.append({})
+        for lv in range(level + 1):
+            self.links[lv][i] = []
+        if self.entry < 0:
+            self.entry, self.max_level = i, level
+            return
+        ep = [(self._dists(q, [self.entry])[0], self.entry)]
+        for lv in range(self.max_level, level, -1):
+            ep = self._search_layer(q, ep, 1, lv)[:1]
+        for lv in range(min(level, self.max_level), -1, -1):
+            found = [(d, j) for d, j in self._search_layer(q, ep, self.ef_construction, lv) if j != i]
+            mmax = 2 * self.m if lv == 0 else self.m
+            self.links[lv][i] = self._select(found, mmax)
+            for j in self.links[lv][i]:
+                nbrs = self.links[lv][j]
+                nbrs.append(i)
+                if len(nbrs) > mmax:
+                    dists = self._dists(np.asarray(self.vectors[j], dtype=np.float32), nbrs)
+                    self.links[lv][j] = self._select(sorted(zip(dists, nbrs)), mmax)
+            ep = found or ep
+        if level > self.max_level:
+            self.entry, self.max_level = i, level
+
+    def search(self, q: np.ndarray, k: int, ef_search: int = 40) -> tuple[np.ndarray, np.ndarray]:
+        """(row ids, cosine distances) of up to k approximate nearest rows, nearest first."""
+        if self.entry < 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        q = np.asarray(q, dtype=np.float32)
+        ep = [(self._dists(q, [self.entry])[0], self.entry)]
+        for lv in range(self.max_level, 0, -1):
+            ep = self._search_layer(q, ep, 1, lv)
+        found = self._search_layer(q, ep, max(ef_search, k), 0)[:k]
+        return (np.array([i for _, i in found], dtype=np.int64), np.array([d for d, _ in found], dtype=np.float32))
+
+    def save(self, path: Path, source: str = "") -> None:
+        arrays = {"meta": np.array([self.m, self.ef_construction, self.entry, self.max_level], dtype=np.int64),
+                  "node_level": np.array(self.node_level, dtype=np.int32), "source": np.array(source)}
+        for lv, links in enumerate(self.links):
+            nodes = sorted(links)
+            arrays[f"nodes{lv}"] = np.array(nodes, dtype=np.int32)
+            arrays[f"offsets{lv}"] = np.cumsum([0] + [len(links[n]) for n in nodes]).astype(np.int64)
+            arrays[f"links{lv}"] = np.array([j for n in nodes for j in links[n]], dtype=np.int32)
+        tmp = path.with_name(path.name + ".tmp.npz")
+        np.savez(tmp, **arrays)
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: Path, vectors, source: str = "") -> "HNSWIndex | None":
+        """The saved index, or None if it is missing or was built from other data."""
+        try:
+            z = np.load(path)
+        except (OSError, ValueError):
+            return None
+        if str(z["source"]) != source or len(z["node_level"]) != len(vectors):
+            return None
+        m, efc, entry, max_level = (int(x) for x in z["meta"])
+        index = cls(vectors, m, efc)
+        index.entry, index.max_level = entry, max_level
+        index.node_level = z["node_level"].tolist()
+        for lv in range(max_level + 1):
+            nodes, offsets, links = z[f"nodes{lv}"].tolist(), z[f"offsets{lv}"].tolist(), z[f"links{lv}"].tolist()
+            index.links.append({n: links[offsets[k]:offsets[k + 1]] for k, n in enumerate(nodes)})
+        return index
+
+
+class IVFFlatIndex:
+    """Inverted lists over unit-length rows, after pgvector's ivfflat index.
+
+    Centroids come from spherical k-means (k-means++ seeding) on a sample of
+    50 rows per list, as pgvector samples; every row is then filed under its
+    nearest centroid, and a query scans the rows of the `probes` nearest lists.
+    """
+
+    def __init__(self, vectors, lists: int = 100, seed: int = 0, iterations: int = 20):
+        self.vectors, self.lists, self.iterations = vectors, lists, iterations
+        self.rng = np.random.default_rng(seed)
+        self.centroids = np.empty((0, vectors.shape[1]), dtype=np.float32)
+        self.order = np.empty(0, dtype=np.int64)
+        self.offsets = np.zeros(1, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def _kmeans(self, sample: np.ndarray, k: int) -> np.ndarray:
+        centroids = [sample[self.rng.integers(len(sample))]]
+        nearest = 1.0 - sample @ centroids[0]
+        for _ in range(1, k):
+            w = np.maximum(nearest, 0).astype(np.float64)
+            c = sample[self.rng.choice(len(sample), p=w / w.sum()) if w.sum() > 0 else self.rng.integers(len(sample))]
+            centroids.append(c)
+            nearest = np.minimum(nearest, 1.0 - sample @ c)
+        centroids = np.array(centroids, dtype=np.float32)
+        for _ in range(self.iterations):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, sample)
+            filled = np.bincount(assign, minlength=k) > 0
+            updated = centroids.copy()
+            updated[filled] = normalize_rows(sums[filled])
+            if np.array_equal(updated, centroids):
+                break
+            centroids = updated
+        return centroids
+
+    def build(self) -> "IVFFlatIndex":
+        n = len(self.vectors)
+        k = max(1, min(self.lists, n))
+        rows = np.sort(self.rng.choice(n, min(n, 50 * k), replace=False))
+        self.centroids = self._kmeans(np.asarray(self.vectors[rows], dtype=np.float32), k)
+        assign = np.concatenate([np.argmax(np.asarray(self.vectors[s:s + BLOCK_ROWS]) @ self.centroids.T, axis=1)
+                                 for s in range(0, n, BLOCK_ROWS)]) if n else np.empty(0, dtype=np.int64)
+        self.order = np.argsort(assign, kind="stable")
+        self.offsets = np.searchsorted(assign[self.order], np.arange(k + 1))
+        return self
+
+    def search(self, q: np.ndarray, k: int | None, probes: int = 1) -> tuple[np.ndarray, np.ndarray]:
+        """(row ids, cosine distances) of the k nearest rows in the probed lists (all of them for k=None)."""
+        if not len(self.order):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        q = np.asarray(q, dtype=np.float32)
+        sims = self.centroids @ q
+        probes = min(max(probes, 1), len(self.centroids))
+        near = np.argpartition(-sims, probes - 1)[:probes]
+        rows = np.sort(np.concatenate([self.order[self.offsets[c]:self.offsets[c + 1]] for c in near]))
+        dists = 1.0 - self.vectors[rows] @ q
+        top = np.lexsort((rows, dists))
+        if k is not None:
+            top = top[:k]
+        return rows[top], dists[top]
+
+    def save(self, path: Path, source: str = "") -> None:
+        tmp = path.with_name(path.name + ".tmp.npz")
+        np.savez(tmp, centroids=self.centroids, order=self.order, offsets=self.offsets, source=np.array(source))
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: Path, vectors, source: str = "") -> "IVFFlatIndex | None":
+        """The saved index, or None if it is missing or was built from other data."""
+        try:
+            z = np.load(path)
+        except (OSError, ValueError):
+            return None
+        if str(z["source"]) != source or len(z["order"]) != len(vectors):
+            return None
+        index = cls(vectors, len(z["centroids"]))
+        index.centroids, index.order, index.offsets = z["centroids"], z["order"], z["offsets"]
+        return index
+
+
+class ChunkSearch:
+    """An export_chunks.py export opened for search."""
+
+    def __init__(self, export: Path):
+        self.export = Path(export)
+        self.manifest = json.loads((self.export/"manifest.json").read_text(encoding="utf-8"))
+        n, dim = self.manifest["chunks"], self.manifest["dim"]
+        self.vectors = np.memmap(self.export/"embeddings.f32", dtype=np.float32, mode="r", shape=(n, dim))
+        self.chunks = pd.read_csv(self.export/"chunks.csv", usecols=["id", "document_id", "content", "chunk_metadata"],
+                                  dtype=str, keep_default_na=False)
+        self.docs = pd.read_csv(self.export/"documents.csv", usecols=["id", "title", "content_metadata"],
+                                dtype=str, keep_default_na=False)
+        if len(self.chunks) != n:
+            raise ValueError(f"{self.export}: chunks.csv has {len(self.chunks)} rows, manifest says {n}")
+        doc_row = pd.Series(np.arange(len(self.docs)), index=self.docs["id"])
+        self.doc_of = doc_row.reindex(self.chunks["document_id"]).fillna(-1).to_numpy(np.int64)
+        self.doc_meta = [json.loads(m or "{}") for m in self.docs["content_metadata"]]
+        self.facets = {f: FacetMasks([as_list(m.get(f)) for m in self.doc_meta]) for f in FACETS}
+        # chunks without a known document never match (the SQL's inner join)
+        self.has_doc = self.doc_of >= 0
+        self.doc_of = np.where(self.has_doc, self.doc_of, 0)
+        # saved indexes are valid for these vectors only: same chunks, model and dimension
+        m = self.manifest
+        self.source = hashlib.sha256("\n".join([m["embedding_model"], str(m["dim"]), *m["hashes"]])
+                                     .encode()).hexdigest()
+
+    def context(self, org: OrgContext) -> tuple[np.ndarray, np.ndarray]:
+        """(context_relevance_score, passes the context filter) per document."""
+        f = self.facets
+        industry = f["industry_relevance"].any([org.industry]) if org.industry is not None else \
+            np.zeros(len(self.docs), dtype=bool)
+        size = f["company_size_applicability"].any([org.size])
+        geo = f["geographic_scope"].any(org.geography + ["global"])
+        frameworks = f["frameworks"].any(org.frameworks)
+        score = 0.3 * industry + 0.3 * size + 0.2 * geo + 0.2 * frameworks
+        allowed = (industry | f["industry_relevance"].any(["general"]) | size
+                   | f["company_size_applicability"].any(["all"]) | geo)
+        return score, allowed
+
+    def hnsw(self, m: int = 32, ef_construction: int = 128) -> HNSWIndex:
+        """The HNSW index of this export, loaded from disk or built and saved."""
+        path = self.export/f"hnsw_m{m}_efc{ef_construction}.npz"
+        index = HNSWIndex.load(path, self.vectors, self.source)
+        if index is None:
+            index = HNSWIndex(self.vectors, m, ef_construction).build()
+            index.save(path, self.source)
+        return index
+
+    def ivfflat(self, lists: int = 100) -> IVFFlatIndex:
+        """The IVFFlat index of this export, loaded from disk or built and saved."""
+        path = self.export/f"ivfflat_l{lists}.npz"
+        index = IVFFlatIndex.load(path, self.vectors, self.source)
+        if index is None:
+            index = IVFFlatIndex(self.vectors, lists).build()
+            index.save(path, self.source)
+        return index
+
+    def _score(self, rows: np.ndarray, dists: np.ndarray, score, allowed, threshold: float):
+        doc = self.doc_of[rows]
+        ok = (dists < 1 - threshold) & allowed[doc] & self.has_doc[rows]
+        rows, dists, doc = rows[ok], dists[ok], doc[ok]
+        return rows, dists, dists * DISTANCE_WEIGHT + (1 - score[doc]) * CONTEXT_WEIGHT
+
+    def search(self, query: np.ndarray, org: OrgContext | None = None, threshold: float = 0.7, count: int = 10,
+               index: HNSWIndex | IVFFlatIndex | None = None, ef_search: int = 40, probes: int = 1) -> list[dict]:
+        """match_chunks_with_context for one query vector; exact unless an index is given."""
+        q = normalize_rows(np.asarray(query, dtype=np.float32).reshape(1, -1))[0]
+        score, allowed = self.context(org or OrgContext())
+        if index is not None:
+            rows, dists = index.search(q, ef_search, ef_search) if isinstance(index, HNSWIndex) else \
+                index.search(q, None, probes)
+            rows, dists, combined = self._score(rows, dists.astype(np.float64), score, allowed, threshold)
+        else:
+            parts = []
+            for s in range(0, len(self.vectors), BLOCK_ROWS):
+                block = np.asarray(self.vectors[s:s + BLOCK_ROWS])
+                dists = 1.0 - (block @ q).astype(np.float64)
+                part = self._score(np.arange(s, s + len(block)), dists, score, allowed, threshold)
+                if len(part[0]) > count:
+                    top = np.lexsort((part[0], part[2]))[:count]
+                    part = tuple(x[top] for x in part)
+                parts.append(part)
+            rows, dists, combined = (np.concatenate(x) for x in zip(*parts)) if parts else \
+                (np.empty(0, np.int64), np.empty(0), np.empty(0))
+        order = np.lexsort((rows, combined))[:count]
+        out = []
+        for r, d in zip(rows[order].tolist(), dists[order].tolist()):
+            chunk, doc = self.chunks.iloc[r], self.doc_of[r]
+            out.append({"chunk_id": chunk["id"], "document_id": chunk["document_id"], "content": chunk["content"],
+                        "document_title": self.docs["title"].iat[doc], "similarity": d,
+                        "content_metadata": self.doc_meta[doc], "chunk_metadata": json.loads(chunk["chunk_metadata"] or "{}"),
+                        "context_relevance_score": float(score[doc])})
+        return out
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--in", dest="inp", default="outputs/chunks", help="export_chunks.py output folder")
+    ap.add_argument("--query", action="append", default=[], help="Query text (repeatable)")
+    ap.add_argument("--queries", default=None, help="File with one query per line")
+    ap.add_argument("--context", default=None, help="org_context JSON, inline or a file path")
+    ap.add_argument("--threshold", type=float, default=0.7, help="match_threshold (cosine similarity)")
+    ap.add_argument("--count", type=int, default=10, help="match_count")
+    ap.add_argument("--index", choices=("brute", "hnsw", "ivfflat"), default="brute")
+    ap.add_argument("--m", type=int, default=32)
+    ap.add_argument("--ef-construction", type=int, default=128)
+    ap.add_argument("--ef-search", type=int, default=40)
+    ap.add_argument("--lists", type=int, default=100)
+    ap.add_argument("--probes", type=int, default=1)
+    ap.add_argument("--embedder", default=None, help="Query embedder (default: from the manifest)")
+    ap.add_argument("--format", choices=("text", "json"), default="text")
+    instrument.add_arguments(ap)
+    a = ap.parse_args(argv)
+    metrics = instrument.from_args(a, "search_chunks")
+
+    queries = list(a.query)
+    if a.queries:
+        queries += [q.strip() for q in Path(a.queries).read_text(encoding="utf-8").splitlines() if q.strip()]
+    if not queries:
+        ap.error("give --query or --queries")
+    ctx = {}
+    if a.context:
+        ctx = json.loads(Path(a.context).read_text(encoding="utf-8") if Path(a.context).is_file() else a.context)
+
+    with metrics.stage("load"):
+        engine = ChunkSearch(Path(a.inp))
+        model, dim = engine.manifest["embedding_model"], engine.manifest["dim"]
+        spec = a.embedder or ("hashing" if model.startswith("hashing") else model)
+        embedder = load_embedder(spec, dim)
+        if (getattr(embedder, "model", None) or spec) != model:
+            raise SystemExit(f"embedder {getattr(embedder, 'model', None) or spec!r} does not match the export ({model!r})")
+    with metrics.stage("index"):
+        index = engine.hnsw(a.m, a.ef_construction) if a.index == "hnsw" else \
+            engine.ivfflat(a.lists) if a.index == "ivfflat" else None
+    with metrics.stage("search"):
+        vectors = np.asarray(embedder.embed(queries), dtype=np.float32)
+        org = OrgContext.from_json(ctx)
+        results = [engine.search(v, org, a.threshold, a.count, index, a.ef_search, a.probes) for v in vectors]
+        metrics.count("queries", len(queries))
+
+    for query, matches in zip(queries, results):
+        if a.format == "json":
+            print(json.dumps({"query": query, "matches": matches}, ensure_ascii=False))
+            continue
+        print(f"## {query} ({len(matches)} matches)")
+        for m in matches:
+            snippet = " ".join(m["content"].split())[:160]
+            print(f"  {m['similarity']:.4f}  ctx {m['context_relevance_score']:.1f}  {m['document_title']}: {snippet}")
+        print()
+    instrument.finish(metrics)
+
+if __name__ == "__main__":
+    main()
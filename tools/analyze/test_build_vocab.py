@@ -0,0 +1,26 @@
+"""Checks for build_vocab.py (run with: python -m pytest tools/analyze/test_build_vocab.py)."""
+import numpy as np
+
+from build_vocab import PhraseMiner
+
+
+def test_npmi_stays_within_bounds_on_short_documents():
+    # many short documents: n-gram positions are far fewer than tokens
+    rng = np.random.default_rng(0)
+    miner = PhraseMiner(max_n=4)
+    words = ["access", "control", "review", "risk", "owner", "policy"]
+    for i in range(300):
+        n = int(rng.integers(2, 6))
+        miner.add(words, rng.integers(0, len(words), size=n), [f"A.{i % 7}"])
+    miner.add(["access", "control"], [0, 1], ["A.0"])
+    rows = miner.mine(min_freq=1, pmi_threshold=-100.0, top_k=1000)
+    npmi = np.array([float(r[6]) for r in rows])
+    assert len(npmi) and npmi.max() <= 1.0 and npmi.min() >= -1.0
+
+
+def test_npmi_is_one_for_words_only_seen_together():
+    miner = PhraseMiner(max_n=2)
+    for _ in range(5):
+        miner.add(["data", "breach", "x", "y"], [0, 1, 2, 3], ["A.1"])
+    rows = {r[1]: float(r[6]) for r in miner.mine(min_freq=1, pmi_threshold=-100.0, top_k=10)}
+    assert rows["data breach"] == 1.0
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Benchmark the preprocessing and analysis tools on a synthetic corpus.
+
+For every --sizes entry a deterministic corpus is generated (synth_corpus.py,
+cached under --work-dir) and each benchmark is run --repeat times. Wall time
+is reported as min and median; peak Python heap is measured in one extra run
+under tracemalloc so it does not distort the timings.
+
+Benchmarks:
+  split_front          common.corpus.split_front over preloaded texts
+  parse_meta_yaml      YAML front-matter parse (libyaml loader when available)
+  parse_meta_toml      TOML front-matter parse
+  normalize_text       body normalization
+  mine_tokens_bigrams  build_vocab.mine_tokens + bigrams
+  uniques_jaccard      build_vocab.TermStdIndex -> uniques + Jaccard matrix
+  validate_file        split_qas/validatefiles.validate_file on YAML documents
+  build_vocab          build_vocab.py end to end (cold corpus cache)
+  generate_reports     generate_reports.py over the build_vocab output
+
+Results are written as JSON (--out). With --baseline, each (bench, size) is
+compared against a saved results file and the run exits 1 if any time or
+peak memory grew by more than --tolerance.
+
+Usage:
+  python tools/bench/run_benchmarks.py --sizes 1000,10000 --out outputs/bench/results.json
+  python tools/bench/run_benchmarks.py --sizes 1000 --baseline outputs/bench/baseline.json
+"""
+from __future__ import annotations
+import argparse, contextlib, io, json, platform, shutil, statistics, sys, time, tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+TOOLS = Path(__file__).resolve().parents[1]
+REPO = TOOLS.parent
+for sub in ("", "bench", "analyze", "export"):
+    sys.path.insert(0, str(TOOLS / sub))
+sys.path.insert(0, str(REPO / "docs" / "InputDocs" / "QuestionsAnswers" / "split_qas"))
+
+import build_vocab  # noqa: E402
+import generate_reports  # noqa: E402
+import synth_corpus  # noqa: E402
+import validatefiles  # noqa: E402
+from common.corpus import normalize_text, parse_meta, read_text, split_front  # noqa: E402
+
+BENCHES = ["split_front", "parse_meta_yaml", "parse_meta_toml", "normalize_text",
+           "mine_tokens_bigrams", "uniques_jaccard", "validate_file", "build_vocab", "generate_reports"]
+
+
+def prepare(paths: list[Path], work: Path) -> dict:
+    texts = [read_text(p) for p in paths]
+    split = [split_front(t) for t in texts]
+    mined = []
+    for (kind, front, body) in split:
+        meta = parse_meta(kind, front or "")
+        mined.append((sorted(set(build_vocab.mine_tokens(body))), meta.get("standards", [])))
+    return {
+        "paths": paths,
+        "texts": texts,
+        "bodies": [b for _, _, b in split],
+        "fronts": {k: [f for kind, f, _ in split if kind == k] for k in ("yaml", "toml")},
+        "yaml_paths": [str(p) for p, (kind, _, _) in zip(paths, split) if kind == "yaml"],
+        "mined": mined,
+        "work": work,
+        "root": paths[0].parents[1] if paths else work,
+    }
+
+
+def quiet(fn, *args):
+    with contextlib.redirect_stdout(io.StringIO()):
+        try:
+            fn(*args)
+        except SystemExit:
+            pass
+
+
+def bench_fn(name: str, ctx: dict, rep: int):
+    """Return (callable, items processed)."""
+    if name == "split_front":
+        return (lambda: [split_front(t) for t in ctx["texts"]]), len(ctx["texts"])
+    if name in ("parse_meta_yaml", "parse_meta_toml"):
+        kind = name.rsplit("_", 1)[1]
+        fronts = ctx["fronts"][kind]
+        return (lambda: [parse_meta(kind, f) for f in fronts]), len(fronts)
+    if name == "normalize_text":
+        return (lambda: [normalize_text(b) for b in ctx["bodies"]]), len(ctx["bodies"])
+    if name == "mine_tokens_bigrams":
+        return (lambda: [build_vocab.bigrams(build_vocab.mine_tokens(b)) for b in ctx["bodies"]]), len(ctx["bodies"])
+    if name == "uniques_jaccard":
+        def run():
+            index = build_vocab.TermStdIndex()
+            for terms, stds in ctx["mined"]:
+                index.add(terms, stds)
+            m = index.matrix()
+            index.uniques(m)
+            index.jaccard(m)
+        return run, len(ctx["mined"])
+    if name == "validate_file":
+        return (lambda: [validatefiles.validate_file(p) for p in ctx["yaml_paths"]]), len(ctx["yaml_paths"])
+    vocab = ctx["work"] / "vocab"
+    if name == "build_vocab":
+        cache = ctx["work"] / f"corpus-{rep}.sqlite"
+        for suffix in ("", "-wal", "-shm"):
+            Path(f"{cache}{suffix}").unlink(missing_ok=True)
+        argv = ["--root", str(ctx["root"]), "--out", str(vocab), "--corpus-cache", str(cache)]
+        return (lambda: quiet(build_vocab.main, argv)), len(ctx["paths"])
+    if name == "generate_reports":
+        if not (vocab / "terms.csv").exists():
+            quiet(build_vocab.main, ["--root", str(ctx["root"]), "--out", str(vocab), "--corpus-cache", ""])
+        argv = ["--in", str(vocab), "--out", str(ctx["work"] / "reports")]
+        return (lambda: quiet(generate_reports.main, argv)), len(ctx["paths"])
+    raise ValueError(f"unknown benchmark {name}")
+
+
+def measure(name: str, ctx: dict, repeat: int, memory: bool) -> dict:
+    times = []
+    items = 0
+    for rep in range(repeat):
+        fn, items = bench_fn(name, ctx, rep)
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    peak = None
+    if memory:
+        fn, _ = bench_fn(name, ctx, repeat)
+        tracemalloc.start()
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    best = min(times)
+    return {"bench": name, "items": items, "seconds": round(best, 6),
+            "median_seconds": round(statistics.median(times), 6),
+            "items_per_sec": round(items / best, 1) if best else None, "peak_bytes": peak}
+
+
+def compare(results: list[dict], baseline: list[dict], tolerance: float) -> list[str]:
+    base = {(r["bench"], r["size"]): r for r in baseline}
+    regressions = []
+    print(f"\n{'bench':<22}{'size':>8}{'time x':>9}{'mem x':>9}")
+    for r in results:
+        b = base.get((r["bench"], r["size"]))
+        if not b:
+            continue
+        t = r["seconds"] / b["seconds"] if b["seconds"] else 1.0
+        m = r["peak_bytes"] / b["peak_bytes"] if r["peak_bytes"] and b.get("peak_bytes") else None
+        flag = ""
+        if t > tolerance or (m is not None and m > tolerance):
+            flag = "  REGRESSION"
+            regressions.append(f"{r['bench']}@{r['size']}")
+        mem = f"{m:9.2f}" if m is not None else f"{'-':>9}"
+        print(f"{r['bench']:<22}{r['size']:>8}{t:9.2f}{mem}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", default="1000", help="Comma-separated corpus sizes (e.g. 1000,10000,100000)")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--seed", type=int, default=1234)
+    ap.add_argument("--only", default="", help=f"Comma-separated subset of: {','.join(BENCHES)}")
+    ap.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc peak-memory run")
+    ap.add_argument("--work-dir", default="outputs/bench")
+    ap.add_argument("--out", default="outputs/bench/results.json")
+    ap.add_argument("--baseline", default=None, help="Saved results JSON to compare against")
+    ap.add_argument("--tolerance", type=float, default=1.25, help="Allowed time/memory ratio vs baseline")
+    a = ap.parse_args(argv)
+
+    names = [n for n in a.only.split(",") if n] or BENCHES
+    unknown = set(names) - set(BENCHES)
+    if unknown:
+        ap.error(f"unknown benchmarks: {sorted(unknown)}")
+    work = Path(a.work_dir)
+    results = []
+    for size in (int(s) for s in a.sizes.split(",")):
+        corpus = work / f"corpus-{size}-{a.seed}"
+        paths = synth_corpus.generate(corpus, size, a.seed)
+        run_dir = work / f"run-{size}"
+        shutil.rmtree(run_dir, ignore_errors=True)
+        run_dir.mkdir(parents=True)
+        ctx = prepare(paths, run_dir)
+        for name in names:
+            r = measure(name, ctx, a.repeat, not a.no_memory)
+            r["size"] = size
+            results.append(r)
+            mem = f"{r['peak_bytes'] / 2**20:8.1f} MiB" if r["peak_bytes"] is not None else ""
+            print(f"{name:<22}{size:>8}{r['seconds']:10.3f}s {r['items_per_sec'] or 0:12.0f}/s {mem}")
+
+    doc = {
+        "meta": {"timestamp": datetime.now(timezone.utc).isoformat(), "python": platform.python_version(),
+                 "platform": platform.platform(), "seed": a.seed, "repeat": a.repeat},
+        "results": results,
+    }
+    out = Path(a.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(doc, indent=2), encoding="utf-8")
+    print("Wrote", out)
+
+    if a.baseline:
+        baseline = json.loads(Path(a.baseline).read_text(encoding="utf-8"))["results"]
+        regressions = compare(results, baseline, a.tolerance)
+        if regressions:
+            print("Regressions:", ", ".join(regressions))
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
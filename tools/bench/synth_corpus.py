@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Deterministic synthetic Q&A corpus for benchmarking the tools/ scripts.
+
+Documents are shaped like docs/InputDocs/QuestionsAnswers/split_qas/Q*.md:
+front matter with id/query/packs/primary_ids/overlap_ids/capability_tags/
+sources/ui/output_mode (plus standards/clauses for build_vocab.py), followed
+by the nine authoring-guide body sections. Even-numbered documents use YAML
+(---) front matter and odd-numbered ones TOML (+++). The same --seed and
+--size always produce byte-identical files.
+
+Usage:
+  python tools/bench/synth_corpus.py --out /tmp/qa-synth-1000 --size 1000
+"""
+from __future__ import annotations
+import argparse, json, random
+from pathlib import Path
+
+PACKS = {
+    "ISO27001:2022": ["4.1", "5.2", "6.1.2", "6.1.3", "8.2", "9.2", "A.5.15", "A.5.23", "A.8.8", "A.8.16"],
+    "ISO27701:2019": ["5.2.1", "6.2", "7.2.8", "8.4.2"],
+    "GDPR:2016": ["Art.5", "Art.6", "Art.28", "Art.30", "Art.32", "Art.33", "Art.35"],
+    "NIS2:2023": ["Art.20", "Art.21", "Art.23"],
+    "EUAI:2024": ["Art.6", "Art.9", "Art.10", "Art.13"],
+    "CPRA:2023": ["1798.100", "1798.105", "1798.185"],
+}
+CAPABILITIES = ["NL-Portal", "Draft Doc", "Approval", "Versioning", "Register", "Tracker", "Workflow",
+                "Reminder", "Planner", "Dashboard", "Report", "Virtual Manager", "Classify-Assist",
+                "Evidence-Guided"]
+ACTIONS = [("open_register", "risk"), ("open_register", "soa"), ("open_register", "ropa"),
+           ("start_workflow", "risk_assessment"), ("start_workflow", "dpia"),
+           ("open_tracker", "cap_nc"), ("upload_evidence", "access_review_logs")]
+WORDS = ("access control risk register statement applicability supplier incident breach notification "
+         "processing activity record lawful basis consent retention encryption key management audit "
+         "evidence policy procedure review management asset inventory classification training awareness "
+         "vulnerability patch backup recovery continuity impact assessment transfer safeguard processor "
+         "controller data subject request logging monitoring objective scope leadership competence "
+         "documented information nonconformity corrective action improvement threat intelligence").split()
+SECTIONS = ["Standard term(s)", "Plain-English answer", "Applies to", "Why it matters",
+            "Do next in our platform", "How our platform will help", "Likely follow-ups", "Sources"]
+
+
+def sentence(rng: random.Random, n: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(n)).capitalize() + "."
+
+
+def make_doc(i: int, rng: random.Random) -> tuple[dict, str]:
+    packs = rng.sample(sorted(PACKS), rng.randint(1, 3))
+    ids = [f"{p}/{rng.choice(PACKS[p])}" for p in packs]
+    overlap = [f"{p}/{rng.choice(PACKS[p])}" for p in rng.sample(sorted(PACKS), 2)]
+    query = sentence(rng, rng.randint(6, 14))[:-1] + "?"
+    meta = {
+        "id": f"Q{i:06d}",
+        "query": query,
+        "packs": packs,
+        "standards": [p.split(":")[0] for p in packs],
+        "clauses": ids,
+        "primary_ids": ids,
+        "overlap_ids": overlap,
+        "capability_tags": rng.sample(CAPABILITIES, rng.randint(3, 6)),
+        "flags": [],
+        "sources": [{"title": f"{p} {c}", "id": f"{p}/{c}", "locator": f"Clause {c}"}
+                    for p, c in (x.split("/", 1) for x in ids)],
+        "ui": {
+            "cards_hint": [sentence(rng, 3)[:40] for _ in range(2)],
+            "actions": [{"type": t, "target": g, "label": f"Open {g}"}
+                        for t, g in rng.sample(ACTIONS, 2)],
+        },
+        "output_mode": rng.choice(["cards", "prose", "both"]),
+        "graph_required": rng.random() < 0.3,
+        "notes": sentence(rng, 8),
+    }
+    body = [f"### {i}) {query}", ""]
+    for sec in SECTIONS:
+        body.append(f"**{sec}**")
+        if sec == "Sources":
+            body += [f"- {x}" for x in ids]
+        elif sec in ("Plain-English answer", "Why it matters"):
+            body.append(" ".join(sentence(rng, rng.randint(8, 20)) for _ in range(rng.randint(3, 8))))
+        else:
+            body += [f"- {sentence(rng, rng.randint(5, 15))}" for _ in range(rng.randint(2, 5))]
+        body.append("")
+    return meta, "\n".join(body)
+
+
+def to_yaml(meta: dict) -> str:
+    # JSON scalars are valid YAML flow scalars, which keeps this dependency-free
+    out = []
+    for k, v in meta.items():
+        if isinstance(v, list) and v and isinstance(v[0], dict):
+            out.append(f"{k}:")
+            for item in v:
+                first = True
+                for ik, iv in item.items():
+                    out.append(f"  {'- ' if first else '  '}{ik}: {json.dumps(iv, ensure_ascii=False)}")
+                    first = False
+        elif isinstance(v, dict):
+            out.append(f"{k}:")
+            for ik, iv in v.items():
+                if isinstance(iv, list) and iv and isinstance(iv[0], dict):
+                    out.append(f"  {ik}:")
+                    for item in iv:
+                        pre = "    - "
+                        for iik, iiv in item.items():
+                            out.append(f"{pre}{iik}: {json.dumps(iiv, ensure_ascii=False)}")
+                            pre = "      "
+                else:
+                    out.append(f"  {ik}: {json.dumps(iv, ensure_ascii=False)}")
+        else:
+            out.append(f"{k}: {json.dumps(v, ensure_ascii=False)}")
+    return "\n".join(out)
+
+
+def to_toml(meta: dict) -> str:
+    # JSON strings/arrays/booleans are valid TOML values for this flat data
+    top, tables = [], []
+    for k, v in meta.items():
+        if isinstance(v, list) and v and isinstance(v[0], dict):
+            for item in v:
+                tables.append(f"\n[[{k}]]")
+                tables += [f"{ik} = {json.dumps(iv, ensure_ascii=False)}" for ik, iv in item.items()]
+        elif isinstance(v, dict):
+            tables.append(f"\n[{k}]")
+            for ik, iv in v.items():
+                if isinstance(iv, list) and iv and isinstance(iv[0], dict):
+                    for item in iv:
+                        tables.append(f"\n[[{k}.{ik}]]")
+                        tables += [f"{iik} = {json.dumps(iiv, ensure_ascii=False)}"
+                                   for iik, iiv in item.items()]
+                else:
+                    tables.append(f"{ik} = {json.dumps(iv, ensure_ascii=False)}")
+        else:
+            top.append(f"{k} = {json.dumps(v, ensure_ascii=False)}")
+    return "\n".join(top + tables)
+
+
+def render(i: int, rng: random.Random) -> str:
+    meta, body = make_doc(i, rng)
+    if i % 2 == 0:
+        return f"---\n{to_yaml(meta)}\n---\n{body}"
+    return f"+++\n{to_toml(meta)}\n+++\n{body}"
+
+
+def generate(out: Path, size: int, seed: int = 1234) -> list[Path]:
+    """Write size documents under out (100 per subfolder); reuse a matching corpus."""
+    marker = out / ".synth.json"
+    spec = {"size": size, "seed": seed}
+    paths = [out / f"d{i // 100:04d}" / f"Q{i:06d}.md" for i in range(size)]
+    if marker.exists() and json.loads(marker.read_text(encoding="utf-8")) == spec:
+        return paths
+    rng = random.Random(seed)
+    for i, p in enumerate(paths):
+        p.parent.mkdir(parents=True, exist_ok=True)
+        p.write_text(render(i, rng), encoding="utf-8")
+    marker.write_text(json.dumps(spec), encoding="utf-8")
+    return paths
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--out", required=True)
+    ap.add_argument("--size", type=int, default=1000)
+    ap.add_argument("--seed", type=int, default=1234)
+    a = ap.parse_args(argv)
+    paths = generate(Path(a.out), a.size, a.seed)
+    print(f"{len(paths)} documents in {a.out}")
+
+if __name__ == "__main__":
+    main()
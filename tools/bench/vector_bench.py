@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Recall/latency benchmark of the HNSW and IVFFlat index choices for vector_chunks.embedding.
+
+The vector schema creates both `hnsw (m = 32, ef_construction = 128)` and
+`ivfflat (lists = 100)` on vector_chunks.embedding (cosine). This harness
+builds the Python equivalents from tools/analyze/search_chunks.py (same
+parameters; graph and list construction modelled on pgvector's) over one
+embedding set and sweeps the query-time knobs:
+  hnsw     --ef-search values (hnsw.ef_search; pgvector default 40)
+  ivfflat  --probes values    (ivfflat.probes; pgvector default 1)
+
+Embeddings: an export_chunks.py export (--export DIR, embeddings.f32) or a
+synthetic clustered set of unit vectors (--n, --dim, --clusters, --spread).
+--queries vectors are held out of the index and used as queries; ground
+truth is the exact top --k by cosine distance.
+
+Reported per setting: recall@k against the exact search, p50/p95/p99
+single-query latency; per index: build time, peak Python heap during the
+build (one extra build under tracemalloc, --no-memory to skip) and the
+compact size of the index structure (links or lists and centroids; both
+pgvector indexes also hold a copy of every vector, given once as
+vector_bytes). The exact scan is timed too, as the baseline.
+
+Results are written as JSON (--out) and as Markdown tables (--md).
+
+Usage:
+  python tools/bench/vector_bench.py --n 10000 --out outputs/bench/vector_index.json
+  python tools/bench/vector_bench.py --export outputs/chunks --ef-search 20,40,80 --probes 1,5,10
+"""
+from __future__ import annotations
+import argparse, json, platform, sys, time, tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+import numpy as np
+
+TOOLS = Path(__file__).resolve().parents[1]
+for sub in ("", "analyze"):
+    sys.path.insert(0, str(TOOLS / sub))
+
+import search_chunks  # noqa: E402
+from common.embedders import normalize_rows  # noqa: E402
+
+WARMUP = 5
+
+
+def synthetic(n: int, dim: int, clusters: int, seed: int, spread: float = 1.0) -> np.ndarray:
+    """Unit vectors around `clusters` random centres plus a direction shared by all.
+
+    The shared direction gives the positive background similarity of real text
+    embeddings (median cosine ~0.15); spread is the noise norm relative to
+    the centre.
+    """
+    rng = np.random.default_rng(seed)
+    centres = normalize_rows(rng.standard_normal((clusters, dim)).astype(np.float32))
+    shared = normalize_rows(rng.standard_normal((1, dim)).astype(np.float32))[0]
+    x = centres[rng.integers(clusters, size=n)] + np.float32(0.6) * shared
+    x += rng.standard_normal((n, dim)).astype(np.float32) * np.float32(spread / np.sqrt(dim))
+    return normalize_rows(x)
+
+
+def load_vectors(a) -> tuple[np.ndarray, str]:
+    if a.export:
+        manifest = json.loads((Path(a.export)/"manifest.json").read_text(encoding="utf-8"))
+        x = np.fromfile(Path(a.export)/"embeddings.f32", dtype=np.float32).reshape(manifest["chunks"], manifest["dim"])
+        return normalize_rows(x), f"{a.export} ({manifest['embedding_model']})"
+    return (synthetic(a.n + a.queries, a.dim, a.clusters, a.seed, a.spread),
+            f"synthetic ({a.clusters} clusters, spread {a.spread})")
+
+
+def exact_topk(base: np.ndarray, queries: np.ndarray, k: int) -> list[np.ndarray]:
+    out = []
+    for q in queries:
+        d = 1.0 - base @ q
+        out.append(np.lexsort((np.arange(len(d)), d))[:k])
+    return out
+
+
+def percentiles(ms: list[float]) -> dict:
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {"p50_ms": round(float(p50), 3), "p95_ms": round(float(p95), 3), "p99_ms": round(float(p99), 3)}
+
+
+def run_queries(fn, queries: np.ndarray, truth: list[np.ndarray], k: int) -> dict:
+    for q in queries[:WARMUP]:
+        fn(q)
+    ms, hits = [], 0
+    for q, t in zip(queries, truth):
+        t0 = time.perf_counter()
+        ids = fn(q)
+        ms.append((time.perf_counter() - t0) * 1000)
+        hits += len(np.intersect1d(ids[:k], t))
+    return {"recall_at_k": round(hits / (k * len(queries)), 4), **percentiles(ms),
+            "qps": round(len(ms) / (sum(ms) / 1000), 1)}
+
+
+def index_bytes(index) -> int:
+    """Size of the index structure in compact arrays (int32 links, float32 centroids)."""
+    if isinstance(index, search_chunks.HNSWIndex):
+        links = sum(len(nbrs) for level in index.links for nbrs in level.values())
+        nodes = sum(len(level) for level in index.links)
+        return 4 * (links + len(index)) + 12 * nodes
+    return int(index.centroids.nbytes + 4 * len(index.order) + 8 * len(index.offsets))
+
+
+def build(make, memory: bool) -> tuple[object, dict]:
+    t0 = time.perf_counter()
+    index = make().build()
+    stats = {"build_seconds": round(time.perf_counter() - t0, 3), "index_bytes": index_bytes(index),
+             "build_peak_bytes": None}
+    if memory:
+        tracemalloc.start()
+        make().build()
+        stats["build_peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return index, stats
+
+
+def mib(n) -> str:
+    return f"{n / 2**20:.1f}" if n is not None else "-"
+
+
+def render_md(doc: dict) -> str:
+    m = doc["meta"]
+    md = ["# Vector index benchmark\n",
+          f"{m['vectors']} vectors x {m['dim']} dims from {m['source']}; {m['queries']} held-out queries, "
+          f"recall@{m['k']} against exact cosine search; vectors {mib(m['vector_bytes'])} MiB "
+          f"(held by both pgvector index types).\n",
+          "## Build\n", "| index | parameters | build s | peak heap MiB | index MiB |", "|---|---|---:|---:|---:|"]
+    for name, b in doc["build"].items():
+        params = ", ".join(f"{k} = {v}" for k, v in b["params"].items())
+        md.append(f"| {name} | {params} | {b['build_seconds']:.2f} | {mib(b['build_peak_bytes'])} | "
+                  f"{mib(b['index_bytes'])} |")
+    md.append("")
+    for name, knob in (("hnsw", "ef_search"), ("ivfflat", "probes")):
+        rows = [r for r in doc["results"] if r["index"] == name]
+        if not rows:
+            continue
+        md += [f"## {name} ({knob})\n", f"| {knob} | recall@{m['k']} | p50 ms | p95 ms | p99 ms | qps |",
+               "|---:|---:|---:|---:|---:|---:|"]
+        md += [f"| {r[knob]} | {r['recall_at_k']:.3f} | {r['p50_ms']:.2f} | {r['p95_ms']:.2f} | {r['p99_ms']:.2f} | "
+               f"{r['qps']:.0f} |" for r in rows]
+        md.append("")
+    e = doc["exact"]
+    md += ["## Exact scan\n", "| p50 ms | p95 ms | p99 ms | qps |", "|---:|---:|---:|---:|",
+           f"| {e['p50_ms']:.2f} | {e['p95_ms']:.2f} | {e['p99_ms']:.2f} | {e['qps']:.0f} |", ""]
+    return "\n".join(md)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--export", default=None, help="export_chunks.py output folder (default: synthetic vectors)")
+    ap.add_argument("--n", type=int, default=10_000, help="Synthetic vectors in the index")
+    ap.add_argument("--dim", type=int, default=1536)
+    ap.add_argument("--clusters", type=int, default=500)
+    ap.add_argument("--spread", type=float, default=1.0, help="Synthetic noise relative to the cluster centre")
+    ap.add_argument("--queries", type=int, default=200, help="Held-out query vectors")
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--seed", type=int, default=1234)
+    ap.add_argument("--m", type=int, default=32)
+    ap.add_argument("--ef-construction", type=int, default=128)
+    ap.add_argument("--ef-search", default="10,20,40,80,160,320", help="Comma-separated hnsw.ef_search values")
+    ap.add_argument("--lists", type=int, default=100)
+    ap.add_argument("--probes", default="1,2,4,8,16,32", help="Comma-separated ivfflat.probes values")
+    ap.add_argument("--only", choices=("hnsw", "ivfflat"), default=None)
+    ap.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc build run")
+    ap.add_argument("--out", default="outputs/bench/vector_index.json")
+    ap.add_argument("--md", default=None, help="Markdown report (default: --out with .md)")
+    a = ap.parse_args(argv)
+
+    vectors, source = load_vectors(a)
+    if len(vectors) <= a.queries:
+        ap.error(f"need more than --queries ({a.queries}) vectors, have {len(vectors)}")
+    held = np.random.default_rng(a.seed).permutation(len(vectors))
+    queries, base = vectors[np.sort(held[:a.queries])], np.ascontiguousarray(vectors[np.sort(held[a.queries:])])
+    truth = exact_topk(base, queries, a.k)
+    print(f"{len(base)} vectors x {base.shape[1]}, {len(queries)} queries, k={a.k}")
+
+    results, builds = [], {}
+    exact = run_queries(lambda q: np.argpartition(base @ -q, a.k)[:a.k], queries, truth, a.k)
+    print(f"{'exact':<8}{'':>12} recall {exact['recall_at_k']:.3f}  p50 {exact['p50_ms']:.2f} ms")
+    if a.only in (None, "hnsw"):
+        index, stats = build(lambda: search_chunks.HNSWIndex(base, a.m, a.ef_construction, a.seed), not a.no_memory)
+        builds["hnsw"] = {"params": {"m": a.m, "ef_construction": a.ef_construction}, **stats}
+        print(f"hnsw built in {stats['build_seconds']:.1f}s")
+        for ef in (int(x) for x in a.ef_search.split(",")):
+            r = {"index": "hnsw", "ef_search": ef, **run_queries(lambda q: index.search(q, a.k, ef)[0],
+                                                                 queries, truth, a.k)}
+            results.append(r)
+            print(f"{'hnsw':<8}{'ef=' + str(ef):>12} recall {r['recall_at_k']:.3f}  p50 {r['p50_ms']:.2f} ms")
+    if a.only in (None, "ivfflat"):
+        index, stats = build(lambda: search_chunks.IVFFlatIndex(base, a.lists, a.seed), not a.no_memory)
+        builds["ivfflat"] = {"params": {"lists": a.lists}, **stats}
+        print(f"ivfflat built in {stats['build_seconds']:.1f}s")
+        for probes in (int(x) for x in a.probes.split(",")):
+            r = {"index": "ivfflat", "probes": probes, **run_queries(lambda q: index.search(q, a.k, probes)[0],
+                                                                     queries, truth, a.k)}
+            results.append(r)
+            print(f"{'ivfflat':<8}{'probes=' + str(probes):>12} recall {r['recall_at_k']:.3f}  "
+                  f"p50 {r['p50_ms']:.2f} ms")
+
+    doc = {
+        "meta": {"timestamp": datetime.now(timezone.utc).isoformat(), "python": platform.python_version(),
+                 "platform": platform.platform(), "seed": a.seed, "source": source, "vectors": len(base),
+                 "dim": int(base.shape[1]), "queries": len(queries), "k": a.k, "vector_bytes": int(base.nbytes)},
+        "build": builds,
+        "exact": exact,
+        "results": results,
+    }
+    out = Path(a.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(doc, indent=2), encoding="utf-8")
+    md = Path(a.md) if a.md else out.with_suffix(".md")
+    md.write_text(render_md(doc), encoding="utf-8")
+    print("Wrote", out, "and", md)
+
+if __name__ == "__main__":
+    main()
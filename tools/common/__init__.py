@@ -0,0 +1 @@
+"""Shared helpers for the scripts under tools/."""
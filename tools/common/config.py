@@ -0,0 +1,20 @@
+"""
+Tool settings from tools/config/config.toml, shared by the scripts that read it.
+
+Dependencies: tomli on py<3.11
+"""
+from __future__ import annotations
+from pathlib import Path
+try:
+    import tomllib as tomli  # py311+
+except Exception:
+    import tomli
+
+
+def load_config(path: str | Path) -> dict:
+    """The parsed TOML file, or {} if it does not exist."""
+    try:
+        with open(path, "rb") as f:
+            return tomli.load(f)
+    except FileNotFoundError:
+        return {}
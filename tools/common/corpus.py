@@ -0,0 +1,318 @@
+"""
+Shared front-matter parsing and a persistent parsed-corpus cache.
+
+Every tool under tools/ reads Markdown files with YAML (--- ... ---) or TOML
+(+++ ... +++) front matter. This module holds the single implementation of
+the fence split, the metadata parse and body normalization, plus a SQLite
+cache keyed on path + mtime + size + sha256 so a file is parsed at most once
+across tools and runs.
+
+Cached per file: front-matter kind, parsed metadata (JSON), front/body
+offsets, parse error (if any) and, once requested, the normalized body.
+A stat() that matches the cached mtime/size is a hit without reading the
+file; otherwise the file is hashed and only re-parsed if its content changed.
+File reads and YAML/TOML parses are reported to common.instrument, so
+--metrics-json shows I/O and parse time separately.
+
+With keep_docs=True (used by tools/run_pipeline.py) parsed Doc objects,
+including their text once read, are also kept in memory, so stages running in
+the same process hand documents to each other without touching the disk.
+
+Usage from a script under tools/<stage>/:
+  sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+  from common.corpus import shared_cache
+  cache = shared_cache(a.corpus_cache)
+  doc = cache.get(path)        # doc.kind, doc.meta, doc.body()
+
+Dependencies: pyyaml (uses the libyaml CSafeLoader when available), tomli on py<3.11
+"""
+from __future__ import annotations
+import hashlib, json, os, re, sqlite3, time, unicodedata
+from dataclasses import dataclass, field
+from pathlib import Path
+import yaml
+from . import instrument
+try:
+    import tomllib as tomli  # py311+
+except Exception:
+    import tomli
+
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+FENCES = {"---": "yaml", "+++": "toml"}
+DEFAULT_CACHE = "outputs/cache/corpus.sqlite"
+SCHEMA_VERSION = 1
+HEADER_CHUNK = 8192
+HEADER_LIMIT = 1 << 20
+NORM_WORD = re.compile(r"[a-z0-9\-]+")
+
+
+def locate_front(text: str):
+    """Return (kind, front_end, body_start).
+
+    kind is None without an opening fence; front_end is None when the closing
+    fence is missing. The front matter is text[4:front_end] and the body
+    starts at body_start.
+    """
+    fence = text[:3]
+    kind = FENCES.get(fence)
+    if kind is None:
+        return (None, None, 0)
+    end = text.find("\n" + fence, 3)
+    if end == -1:
+        return (kind, None, 0)
+    return (kind, end, text.find("\n", end + 4) + 1)
+
+
+def split_front(text: str):
+    """Return (kind, front, body); (kind, None, text) if the fence is unterminated."""
+    kind, end, start = locate_front(text)
+    if kind is None or end is None:
+        return (kind, None, text)
+    return (kind, text[4:end], text[start:])
+
+
+def parse_meta(kind: str | None, front: str) -> dict:
+    if kind == "yaml":
+        return yaml.load(front, Loader=YAML_LOADER) or {}
+    if kind == "toml":
+        return tomli.loads(front) or {}
+    return {}
+
+
+def normalize_text(t: str) -> str:
+    """Lowercase, ASCII fold, keep [a-z0-9-] words joined by single spaces."""
+    # NFKD + ASCII fold is the identity on pure-ASCII text, which most bodies are
+    if not t.isascii():
+        t = unicodedata.normalize("NFKD", t).encode("ascii", "ignore").decode("ascii")
+    t = t.lower()
+    return " ".join(NORM_WORD.findall(t))
+
+
+def decode(raw: bytes) -> str:
+    """Same result as Path.read_text(encoding="utf-8", errors="ignore")."""
+    return raw.decode("utf-8", errors="ignore").replace("\r\n", "\n").replace("\r", "\n")
+
+
+def read_text(p: Path) -> str:
+    return decode(read_bytes(p))
+
+
+def read_bytes(p: Path) -> bytes:
+    t0 = time.perf_counter()
+    raw = p.read_bytes()
+    instrument.note_read(len(raw), time.perf_counter() - t0)
+    return raw
+
+
+def read_header(p: Path, chunk: int = HEADER_CHUNK, limit: int = HEADER_LIMIT) -> str:
+    """Text of p up to the end of its closing front-matter fence line.
+
+    Reads in chunks and stops at the closing fence, so long bodies are never
+    read. Without an opening fence only the first chunk is read; an
+    unterminated block is returned as read (up to limit bytes), and
+    locate_front() reports it as such.
+    """
+    t0 = time.perf_counter()
+    with open(p, "rb") as f:
+        buf = f.read(chunk)
+        fence = buf[:3]
+        if fence.decode("ascii", "ignore") in FENCES:
+            needle, scanned = b"\n" + fence, 3
+            while True:
+                end = buf.find(needle, scanned)
+                if end != -1:
+                    nl = buf.find(b"\n", end + 4)
+                    if nl != -1:
+                        buf = buf[:nl + 1]
+                        break
+                else:
+                    scanned = max(3, len(buf) - len(needle))
+                more = f.read(chunk) if len(buf) < limit else b""
+                if not more:
+                    break
+                buf += more
+    instrument.note_read(len(buf), time.perf_counter() - t0)
+    return decode(buf)
+
+
+def _json_safe(meta) -> dict:
+    # dates and other YAML scalars become strings, same as after a cache round-trip
+    return json.loads(json.dumps(meta, default=str))
+
+
+@dataclass
+class Doc:
+    path: Path
+    kind: str | None
+    meta: dict
+    front_end: int | None
+    body_start: int
+    sha256: str
+    error: str | None = None
+    text: str | None = field(default=None, repr=False)
+
+    @property
+    def has_front(self) -> bool:
+        """True if the file has a terminated front-matter block."""
+        return self.kind is not None and self.front_end is not None
+
+    def read(self) -> str:
+        if self.text is None:
+            self.text = read_text(self.path)
+        return self.text
+
+    def front(self) -> str | None:
+        return self.read()[4:self.front_end] if self.has_front else None
+
+    def body(self) -> str:
+        return self.read()[self.body_start:] if self.has_front else self.read()
+
+    def check(self) -> "Doc":
+        """Raise the original parse error, if any."""
+        if self.error:
+            raise ValueError(self.error)
+        return self
+
+
+def parse_doc(p: Path, text: str, sha256: str = "") -> Doc:
+    kind, end, start = locate_front(text)
+    meta, error = {}, None
+    if kind is not None and end is not None:
+        t0 = time.perf_counter()
+        try:
+            meta = parse_meta(kind, text[4:end])
+            if not isinstance(meta, dict):
+                meta = {"_frontmatter": meta}
+            meta = _json_safe(meta)
+        except Exception as e:
+            error = f"{kind} parse error: {e}"
+        instrument.note_parse(kind, time.perf_counter() - t0)
+    return Doc(p, kind, meta, end, start, sha256, error, text)
+
+
+class CorpusCache:
+    """SQLite-backed cache of parsed documents. path=None keeps it in memory."""
+
+    def __init__(self, path: str | Path | None = DEFAULT_CACHE, keep_docs: bool = False):
+        if path:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(path) if path else ":memory:", timeout=60)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        row = self.db.execute("SELECT value FROM meta WHERE key='schema'").fetchone()
+        if row is None or int(row[0]) != SCHEMA_VERSION:
+            self.db.execute("DROP TABLE IF EXISTS docs")
+            self.db.execute("INSERT OR REPLACE INTO meta VALUES ('schema', ?)", (str(SCHEMA_VERSION),))
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS docs ("
+            " path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER, sha256 TEXT,"
+            " kind TEXT, meta TEXT, front_end INTEGER, body_start INTEGER,"
+            " error TEXT, norm TEXT)"
+        )
+        self.db.commit()
+        self.hits = self.misses = 0
+        self.docs: dict[str, tuple[tuple[int, int], Doc]] | None = {} if keep_docs else None
+
+    def close(self) -> None:
+        self.db.commit()
+        self.db.close()
+
+    def _row(self, p: Path):
+        return self.db.execute(
+            "SELECT mtime_ns, size, sha256, kind, meta, front_end, body_start, error"
+            " FROM docs WHERE path=?", (str(p),)).fetchone()
+
+    def _store(self, p: Path, st: os.stat_result, doc: Doc) -> None:
+        self.db.execute(
+            "INSERT OR REPLACE INTO docs VALUES (?,?,?,?,?,?,?,?,?,NULL)",
+            (str(p), st.st_mtime_ns, st.st_size, doc.sha256, doc.kind, json.dumps(doc.meta),
+             doc.front_end, doc.body_start, doc.error))
+        self.db.commit()
+
+    def get(self, p: Path) -> Doc:
+        """Parsed document; reads the file only if its stat signature changed."""
+        p = Path(p)
+        st = p.stat()
+        sig = (st.st_mtime_ns, st.st_size)
+        if self.docs is not None:
+            kept = self.docs.get(str(p))
+            if kept and kept[0] == sig:
+                self.hits += 1
+                return kept[1]
+        doc = self._get(p, st)
+        if self.docs is not None:
+            self.docs[str(p)] = (sig, doc)
+        return doc
+
+    def peek(self, p: Path) -> Doc | None:
+        """Cached document if p's stat signature is unchanged, else None; never reads p."""
+        p = Path(p)
+        st = p.stat()
+        if self.docs is not None:
+            kept = self.docs.get(str(p))
+            if kept and kept[0] == (st.st_mtime_ns, st.st_size):
+                self.hits += 1
+                return kept[1]
+        row = self._row(p)
+        if row and row[0] == st.st_mtime_ns and row[1] == st.st_size:
+            self.hits += 1
+            return Doc(p, row[3], json.loads(row[4]), row[5], row[6], row[2], row[7])
+        return None
+
+    def _get(self, p: Path, st: os.stat_result) -> Doc:
+        row = self._row(p)
+        if row and row[0] == st.st_mtime_ns and row[1] == st.st_size:
+            self.hits += 1
+            return Doc(p, row[3], json.loads(row[4]), row[5], row[6], row[2], row[7])
+        raw = read_bytes(p)
+        digest = hashlib.sha256(raw).hexdigest()
+        if row and row[2] == digest:
+            self.hits += 1
+            self.db.execute("UPDATE docs SET mtime_ns=?, size=? WHERE path=?",
+                            (st.st_mtime_ns, st.st_size, str(p)))
+            self.db.commit()
+            return Doc(p, row[3], json.loads(row[4]), row[5], row[6], row[2], row[7], decode(raw))
+        self.misses += 1
+        doc = parse_doc(p, decode(raw), digest)
+        self._store(p, st, doc)
+        return doc
+
+    def put_text(self, p: Path, text: str, meta: dict | None = None) -> Doc:
+        """Record text just written to p; pass meta to skip re-parsing it."""
+        p = Path(p)
+        digest = hashlib.sha256(p.read_bytes()).hexdigest()
+        if meta is None:
+            doc = parse_doc(p, text, digest)
+        else:
+            kind, end, start = locate_front(text)
+            doc = Doc(p, kind, _json_safe(meta), end, start, digest, None, text)
+        st = p.stat()
+        self._store(p, st, doc)
+        if self.docs is not None:
+            self.docs[str(p)] = ((st.st_mtime_ns, st.st_size), doc)
+        return doc
+
+    def normalized_body(self, p: Path) -> str:
+        """normalize_text(body), computed once per file version."""
+        doc = self.get(p)
+        row = self.db.execute("SELECT norm FROM docs WHERE path=?", (str(doc.path),)).fetchone()
+        if row and row[0] is not None:
+            return row[0]
+        norm = normalize_text(doc.body())
+        self.db.execute("UPDATE docs SET norm=? WHERE path=?", (norm, str(doc.path)))
+        self.db.commit()
+        return norm
+
+
+# keyed by pid: a forked pool worker must open its own SQLite connection, never
+# use the parent's (the parent's entries are left alone in the child, not closed)
+_OPEN: dict[tuple[int, str], CorpusCache] = {}
+
+
+def shared_cache(path: str | Path | None, keep_docs: bool = False) -> CorpusCache:
+    """One CorpusCache per path per process, shared by tools and worker pools."""
+    key = (os.getpid(), str(path or ""))
+    if key not in _OPEN:
+        _OPEN[key] = CorpusCache(path, keep_docs)
+    return _OPEN[key]
@@ -0,0 +1,55 @@
+"""
+Pluggable text embedders shared by the tools.
+
+The default "hashing" embedder uses signed, hashed character trigrams, so it
+runs offline and is deterministic (tests, CI, and stages where any consistent
+vector space will do). Custom embedders are given as module:attr; attr is
+called with no arguments and must return an object with
+embed(list[str]) -> float32 array (n, dim), and may name itself with a
+`model` attribute (recorded as embedding_model in exports).
+
+Dependencies: numpy
+"""
+from __future__ import annotations
+import importlib, zlib
+import numpy as np
+
+
+class HashingEmbedder:
+    """Deterministic signed feature-hashing of character n-grams."""
+
+    def __init__(self, dim: int = 512, n: int = 3):
+        self.dim = dim
+        self.n = n
+        self.model = f"hashing-{n}gram-{dim}"
+
+    def _features(self, s: str):
+        s = f"<{s}>"
+        for i in range(max(1, len(s) - self.n + 1)):
+            h = zlib.crc32(s[i:i + self.n].encode("utf-8"))
+            yield h % self.dim, 1.0 if (h >> 31) & 1 else -1.0
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        rows, cols, vals = [], [], []
+        for r, t in enumerate(texts):
+            for c, v in self._features(t):
+                rows.append(r); cols.append(c); vals.append(v)
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        np.add.at(out, (np.array(rows, dtype=np.int64), np.array(cols, dtype=np.int64)),
+                  np.array(vals, dtype=np.float32))
+        return out
+
+
+EMBEDDERS = {"hashing": HashingEmbedder}
+
+
+def load_embedder(spec: str, dim: int):
+    if spec in EMBEDDERS:
+        return EMBEDDERS[spec](dim=dim)
+    mod, _, attr = spec.partition(":")
+    return getattr(importlib.import_module(mod), attr)()
+
+
+def normalize_rows(x: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(x, axis=1, keepdims=True)
+    return np.divide(x, norms, out=np.zeros_like(x), where=norms > 0)
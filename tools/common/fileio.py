@@ -0,0 +1,62 @@
+"""
+Crash-safe file writes shared by the tools.
+
+atomic_write() writes to a temp file in the target's directory, fsyncs it and
+renames it over the target, so readers (and an interrupted run) only ever see
+the old or the new content, never a truncated file. An existing target keeps
+its permission bits; a new one gets the usual umask-derived mode.
+atomic_open() gives the same guarantees to output written piece by piece.
+"""
+from __future__ import annotations
+import os, shutil, tempfile
+from contextlib import contextmanager
+from pathlib import Path
+
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def atomic_write(path: str | Path, data: str | bytes, encoding: str = "utf-8", fsync: bool = True) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    raw = data.encode(encoding) if isinstance(data, str) else data
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(raw)
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        _install(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+@contextmanager
+def atomic_open(path: str | Path, encoding: str = "utf-8", fsync: bool = True):
+    """Text file for streaming writes that replaces path like atomic_write on a clean exit.
+
+    If the block raises, the temp file is removed and path is left untouched.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, "w", encoding=encoding, newline="") as f:
+            yield f
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        _install(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def _install(tmp: str, path: Path) -> None:
+    if path.exists():
+        shutil.copymode(path, tmp)
+    else:
+        os.chmod(tmp, 0o666 & ~_UMASK)
+    os.replace(tmp, path)
@@ -0,0 +1,201 @@
+"""
+Per-stage timing, profiling and run metrics shared by the tools.
+
+Scripts add the flags with add_arguments(ap) and build a Metrics object with
+from_args(a, "tool_name"):
+
+  --profile [DIR]       cProfile each stage; writes DIR/<tool>.<stage>.prof and
+                        prints the top functions by cumulative time to stderr
+  --metrics-json PATH   write run metrics: wall time per stage, files/sec,
+                        bytes read, YAML vs TOML parse time, peak RSS and the
+                        slowest N files (--slowest)
+
+Library code reports I/O and parse time through note_read()/note_parse(),
+which are no-ops unless a Metrics object is active. Work done in pool
+workers is captured per file with capture() and merged by the parent with
+Metrics.merge_file().
+"""
+from __future__ import annotations
+import cProfile, heapq, io, json, pstats, sys, time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+DEFAULT_PROFILE_DIR = "outputs/profile"
+_ACTIVE = None
+_PROFILING = False
+
+
+def note_read(nbytes: int, seconds: float) -> None:
+    if _ACTIVE is not None:
+        _ACTIVE.add_phase("read", seconds)
+        _ACTIVE.bytes_read += nbytes
+
+
+def note_parse(kind: str | None, seconds: float) -> None:
+    if _ACTIVE is not None and kind:
+        _ACTIVE.add_phase(f"parse_{kind}", seconds)
+        _ACTIVE.parse_count[kind] = _ACTIVE.parse_count.get(kind, 0) + 1
+
+
+def peak_rss_bytes() -> dict:
+    if resource is None:
+        return {}
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return {"self": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale,
+            "children": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale}
+
+
+class Metrics:
+    def __init__(self, tool: str, profile_dir: str | None = None, slowest: int = 10):
+        self.tool = tool
+        self.profile_dir = Path(profile_dir) if profile_dir else None
+        self.slowest_n = slowest
+        self.started = time.perf_counter()
+        self.started_at = datetime.now(timezone.utc).isoformat()
+        self.stages: dict[str, float] = {}
+        self.phases: dict[str, float] = {}
+        self.parse_count: dict[str, int] = {}
+        self.counters: dict[str, int] = {}
+        self.files = 0
+        self.bytes_read = 0
+        self._slowest: list[tuple[float, str, int]] = []
+        self.metrics_json = None
+        self.outer = None
+        self.children: dict[str, dict] = {}
+
+    def add_phase(self, name: str, seconds: float) -> None:
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def count(self, name: str, n: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    @contextmanager
+    def stage(self, name: str):
+        global _PROFILING
+        # only one cProfile can be active; a nested stage is covered by its parent's
+        prof = cProfile.Profile() if self.profile_dir and not _PROFILING else None
+        t0 = time.perf_counter()
+        if prof:
+            _PROFILING = True
+            prof.enable()
+        try:
+            yield
+        finally:
+            if prof:
+                prof.disable()
+                _PROFILING = False
+                self._dump_profile(name, prof)
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - t0
+
+    def _dump_profile(self, name: str, prof: cProfile.Profile) -> None:
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        path = self.profile_dir / f"{self.tool}.{name}.prof"
+        prof.dump_stats(str(path))
+        buf = io.StringIO()
+        pstats.Stats(prof, stream=buf).sort_stats("cumulative").print_stats(15)
+        print(f"--- profile {self.tool}.{name} ({path})", file=sys.stderr)
+        print(buf.getvalue(), file=sys.stderr)
+
+    def record_file(self, path, seconds: float, nbytes: int = 0) -> None:
+        self.files += 1
+        item = (seconds, str(path), nbytes)
+        if len(self._slowest) < self.slowest_n:
+            heapq.heappush(self._slowest, item)
+        elif self.slowest_n:
+            heapq.heappushpop(self._slowest, item)
+
+    @contextmanager
+    def file(self, path):
+        """Time one file processed in this process."""
+        t0 = time.perf_counter()
+        before = self.bytes_read
+        try:
+            yield
+        finally:
+            self.record_file(path, time.perf_counter() - t0, self.bytes_read - before)
+
+    def merge_file(self, perf: dict) -> None:
+        """Merge a capture() result produced in a worker process."""
+        self.bytes_read += perf.get("bytes", 0)
+        for k, v in perf.get("phases", {}).items():
+            self.add_phase(k, v)
+        for k, v in perf.get("parse_count", {}).items():
+            self.parse_count[k] = self.parse_count.get(k, 0) + v
+        self.record_file(perf["path"], perf["seconds"], perf.get("bytes", 0))
+
+    def to_dict(self) -> dict:
+        wall = time.perf_counter() - self.started
+        return {
+            "tool": self.tool,
+            "started_at": self.started_at,
+            "wall_seconds": round(wall, 6),
+            "stages": {k: round(v, 6) for k, v in self.stages.items()},
+            "phases": {k: round(v, 6) for k, v in self.phases.items()},
+            "files": self.files,
+            "files_per_sec": round(self.files / wall, 2) if wall else None,
+            "bytes_read": self.bytes_read,
+            "parse_count": self.parse_count,
+            "peak_rss_bytes": peak_rss_bytes(),
+            "counters": self.counters,
+            "slowest_files": [{"path": p, "seconds": round(s, 6), "bytes": b}
+                              for s, p, b in sorted(self._slowest, reverse=True)],
+            **({"children": self.children} if self.children else {}),
+        }
+
+
+def add_arguments(ap) -> None:
+    ap.add_argument("--profile", nargs="?", const=DEFAULT_PROFILE_DIR, default=None, metavar="DIR",
+                    help=f"cProfile each stage into DIR (default {DEFAULT_PROFILE_DIR})")
+    ap.add_argument("--metrics-json", default=None, metavar="PATH", help="Write run metrics as JSON")
+    ap.add_argument("--slowest", type=int, default=10, help="Slowest files to list in --metrics-json")
+
+
+def from_args(a, tool: str) -> Metrics:
+    """Create and activate the Metrics object for this run (nests under a caller's)."""
+    global _ACTIVE
+    m = Metrics(tool, getattr(a, "profile", None), getattr(a, "slowest", 10))
+    m.metrics_json = getattr(a, "metrics_json", None)
+    m.outer = _ACTIVE
+    _ACTIVE = m
+    return m
+
+
+def finish(m: Metrics) -> dict:
+    """Write --metrics-json (if requested), reactivate the outer Metrics, return the metrics."""
+    global _ACTIVE
+    data = m.to_dict()
+    if m.metrics_json:
+        out = Path(m.metrics_json)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    if _ACTIVE is m:
+        _ACTIVE = m.outer
+    return data
+
+
+@contextmanager
+def capture(path):
+    """Collect read/parse time and bytes for one file into a picklable dict.
+
+    The active Metrics (if any) is shadowed for the duration so the parent can
+    merge the result exactly once, whether the file ran in-process or in a pool.
+    Callers may time extra phases with the yielded Metrics' add_phase().
+    """
+    global _ACTIVE
+    prev = _ACTIVE
+    local = _ACTIVE = Metrics("file", slowest=0)
+    t0 = time.perf_counter()
+    perf = {"path": str(path)}
+    try:
+        yield local
+    finally:
+        _ACTIVE = prev
+        perf.update(seconds=time.perf_counter() - t0, bytes=local.bytes_read,
+                    phases=local.phases, parse_count=local.parse_count)
+        local.perf = perf
@@ -0,0 +1,461 @@
+#!/usr/bin/env python3
+"""
+Chunk the corpus and the standards templates for vector_chunks and export embeddings.
+
+Inputs: the curated corpus (--root/--glob) and the standards templates
+(--templates, ai-backend/templates/standards/**/*.md), read through the shared
+parsed-corpus cache (tools/common/corpus.py).
+
+Each document becomes a chunk hierarchy matching chunk_level / parent_chunk_id
+of vector_chunks (ai-backend/supabase_migrations/schemas/supabase_vector_schema_final.sql):
+  document   the title and opening text, up to --max-tokens
+  section    one per Markdown heading down to --section-depth: the heading and
+             its text, up to --max-tokens
+  paragraph  the blank-line separated blocks of a section (fenced code blocks
+             count as one block); blocks under --min-tokens are merged with the
+             next, blocks over --max-tokens are split at sentence or line ends
+Text before the first heading has no section chunk; its paragraphs hang off
+the document chunk.
+
+Chunk text is normalized (trailing whitespace stripped) and content_hash is
+its SHA-256, so an unchanged chunk keeps its hash, and its id (a UUIDv5 of
+the hash), from run to run. Repeated content is exported once: vector_chunks
+has UNIQUE(content_hash). A chunk shared by several documents therefore
+belongs to the first of them only (input order: corpus, then templates); the
+later documents' total_chunks leave it out, retrieval returns it under the
+first document, and context filtering uses that document's facets. Such
+documents are counted as documents_sharing_chunks in --metrics-json.
+Document ids are UUIDv5s of the file path relative to --root or --templates,
+so they do not depend on how those folders are spelled. Token counts use
+tiktoken (--tokenizer, default cl100k_base) when it is installed, else a
+word/punctuation regex.
+
+content_metadata carries the CAG facets of match_chunks_with_context from the
+front matter; industry_relevance, company_size_applicability and
+geographic_scope default to ["general"], ["all"] and ["global"] when absent.
+
+Embeddings are computed in --batch-size batches with a pluggable embedder
+(tools/common/embedders.py; the default "hashing" embedder is offline and
+deterministic) and L2-normalized. Vectors of chunks whose hash is already in
+the previous export (same embedding model and dimension) are copied from its
+embeddings.f32 instead of being embedded again; --no-reuse re-embeds all.
+
+Outputs (--out, default outputs/chunks; replaced only once the run succeeds):
+  documents.csv   documents rows (id, title, file_name, sha256, source_type, ...)
+  chunks.csv      vector_chunks rows; embedding as a pgvector literal
+  embeddings.f32  float32 (chunks x dim), row i = chunks.csv row i, memmappable
+  manifest.json   embedding model, dimension, tokenizer and the content hashes in row order
+Bulk load (documents first, for the foreign key):
+  \\copy documents (id, title, file_name, sha256, source_type, document_type, content_category,
+         content_metadata, total_chunks, processing_status) FROM 'documents.csv' WITH (FORMAT csv, HEADER true)
+  \\copy vector_chunks (id, document_id, chunk_index, content, content_hash, token_count, parent_chunk_id,
+         chunk_level, embedding, embedding_model, chunk_metadata) FROM 'chunks.csv' WITH (FORMAT csv, HEADER true)
+
+Usage:
+  python tools/export/export_chunks.py --root data/corpus --out outputs/chunks
+  python tools/export/export_chunks.py --embedder mypkg.embed:OpenAIEmbedder --batch-size 256
+
+Dependencies: numpy, pyyaml; tiktoken (optional)
+"""
+from __future__ import annotations
+import argparse, csv, hashlib, json, os, re, sys, uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+import numpy as np
+try:
+    import tiktoken
+except ImportError:  # token counts fall back to a regex
+    tiktoken = None
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common import instrument  # noqa: E402
+from common.corpus import DEFAULT_CACHE, shared_cache  # noqa: E402
+from common.embedders import EMBEDDERS, load_embedder, normalize_rows  # noqa: E402
+from common.fileio import atomic_write  # noqa: E402
+
+EXPORT_VERSION = 1
+DEFAULT_TEMPLATES = "ai-backend/templates/standards"
+DOC_NS = uuid.UUID("6f1d3c52-3b8e-5a4e-9c1f-2d7a4e9b8c10")
+CHUNK_NS = uuid.UUID("a3c9e0d4-71b2-5f6a-8e3d-4b5c6d7e8f90")
+
+DOC_COLS = ["id", "title", "file_name", "sha256", "source_type", "document_type", "content_category",
+            "content_metadata", "total_chunks", "processing_status"]
+CHUNK_COLS = ["id", "document_id", "chunk_index", "content", "content_hash", "token_count", "parent_chunk_id",
+              "chunk_level", "embedding", "embedding_model", "chunk_metadata"]
+# front-matter keys copied into documents.content_metadata (the CAG filters of match_chunks_with_context)
+CONTENT_META_KEYS = ("industry_relevance", "company_size_applicability", "geographic_scope",
+                     "regulatory_jurisdictions", "complexity_level", "frameworks", "business_model_relevance",
+                     "tech_stack_relevance", "ai_acceleration_level", "acceleration_factor",
+                     "template_completeness", "user_experience_level")
+# CAG facets a document without them gets, the catch-all values match_chunks_with_context
+# accepts for any organization (without them every industry/size/geography filter drops it)
+CAG_DEFAULTS = {"industry_relevance": ["general"], "company_size_applicability": ["all"],
+                "geographic_scope": ["global"]}
+# corpus folder -> (source_type, document_type, content_category)
+CORPUS_KINDS = {"qas": ("qa_bank", "qa_pair", "faqs"),
+                "templates": ("policy_template", "policy_template", "templates"),
+                "examples": ("regulatory_guide", "example", "examples")}
+# templates folder -> framework
+TEMPLATE_FRAMEWORKS = {"iso27001": "iso27001", "gdpr": "gdpr", "ai_act": "eu_ai_act"}
+
+HEADING = re.compile(r"^(#{1,6})[ \t]+(.+?)[ \t#]*$")
+FENCE = re.compile(r"^[ \t]*(```|~~~)")
+BREAK = re.compile(r"((?<=[.!?])[ \t]+|\n)")
+TOKEN = re.compile(r"\w+|[^\w\s]")
+
+
+def load_tokenizer(name: str):
+    """(label, count function); the regex fallback without tiktoken or for name="regex"."""
+    if tiktoken is not None and name != "regex":
+        enc = tiktoken.get_encoding(name)
+        return name, lambda s: len(enc.encode(s, disallowed_special=()))
+    return "regex", lambda s: len(TOKEN.findall(s))
+
+
+def normalize_content(text: str) -> str:
+    return "\n".join(line.rstrip() for line in text.strip().split("\n"))
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class Section:
+    heading: str                 # the heading line ("" for text before the first heading)
+    path: tuple[str, ...]        # heading titles from the top level down
+    blocks: list[str] = field(default_factory=list)
+
+
+def sections(body: str, depth: int) -> list[Section]:
+    """Split a Markdown body into sections of blank-line separated blocks."""
+    out, stack, block, fence = [Section("", ())], [], [], None
+
+    def end_block():
+        text = normalize_content("\n".join(block))
+        if text:
+            out[-1].blocks.append(text)
+        block.clear()
+
+    for line in body.split("\n"):
+        m = FENCE.match(line)
+        if fence:
+            block.append(line)
+            if m and m.group(1) == fence:
+                fence = None
+            continue
+        if m:
+            fence = m.group(1)
+            block.append(line)
+            continue
+        h = HEADING.match(line)
+        if h and len(h.group(1)) <= depth:
+            end_block()
+            level = len(h.group(1))
+            stack = [s for s in stack if s[0] < level] + [(level, h.group(2))]
+            out.append(Section(line.strip(), tuple(t for _, t in stack)))
+        elif h:
+            end_block()
+            block.append(line)
+        elif not line.strip():
+            end_block()
+        else:
+            block.append(line)
+    end_block()
+    return [s for s in out if s.blocks]
+
+
+def split_long(text: str, max_tokens: int, count) -> list[str]:
+    """Pieces of text within max_tokens, cut at sentence or line ends (at spaces as a last resort)."""
+    parts = BREAK.split(text)
+    pieces, cur, cur_n = [], "", 0
+    for i in range(0, len(parts), 2):
+        seg = parts[i] + (parts[i + 1] if i + 1 < len(parts) else "")
+        n = count(seg)
+        if cur and cur_n + n > max_tokens:
+            pieces.append(cur)
+            cur, cur_n = "", 0
+        if n > max_tokens:
+            words = seg.split()
+            for w in words:
+                wn = count(w)
+                if cur and cur_n + wn > max_tokens:
+                    pieces.append(cur)
+                    cur, cur_n = "", 0
+                cur, cur_n = (cur + " " + w if cur else w), cur_n + wn
+            continue
+        cur, cur_n = cur + seg, cur_n + n
+    if cur.strip():
+        pieces.append(cur)
+    return [p for p in (normalize_content(p) for p in pieces) if p]
+
+
+def lead(head: str, blocks: list[str], max_tokens: int, count) -> str:
+    """head plus as many whole blocks as fit in max_tokens (at least a piece of the first)."""
+    parts, n = [head] if head else [], count(head) if head else 0
+    for b in blocks:
+        bn = count(b)
+        if n + bn > max_tokens:
+            if len(parts) <= 1:
+                parts.append(split_long(b, max(max_tokens - n, 1), count)[0])
+            break
+        parts.append(b)
+        n += bn
+    return normalize_content("\n\n".join(parts))
+
+
+def paragraphs(blocks: list[str], min_tokens: int, max_tokens: int, count) -> list[str]:
+    """Blocks merged up to min_tokens and split down to max_tokens."""
+    out, cur, cur_n = [], [], 0
+    for b in blocks:
+        n = count(b)
+        if n > max_tokens:
+            if cur:
+                out.append("\n\n".join(cur))
+                cur, cur_n = [], 0
+            out.extend(split_long(b, max_tokens, count))
+            continue
+        if cur and cur_n + n > max_tokens:
+            out.append("\n\n".join(cur))
+            cur, cur_n = [], 0
+        cur.append(b)
+        cur_n += n
+        if cur_n >= min_tokens:
+            out.append("\n\n".join(cur))
+            cur, cur_n = [], 0
+    if cur:
+        out.append("\n\n".join(cur))
+    return out
+
+
+def chunk_document(title: str, body: str, a, count) -> list[tuple[str, str, int, tuple]]:
+    """(level, content, parent position or -1, heading path) in document order."""
+    secs = sections(body, a.section_depth)
+    chunks = [("document", lead(title, [b for s in secs for b in s.blocks], a.max_tokens, count), -1, ())]
+    for s in secs:
+        parent = 0
+        if s.heading:
+            chunks.append(("section", lead(s.heading, s.blocks, a.max_tokens, count), 0, s.path))
+            parent = len(chunks) - 1
+        for p in paragraphs(s.blocks, a.min_tokens, a.max_tokens, count):
+            chunks.append(("paragraph", p, parent, s.path))
+    return chunks
+
+
+def doc_title(meta: dict, body: str, path: Path) -> str:
+    for key in ("title", "query"):
+        if isinstance(meta.get(key), str) and meta[key].strip():
+            return meta[key].strip()
+    for line in body.split("\n"):
+        h = HEADING.match(line)
+        if h:
+            return h.group(2)
+    return path.stem.replace("_", " ").replace("-", " ")
+
+
+def doc_fields(path: Path, meta: dict, template: bool) -> tuple[str, str, str, dict]:
+    """source_type, document_type, content_category and content_metadata of a document.
+
+    Facets missing from the front matter default to CAG_DEFAULTS (general,
+    all sizes, global).
+    """
+    content = {k: meta[k] for k in CONTENT_META_KEYS if k in meta}
+    frameworks = list(content.get("frameworks") or [])
+    if template:
+        fw = TEMPLATE_FRAMEWORKS.get(path.parent.name)
+        kind = "procedure_template" if "procedure" in path.stem.lower() else "policy_template"
+        source = fw or kind
+        frameworks += [fw] if fw else []
+        category = "templates"
+    else:
+        folder = next((p for p in path.parts if p in CORPUS_KINDS), None)
+        source, kind, category = CORPUS_KINDS.get(folder) or (
+            CORPUS_KINDS["qas"] if "query" in meta else ("regulatory_guide", "implementation_guide", "requirements"))
+        frameworks += [str(s).lower() for s in meta.get("standards") or []]
+    if frameworks:
+        content["frameworks"] = list(dict.fromkeys(frameworks))
+    for k, default in CAG_DEFAULTS.items():
+        content.setdefault(k, list(default))
+    return (meta.get("source_type") or source, meta.get("document_type") or kind,
+            meta.get("content_category") or category, content)
+
+
+def iter_files(a):
+    """(path, is_template, key) of every input, corpus first, each group sorted.
+
+    key is the path relative to its folder, prefixed by the group: the document id's name.
+    """
+    if Path(a.root).is_dir():
+        for p in sorted(Path(a.root).glob(a.glob)):
+            if p.is_file():
+                yield p, False, f"corpus/{p.relative_to(a.root).as_posix()}"
+    if a.templates and Path(a.templates).is_dir():
+        for p in sorted(Path(a.templates).glob("**/*.md")):
+            if p.is_file():
+                yield p, True, f"templates/{p.relative_to(a.templates).as_posix()}"
+
+
+class PreviousExport:
+    """Vectors of the last export by content hash (memmapped), if model and dimension match."""
+
+    def __init__(self, out: Path, model: str, dim: int):
+        self.rows, self.vectors = {}, None
+        try:
+            manifest = json.loads((out/"manifest.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        hashes = manifest.get("hashes") or []
+        path = out/"embeddings.f32"
+        if (manifest.get("version") != EXPORT_VERSION or manifest.get("embedding_model") != model
+                or manifest.get("dim") != dim or not hashes or not path.exists()
+                or path.stat().st_size != len(hashes) * dim * 4):
+            return
+        self.vectors = np.memmap(path, dtype=np.float32, mode="r", shape=(len(hashes), dim))
+        self.rows = {h: i for i, h in enumerate(hashes)}
+
+    def get(self, h: str):
+        i = self.rows.get(h)
+        return None if i is None else np.array(self.vectors[i])
+
+
+class ChunkWriter:
+    """Writes chunk rows and their vectors in order, embedding new content in batches."""
+
+    def __init__(self, out: Path, embedder, model: str, dim: int, previous: PreviousExport | None,
+                 batch_size: int, metrics):
+        self.embedder, self.model, self.dim, self.previous = embedder, model, dim, previous
+        self.batch_size, self.metrics = batch_size, metrics
+        self.tmp_csv, self.tmp_vec = out/"chunks.csv.tmp", out/"embeddings.f32.tmp"
+        self.csv_f = open(self.tmp_csv, "w", newline="", encoding="utf-8")
+        self.vec_f = open(self.tmp_vec, "wb")
+        self.writer = csv.writer(self.csv_f)
+        self.writer.writerow(CHUNK_COLS)
+        self.pending, self.todo, self.hashes = [], 0, []
+
+    def add(self, row: dict) -> None:
+        vec = self.previous.get(row["content_hash"]) if self.previous else None
+        self.pending.append((row, vec))
+        if vec is None:
+            self.todo += 1
+            if self.todo >= self.batch_size:
+                self.flush()
+
+    def flush(self) -> None:
+        texts = [row["content"] for row, vec in self.pending if vec is None]
+        new = iter(())
+        if texts:
+            with self.metrics.stage("embed"):
+                vecs = np.asarray(self.embedder.embed(texts), dtype=np.float32)
+            if vecs.shape != (len(texts), self.dim):
+                raise SystemExit(f"embedder returned shape {vecs.shape}, expected ({len(texts)}, {self.dim})")
+            new = iter(normalize_rows(vecs))
+            self.metrics.count("embedded", len(texts))
+        self.metrics.count("reused", len(self.pending) - len(texts))
+        for row, vec in self.pending:
+            vec = next(new) if vec is None else vec
+            self.vec_f.write(vec.astype(np.float32).tobytes())
+            row["embedding"] = "[" + ",".join(map("{:.7g}".format, vec.tolist())) + "]"
+            row["embedding_model"] = self.model
+            self.writer.writerow([row[c] for c in CHUNK_COLS])
+            self.hashes.append(row["content_hash"])
+        self.pending, self.todo = [], 0
+
+    def close(self) -> None:
+        self.flush()
+        self.csv_f.close()
+        self.vec_f.close()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--root", default="data/corpus")
+    ap.add_argument("--glob", default="**/*.md")
+    ap.add_argument("--templates", default=DEFAULT_TEMPLATES, help="Standards templates folder ('' = none)")
+    ap.add_argument("--out", default="outputs/chunks")
+    ap.add_argument("--corpus-cache", default=DEFAULT_CACHE)
+    ap.add_argument("--embedder", default="hashing", help=f"{', '.join(EMBEDDERS)} or module:attr")
+    ap.add_argument("--dim", type=int, default=1536, help="Embedding dimension (vector_chunks.embedding)")
+    ap.add_argument("--batch-size", type=int, default=64, help="Texts per embedder call")
+    ap.add_argument("--no-reuse", action="store_true", help="Re-embed every chunk")
+    ap.add_argument("--tokenizer", default="cl100k_base", help="tiktoken encoding, or 'regex'")
+    ap.add_argument("--max-tokens", type=int, default=400)
+    ap.add_argument("--min-tokens", type=int, default=40)
+    ap.add_argument("--section-depth", type=int, default=3, help="Deepest heading level that starts a section")
+    instrument.add_arguments(ap)
+    a = ap.parse_args(argv)
+    metrics = instrument.from_args(a, "export_chunks")
+    out = Path(a.out)
+    out.mkdir(parents=True, exist_ok=True)
+    cache = shared_cache(a.corpus_cache)
+    tokenizer, count = load_tokenizer(a.tokenizer)
+    embedder = load_embedder(a.embedder, a.dim)
+    model = getattr(embedder, "model", None) or a.embedder
+    previous = None if a.no_reuse else PreviousExport(out, model, a.dim)
+
+    docs, seen_docs, seen_chunks = [], set(), {}  # seen_chunks: content hash -> document id
+    writer = ChunkWriter(out, embedder, model, a.dim, previous, max(1, a.batch_size), metrics)
+    try:
+        with metrics.stage("export"):
+            for path, template, key in iter_files(a):
+                with metrics.file(path):
+                    doc = cache.get(path)
+                    body = doc.body()
+                    sha = doc.sha256 or hashlib.sha256(doc.read().encode("utf-8")).hexdigest()
+                    if sha in seen_docs or not body.strip():
+                        metrics.count("documents_skipped")
+                        continue
+                    seen_docs.add(sha)
+                    title = doc_title(doc.meta, body, path)
+                    doc_id = str(uuid.uuid5(DOC_NS, key))
+                    ids, index, shared = [], 0, False
+                    for level, content, parent, heading_path in chunk_document(title, body, a, count):
+                        h = content_hash(content)
+                        ids.append(str(uuid.uuid5(CHUNK_NS, h)))
+                        if h in seen_chunks:
+                            metrics.count("duplicates")
+                            shared = shared or seen_chunks[h] != doc_id
+                            continue
+                        seen_chunks[h] = doc_id
+                        tokens = count(content)
+                        metrics.count("tokens", tokens)
+                        meta = {"heading_path": list(heading_path)} if heading_path else {}
+                        writer.add({"id": ids[-1], "document_id": doc_id, "chunk_index": index, "content": content,
+                                    "content_hash": h, "token_count": tokens,
+                                    "parent_chunk_id": ids[parent] if parent >= 0 else "", "chunk_level": level,
+                                    "chunk_metadata": json.dumps(meta, ensure_ascii=False)})
+                        index += 1
+                    if shared:
+                        metrics.count("documents_sharing_chunks")
+                    source, kind, category, content_meta = doc_fields(path, doc.meta, template)
+                    docs.append([doc_id, title, str(path), sha, source, kind, category,
+                                 json.dumps(content_meta, ensure_ascii=False), index, "completed"])
+            writer.close()
+    except BaseException:
+        writer.csv_f.close()
+        writer.vec_f.close()
+        writer.tmp_csv.unlink(missing_ok=True)
+        writer.tmp_vec.unlink(missing_ok=True)
+        raise
+
+    with metrics.stage("write"):
+        tmp_docs = out/"documents.csv.tmp"
+        with open(tmp_docs, "w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            w.writerow(DOC_COLS)
+            w.writerows(docs)
+        # the old embeddings may still be memmapped: replace, never overwrite in place
+        os.replace(writer.tmp_vec, out/"embeddings.f32")
+        os.replace(writer.tmp_csv, out/"chunks.csv")
+        os.replace(tmp_docs, out/"documents.csv")
+        atomic_write(out/"manifest.json", json.dumps(
+            {"version": EXPORT_VERSION, "embedding_model": model, "dim": a.dim, "tokenizer": tokenizer,
+             "documents": len(docs), "chunks": len(writer.hashes), "hashes": writer.hashes}, indent=1))
+    metrics.count("documents", len(docs))
+    metrics.count("chunks", len(writer.hashes))
+    c = metrics.counters
+    print(f"Wrote {len(docs)} documents, {len(writer.hashes)} chunks to {out} "
+          f"({c.get('embedded', 0)} embedded, {c.get('reused', 0)} reused, {c.get('duplicates', 0)} duplicates)")
+    instrument.finish(metrics)
+
+if __name__ == "__main__":
+    main()
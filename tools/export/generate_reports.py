@@ -2,47 +2,190 @@
 """
 Summarize outputs into simple Markdown reports.
 
+The vocabulary outputs are never loaded whole: terms, phrases and unique-term
+tables are read a chunk at a time (--chunk-rows), with only the columns a
+section needs. If terms.parquet / phrases.parquet (build_vocab.py --parquet)
+are present they are scanned batch by batch instead of the CSVs. Each chunk is
+reduced with vectorized group-bys: rows are first counted per distinct
+(standards, term) pair, then only the distinct "A|B" standards/clauses strings
+are split and joined back, so the split runs once per distinct value rather
+than per row. Running counts are merged between chunks, so memory grows with
+the number of distinct (standard or clause, term) pairs, not with the input
+size.
+
+Sections: total rows and standards present, term rows and distinct terms per
+standard, unique terms per standard, the Jaccard overlap matrix, and the --top
+most frequent terms and phrases per standard and per clause (frequency = number
+of documents, one row per document in terms.csv / phrases.csv).
+
+--profile and --metrics-json time the load and render stages
+(tools/common/instrument.py).
+
 Usage:
   python tools/export/generate_reports.py --in outputs/vocab --out outputs/reports
+  python tools/export/generate_reports.py --in outputs/vocab --out outputs/reports --top 20 --chunk-rows 100000
 """
 from __future__ import annotations
-import argparse
+import argparse, sys
 from pathlib import Path
+from typing import Iterator
 import pandas as pd
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet input is optional
+    pq = None
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common import instrument  # noqa: E402
+
+CHUNK_ROWS = 250_000
+TOP_N = 10
+MERGE_EVERY = 8  # chunks of partial counts held before they are merged into the running totals
+
+
+def has_table(inp: Path, name: str) -> bool:
+    return (pq is not None and (inp/f"{name}.parquet").exists()) or (inp/f"{name}.csv").exists()
+
+
+def iter_chunks(inp: Path, name: str, columns: list[str], chunk_rows: int = CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """`columns` of <name>.parquet (batch by batch) or else <name>.csv (chunked), as string columns."""
+    if pq is not None and (inp/f"{name}.parquet").exists():
+        for batch in pq.ParquetFile(inp/f"{name}.parquet").iter_batches(batch_size=chunk_rows, columns=columns):
+            yield batch.to_pandas().fillna("")
+        return
+    yield from pd.read_csv(inp/f"{name}.csv", usecols=columns, dtype=str, keep_default_na=False,
+                           chunksize=chunk_rows)
+
+
+def split_counts(df: pd.DataFrame, multi: str, key: str) -> pd.Series:
+    """Rows per (each "|"-separated value of `multi`, key), splitting every distinct `multi` string once."""
+    pairs = df.groupby([multi, key], observed=True, sort=False).size().rename("n").reset_index()
+    distinct = pd.Series(pairs[multi].astype(str).unique())
+    parts = distinct.str.split("|").explode()
+    parts = parts[parts.notna() & (parts != "")]
+    lookup = pd.DataFrame({multi: distinct.values[parts.index], "group": parts.values})
+    pairs[multi] = pairs[multi].astype(str)
+    joined = pairs.merge(lookup, on=multi)
+    return joined.groupby(["group", key], sort=False)["n"].sum()
+
+
+class PairCounts:
+    """Running counts per (group, key), merged chunk by chunk."""
 
+    def __init__(self):
+        self.total: pd.Series | None = None
+        self.pending: list[pd.Series] = []
 
-def main():
+    def add(self, counts: pd.Series) -> None:
+        self.pending.append(counts)
+        if len(self.pending) >= MERGE_EVERY:
+            self._merge()
+
+    def _merge(self) -> None:
+        if self.pending:
+            parts = ([self.total] if self.total is not None else []) + self.pending
+            self.total = pd.concat(parts).groupby(level=[0, 1], sort=False).sum()
+            self.pending = []
+
+    def result(self) -> pd.Series:
+        self._merge()
+        if self.total is None:
+            return pd.Series(dtype="int64", index=pd.MultiIndex.from_tuples([], names=["group", "key"]))
+        return self.total
+
+    def top(self, n: int) -> dict[str, list[tuple[str, int]]]:
+        """The n largest keys per group (ties by key), groups sorted."""
+        df = self.result().rename("n").reset_index()
+        df.columns = ["group", "key", "n"]
+        df = df.sort_values(["group", "n", "key"], ascending=[True, False, True], kind="stable")
+        df = df.groupby("group", sort=False).head(n)
+        return {g: list(zip(grp["key"], grp["n"].astype(int))) for g, grp in df.groupby("group", sort=True)}
+
+
+def scan_table(inp: Path, name: str, key: str, chunk_rows: int) -> tuple[int, PairCounts, PairCounts]:
+    """Row count plus (standard, key) and (clause, key) counts of terms/phrases."""
+    rows, by_std, by_clause = 0, PairCounts(), PairCounts()
+    for chunk in iter_chunks(inp, name, ["standards", "clauses", key], chunk_rows):
+        rows += len(chunk)
+        by_std.add(split_counts(chunk, "standards", key))
+        by_clause.add(split_counts(chunk, "clauses", key))
+    return rows, by_std, by_clause
+
+
+def count_uniques(inp: Path, chunk_rows: int) -> pd.Series:
+    counts = None
+    for chunk in iter_chunks(inp, "unique_terms_by_standard", ["standard"], chunk_rows):
+        vc = chunk["standard"].value_counts()
+        counts = vc if counts is None else counts.add(vc, fill_value=0)
+    return (counts if counts is not None else pd.Series(dtype="int64")).astype(int).sort_index()
+
+
+def render_top(md: list[str], title: str, top: dict[str, list[tuple[str, int]]]) -> None:
+    md.append(f"## {title}\n")
+    for group, items in top.items():
+        md.append(f"- **{group}**: " + ", ".join(f"{k} ({c})" for k, c in items))
+    md.append("")
+
+
+def main(argv=None):
     ap = argparse.ArgumentParser()
     ap.add_argument("--in", dest="inp", default="outputs/vocab")
     ap.add_argument("--out", dest="out", default="outputs/reports")
-    a = ap.parse_args()
+    ap.add_argument("--top", type=int, default=TOP_N, help="Terms/phrases listed per standard and clause (0 = none)")
+    ap.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help="Rows per chunk read from the inputs")
+    instrument.add_arguments(ap)
+    a = ap.parse_args(argv)
+    metrics = instrument.from_args(a, "generate_reports")
     inp = Path(a.inp); out = Path(a.out)
     out.mkdir(parents=True, exist_ok=True)
 
-    terms = pd.read_csv(inp/"terms.csv") if (inp/"terms.csv").exists() else None
-    uniques = pd.read_csv(inp/"unique_terms_by_standard.csv") if (inp/"unique_terms_by_standard.csv").exists() else None
-    jacc = pd.read_csv(inp/"overlap_jaccard.csv") if (inp/"overlap_jaccard.csv").exists() else None
-
-    md = ["# Vocabulary Build Report\n"]
-    if terms is not None:
-        md.append(f"Total terms rows: {len(terms)}\n")
-        md.append("## Standards present\n")
-        stds = set()
-        for s in terms["standards"].fillna(""):
-            stds.update([x for x in str(s).split("|") if x])
-        for s in sorted(stds):
-            md.append(f"- {s}")
-        md.append("")
-    if uniques is not None:
-        md.append("## Unique terms per standard (counts)\n")
-        for s, grp in uniques.groupby("standard"):
-            md.append(f"- {s}: {len(grp)}")
-        md.append("")
-    if jacc is not None:
-        md.append("## Overlap (Jaccard)\n")
-        md.append(jacc.to_csv(index=False))
-    (out/"REPORT.md").write_text("\n".join(md), encoding="utf-8")
-    print("Wrote", out/"REPORT.md")
+    with metrics.stage("load"):
+        terms = scan_table(inp, "terms", "term", a.chunk_rows) if has_table(inp, "terms") else None
+        phrases = scan_table(inp, "phrases", "phrase", a.chunk_rows) if a.top and has_table(inp, "phrases") else None
+        uniques = count_uniques(inp, a.chunk_rows) if (inp/"unique_terms_by_standard.csv").exists() else None
+        jacc = pd.read_csv(inp/"overlap_jaccard.csv") if (inp/"overlap_jaccard.csv").exists() else None
+        if terms is not None:
+            metrics.count("terms_rows", terms[0])
+        if phrases is not None:
+            metrics.count("phrases_rows", phrases[0])
+
+    with metrics.stage("render"):
+        md = ["# Vocabulary Build Report\n"]
+        if terms is not None:
+            n_terms, by_std, _ = terms
+            per_std = by_std.result()
+            md.append(f"Total terms rows: {n_terms}\n")
+            md.append("## Standards present\n")
+            stds = sorted(per_std.index.get_level_values(0).unique())
+            for s in stds:
+                md.append(f"- {s}")
+            md.append("")
+            if stds:
+                rows = per_std.groupby(level=0).sum()
+                distinct = per_std.groupby(level=0).size()
+                md.append("## Terms per standard\n")
+                md.append("| standard | term rows | distinct terms |")
+                md.append("|---|---:|---:|")
+                for s in stds:
+                    md.append(f"| {s} | {int(rows[s])} | {int(distinct[s])} |")
+                md.append("")
+        if uniques is not None:
+            md.append("## Unique terms per standard (counts)\n")
+            for s, n in uniques.items():
+                md.append(f"- {s}: {n}")
+            md.append("")
+        if jacc is not None:
+            md.append("## Overlap (Jaccard)\n")
+            md.append(jacc.to_csv(index=False))
+        if a.top and terms is not None:
+            render_top(md, f"Top {a.top} terms per standard (documents)", terms[1].top(a.top))
+            render_top(md, f"Top {a.top} terms per clause (documents)", terms[2].top(a.top))
+        if a.top and phrases is not None:
+            render_top(md, f"Top {a.top} phrases per standard (documents)", phrases[1].top(a.top))
+            render_top(md, f"Top {a.top} phrases per clause (documents)", phrases[2].top(a.top))
+        (out/"REPORT.md").write_text("\n".join(md), encoding="utf-8")
+        print("Wrote", out/"REPORT.md")
+    instrument.finish(metrics)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -4,44 +4,49 @@ Convert Markdown files with YAML front matter (--- ... ---) to TOML front matter
 
 Usage examples:
   python tools/preprocess/convert_yaml_to_toml.py --root data/corpus --glob "**/*.md" --inplace --backup-dir backups/frontmatter
+  python tools/preprocess/convert_yaml_to_toml.py --root data/corpus --inplace --backup-archive backups/frontmatter.tar.gz --workers 8
   python tools/preprocess/convert_yaml_to_toml.py --root data/corpus/qas --glob "*.md" --dry-run
 
+Front matter is located with the shared helpers in tools/common/corpus.py.
+--dry-run reads each file only up to its closing fence, and converted files
+are recorded in the parsed-corpus cache with their already-parsed metadata,
+so later tools do not parse them again. --profile / --metrics-json report
+per-stage and per-file timings (tools/common/instrument.py).
+
+Crash safety: every converted file is written to a temp file and renamed
+over the original (tools/common/fileio.py), so an interrupted run leaves each
+file either fully old or fully new. Backups keep the original bytes:
+  --backup-dir DIR        DIR/<path relative to --root>.bak, written before the file is replaced
+  --backup-archive FILE   one .tar.gz of every file about to be converted, completed
+                          before any file is touched (refuses to overwrite FILE)
+
+With --workers N (N > 1) files are converted across a process pool.
+
 Dependencies: pyyaml, tomlkit
   pip install pyyaml tomlkit
 """
 from __future__ import annotations
-import argparse, sys, traceback
+import argparse, sys, tarfile, time, traceback
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
-import yaml
 import tomlkit
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common import instrument  # noqa: E402
+from common.corpus import (DEFAULT_CACHE, CorpusCache, decode, locate_front, parse_meta, read_bytes,  # noqa: E402
+                           read_header, shared_cache, split_front)
+from common.fileio import atomic_write  # noqa: E402
+
 FRONT_Y = "---"
 FRONT_T = "+++"
 
 
-def split_front(text: str):
-    if text.startswith(FRONT_Y):
-        end = text.find("\n" + FRONT_Y, len(FRONT_Y))
-        if end == -1:
-            end = text.find("\r\n" + FRONT_Y, len(FRONT_Y))
-        if end == -1:
-            return ("yaml", None, text)
-        # assume \n after closing fence
-        body_start = text.find("\n", end + 1)
-        return ("yaml", text[len(FRONT_Y)+1:end], text[body_start+1:])
-    if text.startswith(FRONT_T):
-        end = text.find("\n" + FRONT_T, len(FRONT_T))
-        if end == -1:
-            end = text.find("\r\n" + FRONT_T, len(FRONT_T))
-        if end == -1:
-            return ("toml", None, text)
-        body_start = text.find("\n", end + 1)
-        return ("toml", text[len(FRONT_T)+1:end], text[body_start+1:])
-    return (None, None, text)
+def yaml_to_toml(y: str) -> str:
+    return data_to_toml(parse_meta("yaml", y) if y else {})
 
 
-def yaml_to_toml(y: str) -> str:
-    data = yaml.safe_load(y) if y else {}
+def data_to_toml(data) -> str:
     if data is None:
         data = {}
     if not isinstance(data, dict):
@@ -52,61 +57,136 @@ def yaml_to_toml(y: str) -> str:
     return tomlkit.dumps(doc)
 
 
-def convert_path(p: Path, inplace: bool, backup_dir: Path|None):
-    text = p.read_text(encoding="utf-8", errors="ignore")
-    kind, front, body = split_front(text)
+def rel_path(p: Path, root: Path | None) -> Path:
+    if root is None:
+        return Path(p.name)
+    try:
+        return p.resolve().relative_to(root.resolve())
+    except ValueError:  # p outside root
+        return Path(*p.resolve().parts[1:])
+
+
+def backup_path(p: Path, backup_dir: Path, root: Path | None = None) -> Path:
+    """Path-preserving backup location, so same-named files in different folders never collide."""
+    rel = rel_path(p, root)
+    return backup_dir / rel.with_name(rel.name + ".bak")
+
+
+def needs_conversion(p: Path) -> bool:
+    """YAML front matter with a closing fence; reads only the header."""
+    kind, end, _ = locate_front(read_header(p))
+    return kind == "yaml" and end is not None
+
+
+def convert_path(p: Path, inplace: bool, backup_dir: Path|None, cache: CorpusCache|None = None,
+                 root: Path|None = None):
+    raw = read_bytes(p)
+    kind, front, body = split_front(decode(raw))
     if kind is None or kind == "toml":
         return "skipped"
     if kind == "yaml" and front is None:
         return "malformed"
-    toml = yaml_to_toml(front or "")
+    t0 = time.perf_counter()
+    data = parse_meta("yaml", front) if front else {}
+    instrument.note_parse("yaml", time.perf_counter() - t0)
+    toml = data_to_toml(data)
     new = f"{FRONT_T}\n{toml}{FRONT_T}\n\n{body}"
     if inplace:
         if backup_dir:
-            backup_dir.mkdir(parents=True, exist_ok=True)
-            (backup_dir / (p.name + ".bak")).write_text(text, encoding="utf-8")
-        p.write_text(new, encoding="utf-8")
+            atomic_write(backup_path(p, backup_dir, root), raw)
+        atomic_write(p, new)
+        if cache is not None:
+            cache.put_text(p, new, meta=data if isinstance(data, dict) else {"_frontmatter": data})
     else:
         out = p.with_suffix("")
         out = out.with_name(out.name + ".toml.md")
-        out.write_text(new, encoding="utf-8")
+        atomic_write(out, new)
     return "converted"
 
 
-def main():
+def convert_one(p: Path, inplace: bool, backup_dir: Path|None, root: Path|None, corpus_cache: str|None,
+                dry_run: bool = False) -> tuple[str, dict]:
+    """Worker entry point: (status, perf); errors are reported, not raised."""
+    with instrument.capture(p) as cap:
+        try:
+            if dry_run:
+                res = "converted" if needs_conversion(p) else "skipped"
+            else:
+                res = convert_path(p, inplace, backup_dir, shared_cache(corpus_cache), root)
+        except Exception as e:
+            print(f"[ERROR] {p}: {e}", file=sys.stderr)
+            res = "error"
+    return res, cap.perf
+
+
+def iter_converted(files: list[Path], workers: int = 1, **kw):
+    """Yield (path, (status, perf)) in input order, optionally across a process pool."""
+    fn = partial(convert_one, **kw)
+    if workers <= 1 or len(files) < 2:
+        yield from zip(files, map(fn, files))
+        return
+    chunk = max(1, len(files) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        yield from zip(files, ex.map(fn, files, chunksize=chunk))
+
+
+def write_archive(archive: Path, files: list[Path], root: Path) -> list[Path]:
+    """Back up every YAML-fronted file into one .tar.gz; return those files (header reads only)."""
+    todo = [p for p in files if locate_front(read_header(p))[0] == "yaml"]
+    archive.parent.mkdir(parents=True, exist_ok=True)
+    tmp = archive.with_name(archive.name + ".tmp")
+    with tarfile.open(tmp, "w:gz") as tar:
+        for p in todo:
+            tar.add(p, arcname=str(rel_path(p, root)), recursive=False)
+    tmp.replace(archive)
+    return todo
+
+
+def main(argv=None):
     ap = argparse.ArgumentParser()
     ap.add_argument("--root", default="data/corpus", help="Root directory to scan")
     ap.add_argument("--glob", default="**/*.md", help="Glob under root")
     ap.add_argument("--inplace", action="store_true")
-    ap.add_argument("--backup-dir", default=None)
+    ap.add_argument("--backup-dir", default=None, help="Path-preserving backup tree for --inplace")
+    ap.add_argument("--backup-archive", default=None, help="Single .tar.gz backup for --inplace")
     ap.add_argument("--dry-run", action="store_true")
-    a = ap.parse_args()
+    ap.add_argument("--workers", type=int, default=1, help="Process pool size (1 = serial)")
+    ap.add_argument("--corpus-cache", default=DEFAULT_CACHE, help="Parsed-corpus cache (SQLite); '' = in-memory")
+    instrument.add_arguments(ap)
+    a = ap.parse_args(argv)
+    if a.backup_archive and Path(a.backup_archive).exists():
+        ap.error(f"--backup-archive {a.backup_archive} already exists")
+    metrics = instrument.from_args(a, "convert_yaml_to_toml")
     root = Path(a.root)
-    files = list(root.glob(a.glob))
+    with metrics.stage("discover"):
+        files = list(root.glob(a.glob))
     if not files:
         print("No files matched")
+        instrument.finish(metrics)
         sys.exit(0)
     backup = Path(a.backup_dir) if a.backup_dir else None
-    conv = skip = bad = 0
-    for p in files:
-        try:
-            if a.dry_run:
-                kind, front, _ = split_front(p.read_text(encoding="utf-8", errors="ignore"))
-                if kind == "yaml" and front is not None:
-                    conv += 1
-                else:
-                    skip += 1
-                continue
-            res = convert_path(p, a.inplace, backup)
+    if a.backup_archive and a.inplace and not a.dry_run:
+        with metrics.stage("backup"):
+            n_all = len(files)
+            files = write_archive(Path(a.backup_archive), files, root)
+        print(f"backed up {len(files)} files to {a.backup_archive}")
+        skip = n_all - len(files)
+    else:
+        skip = 0
+    conv = bad = 0
+    with metrics.stage("convert"):
+        for p, (res, perf) in iter_converted(files, a.workers, inplace=a.inplace, backup_dir=backup, root=root,
+                                             corpus_cache=a.corpus_cache, dry_run=a.dry_run):
+            metrics.merge_file(perf)
             if res == "converted":
                 conv += 1
-            elif res == "malformed":
+            elif res in ("malformed", "error"):
                 bad += 1
             else:
                 skip += 1
-        except Exception:
-            bad += 1
     print(f"converted={conv} skipped={skip} errors={bad}")
+    metrics.counters.update(converted=conv, skipped=skip, errors=bad)
+    instrument.finish(metrics)
     sys.exit(1 if bad else 0)
 
 if __name__ == "__main__":
@@ -116,4 +196,4 @@ if __name__ == "__main__":
         sys.exit(130)
     except Exception:
         traceback.print_exc()
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)
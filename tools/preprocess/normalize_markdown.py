@@ -3,47 +3,168 @@
 Normalize Markdown body text for vocabulary mining.
 - Lowercase, ASCII fold, strip punctuation except hyphen.
 - Emits a `.norm.txt` alongside each input for inspection.
+- Bodies and their normalized text come from the shared parsed-corpus cache
+  (tools/common/corpus.py), so unchanged files are not normalized again.
+- --profile / --metrics-json report per-stage and per-file timings
+  (tools/common/instrument.py).
 
 Usage:
   python tools/preprocess/normalize_markdown.py --root data/corpus --glob "**/*.md"
+  python tools/preprocess/normalize_markdown.py --root data/corpus --shards 8 --workers 8
+
+With --workers N (N > 1) files are normalized across a process pool.
+
+With --shards N (N > 0) nothing is written beside the inputs. Instead each
+normalized body becomes one JSON line {"path", "sha256", "norm"} in one of N
+shard files under --out (shard-000.jsonl ...), chosen by a hash of the path.
+<out>/manifest.json records each file's mtime, size, content hash and shard:
+files whose stat signature or content hash is unchanged are not normalized
+again, and only shards that gained, lost or changed a file are rewritten
+(via a temp file and rename): their unchanged records are copied over, then
+each new body is appended as it is normalized. Changing N rebuilds every shard;
+shards left over from the old N are removed once the new ones are in place.
 """
 from __future__ import annotations
-import argparse, unicodedata
+import argparse, hashlib, json, sys, zlib
+from contextlib import ExitStack
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
-import re
 
-WORD = re.compile(r"[a-z0-9\-]+")
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common import instrument  # noqa: E402
+from common.corpus import DEFAULT_CACHE, shared_cache  # noqa: E402
+from common.fileio import atomic_open, atomic_write  # noqa: E402
+
+MANIFEST = "manifest.json"
+SHARD_VERSION = 1
+
+
+def beside(p: Path) -> Path:
+    return p.with_suffix(p.suffix + ".norm.txt")
+
+
+def normalize_file(p: Path, corpus_cache: str | None = None, write_beside: bool = True) -> dict:
+    """Normalize one body; write it beside p, or return it for the shard writer."""
+    with instrument.capture(p) as cap:
+        norm = shared_cache(corpus_cache).normalized_body(p)
+        if write_beside:
+            beside(p).write_text(norm, encoding="utf-8")
+    r = {"path": str(p), "perf": cap.perf}
+    if not write_beside:
+        r["norm"] = norm
+    return r
+
+
+def iter_normalized(files: list[Path], workers: int = 1, corpus_cache: str | None = None,
+                    write_beside: bool = True):
+    """Yield normalize_file results in input order, optionally across a process pool."""
+    fn = partial(normalize_file, corpus_cache=corpus_cache, write_beside=write_beside)
+    if workers <= 1 or len(files) < 2:
+        yield from map(fn, files)
+        return
+    chunk = max(1, len(files) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        yield from ex.map(fn, files, chunksize=chunk)
+
+
+def shard_of(path: str, shards: int) -> int:
+    return zlib.crc32(path.encode("utf-8")) % shards
+
+
+def shard_path(out: Path, s: int) -> Path:
+    return out / f"shard-{s:03d}.jsonl"
+
+
+def load_manifest(out: Path, shards: int) -> dict:
+    """Return {path: entry}, or {} if missing, corrupt or written for another shard count."""
+    try:
+        data = json.loads((out / MANIFEST).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    if data.get("version") != SHARD_VERSION or data.get("shards") != shards:
+        return {}
+    return data.get("files", {})
 
 
-def normalize_text(t: str) -> str:
-    t = unicodedata.normalize("NFKD", t).encode("ascii", "ignore").decode("ascii")
-    t = t.lower()
-    # keep words only; join with space
-    return " ".join(WORD.findall(t))
+def normalize_sharded(files: list[Path], out: Path, shards: int, workers: int = 1,
+                      corpus_cache: str | None = None, metrics=None) -> dict:
+    """Normalize changed files into JSONL shards; return run stats."""
+    out.mkdir(parents=True, exist_ok=True)
+    old = load_manifest(out, shards)
+    entries, todo = {}, []
+    for p in files:
+        key, st = str(p), p.stat()
+        sig = [st.st_mtime_ns, st.st_size]
+        e = old.get(key)
+        if e and e["sig"] == sig:
+            entries[key] = e
+            continue
+        digest = hashlib.sha256(p.read_bytes()).hexdigest()
+        if e and e["sha256"] == digest:
+            entries[key] = dict(e, sig=sig)
+            continue
+        entries[key] = {"sig": sig, "sha256": digest, "shard": shard_of(key, shards)}
+        todo.append(p)
+    deleted = set(old) - set(entries)
+    if old:
+        dirty = {entries[str(p)]["shard"] for p in todo} | {old[k]["shard"] for k in deleted}
+    else:
+        # first run or shard count changed: rebuild all shards (stale ones go once they are in place)
+        dirty = set(range(shards))
 
+    fresh = {str(p) for p in todo}
+    with ExitStack() as stack:
+        writers = {s: stack.enter_context(atomic_open(shard_path(out, s))) for s in sorted(dirty)}
+        for s, w in writers.items():
+            if old and shard_path(out, s).exists():
+                with open(shard_path(out, s), encoding="utf-8") as f:
+                    for line in f:
+                        key = json.loads(line)["path"]
+                        if key in entries and key not in fresh:
+                            w.write(line if line.endswith("\n") else line + "\n")
+        # each body goes to its shard as the pool yields it; only the manifest entries stay in memory
+        for r in iter_normalized(todo, workers, corpus_cache, write_beside=False):
+            if metrics is not None:
+                metrics.merge_file(r["perf"])
+            e = entries[r["path"]]
+            rec = {"path": r["path"], "sha256": e["sha256"], "norm": r["norm"]}
+            writers[e["shard"]].write(json.dumps(rec, ensure_ascii=False) + "\n")
 
-def extract_body(text: str) -> str:
-    if text.startswith("---") or text.startswith("+++"):
-        fence = "---" if text.startswith("---") else "+++"
-        end = text.find("\n" + fence, len(fence))
-        if end != -1:
-            nl = text.find("\n", end + 1)
-            return text[nl+1:]
-    return text
+    manifest = {"version": SHARD_VERSION, "shards": shards, "files": entries}
+    atomic_write(out / MANIFEST, json.dumps(manifest))
+    if not old:
+        current = {shard_path(out, s) for s in range(shards)}
+        for f in out.glob("shard-*.jsonl"):
+            if f not in current:
+                f.unlink()
+    return {"normalized": len(todo), "unchanged": len(files) - len(todo),
+            "deleted": len(deleted), "shards_written": len(dirty)}
 
 
-def main():
+def main(argv=None):
     ap = argparse.ArgumentParser()
     ap.add_argument("--root", default="data/corpus")
     ap.add_argument("--glob", default="**/*.md")
-    a = ap.parse_args()
-    for p in Path(a.root).glob(a.glob):
-        txt = p.read_text(encoding="utf-8", errors="ignore")
-        body = extract_body(txt)
-        norm = normalize_text(body)
-        out = p.with_suffix(p.suffix + ".norm.txt")
-        out.write_text(norm, encoding="utf-8")
-        print("normalized:", out)
+    ap.add_argument("--corpus-cache", default=DEFAULT_CACHE, help="Parsed-corpus cache (SQLite); '' = in-memory")
+    ap.add_argument("--workers", type=int, default=1, help="Process pool size (1 = serial)")
+    ap.add_argument("--shards", type=int, default=0, help="Write N JSONL shards under --out instead of .norm.txt files")
+    ap.add_argument("--out", default="outputs/normalized", help="Shard directory for --shards")
+    instrument.add_arguments(ap)
+    a = ap.parse_args(argv)
+    metrics = instrument.from_args(a, "normalize_markdown")
+    files = list(Path(a.root).glob(a.glob))
+    with metrics.stage("normalize"):
+        if a.shards > 0:
+            stats = normalize_sharded(files, Path(a.out), a.shards, a.workers, a.corpus_cache, metrics)
+            print("normalized={normalized} unchanged={unchanged} deleted={deleted} "
+                  "shards_written={shards_written}".format(**stats), "->", a.out)
+            metrics.counters.update(stats)
+        else:
+            for r in iter_normalized(files, a.workers, a.corpus_cache):
+                metrics.merge_file(r["perf"])
+                print("normalized:", beside(Path(r["path"])))
+    instrument.finish(metrics)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
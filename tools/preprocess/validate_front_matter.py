@@ -1,64 +1,173 @@
 #!/usr/bin/env python3
 """Validate TOML/YAML front matter for required keys.
 Usage: python tools/preprocess/validate_front_matter.py --root data/corpus --glob "**/*.md"
+       python tools/preprocess/validate_front_matter.py --only-changed --fail-fast --json outputs/validate.json
+
+Metadata comes from the shared parsed-corpus cache (tools/common/corpus.py)
+when a file is unchanged since it was cached; otherwise only the header up to
+the closing fence is read (common.corpus.read_header), never the body.
+--profile / --metrics-json report per-stage and per-file timings
+(tools/common/instrument.py).
+
+Options:
+  --workers N        validate across a process pool
+  --fail-fast        stop at the first invalid file
+  --only-changed     validate only files changed in git (working tree + index +
+                     untracked) or, outside a git checkout or with
+                     --only-changed=mtime, files modified since the last
+                     all-valid run (recorded in --state)
+  --json PATH        write {tool, generated_at, root, glob, mode, selected,
+                     checked, invalid, stopped_early,
+                     results: [{path, status, errors}]}
 """
-import argparse, sys
+import argparse, json, subprocess, sys, time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from functools import partial
 from pathlib import Path
-import yaml
-try:
-    import tomllib as tomli
-except Exception:
-    import tomli
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from common import instrument  # noqa: E402
+from common.corpus import DEFAULT_CACHE, parse_doc, read_header, shared_cache  # noqa: E402
 
 REQ_ANY = ("standards", "clauses")  # need at least one
 REQ_ALL = ("id",)
+DEFAULT_STATE = "outputs/cache/validate_front_matter.state.json"
+
+
+def check_doc(doc) -> tuple[str, str]:
+    """(status, message); status is ok, no-front or invalid."""
+    if not doc.has_front:
+        return "no-front", ""
+    if doc.error:
+        return "invalid", doc.error
+    meta = doc.meta
+    missing_all = [k for k in REQ_ALL if k not in meta]
+    has_any = any(meta.get(k) for k in REQ_ANY)
+    if missing_all or not has_any:
+        return "invalid", f"missing: {missing_all} needs one of: {REQ_ANY}"
+    return "ok", ""
+
+
+def validate_path(p: Path, corpus_cache: str | None = None) -> dict:
+    with instrument.capture(p) as cap:
+        doc = shared_cache(corpus_cache).peek(p) if corpus_cache is not None else None
+        if doc is None:
+            doc = parse_doc(p, read_header(p))
+        status, message = check_doc(doc)
+    return {"path": str(p), "status": status, "message": message, "perf": cap.perf}
 
 
-def split_front(text: str):
-    if text.startswith("---"):
-        end = text.find("\n---", 3)
-        if end != -1:
-            body_start = text.find("\n", end + 4)
-            return ("yaml", text[4:end])
-    if text.startswith("+++"):
-        end = text.find("\n+++", 3)
-        if end != -1:
-            body_start = text.find("\n", end + 4)
-            return ("toml", text[4:end])
-    return (None, None)
+def iter_validated(files: list[Path], workers: int = 1, corpus_cache: str | None = None):
+    """Yield results in input order; closing the generator cancels pending work."""
+    fn = partial(validate_path, corpus_cache=corpus_cache)
+    if workers <= 1 or len(files) < 2:
+        yield from map(fn, files)
+        return
+    chunk = max(1, min(64, len(files) // (workers * 4)))
+    ex = ProcessPoolExecutor(max_workers=workers)
+    try:
+        yield from ex.map(fn, files, chunksize=chunk)
+    finally:
+        ex.shutdown(cancel_futures=True)
 
 
-def parse(kind, front):
-    if kind == "yaml":
-        return yaml.safe_load(front) or {}
-    if kind == "toml":
-        return tomli.loads(front) or {}
-    return {}
+def git_changed(root: Path) -> set[Path] | None:
+    """Resolved paths changed vs HEAD (staged, unstaged, untracked), or None outside git."""
+    def git(*args):
+        return subprocess.run(["git", "-C", str(root), *args], capture_output=True, text=True, check=True).stdout
+    try:
+        top = Path(git("rev-parse", "--show-toplevel").strip())
+        names = git("diff", "--name-only", "HEAD", "--").splitlines()
+        names += git("ls-files", "--others", "--exclude-standard", "--full-name").splitlines()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return {(top / n).resolve() for n in names if n}
 
 
-def main():
+def load_state(path: Path) -> dict:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def select_changed(files: list[Path], root: Path, mode: str, state: dict) -> tuple[list[Path], str]:
+    if mode in ("auto", "git"):
+        changed = git_changed(root)
+        if changed is not None:
+            return [p for p in files if p.resolve() in changed], "git"
+        if mode == "git":
+            raise SystemExit(f"--only-changed=git: {root} is not inside a git checkout")
+    since = state.get("last_ok_ns", 0)
+    return [p for p in files if p.stat().st_mtime_ns > since], "mtime"
+
+
+def main(argv=None):
     ap = argparse.ArgumentParser()
     ap.add_argument("--root", default="data/corpus")
     ap.add_argument("--glob", default="**/*.md")
-    a = ap.parse_args()
-
-    bad = 0
-    for p in Path(a.root).glob(a.glob):
-        kind, front = split_front(p.read_text(encoding="utf-8", errors="ignore"))
-        if not kind:
-            print("[NO-FRONT]", p)
-            bad += 1
-            continue
-        meta = parse(kind, front or "")
-        missing_all = [k for k in REQ_ALL if k not in meta]
-        has_any = any(meta.get(k) for k in REQ_ANY)
-        if missing_all or not has_any:
-            print("[INVALID]", p, "missing:", missing_all, "needs one of:", REQ_ANY)
-            bad += 1
+    ap.add_argument("--corpus-cache", default=DEFAULT_CACHE, help="Parsed-corpus cache (SQLite); '' = in-memory")
+    ap.add_argument("--workers", type=int, default=1, help="Process pool size (1 = serial)")
+    ap.add_argument("--fail-fast", action="store_true", help="Stop at the first invalid file")
+    ap.add_argument("--only-changed", nargs="?", const="auto", choices=["auto", "git", "mtime"], default=None,
+                    help="Validate only changed files (git, or mtime since the last all-valid run)")
+    ap.add_argument("--state", default=DEFAULT_STATE, help="Last-run state for --only-changed=mtime")
+    ap.add_argument("--json", default=None, help="Write results as JSON")
+    instrument.add_arguments(ap)
+    a = ap.parse_args(argv)
+
+    metrics = instrument.from_args(a, "validate_front_matter")
+    started_ns = time.time_ns()
+    root = Path(a.root)
+    with metrics.stage("discover"):
+        files = list(root.glob(a.glob))
+        mode = "all"
+        state = load_state(Path(a.state))
+        if a.only_changed:
+            files, mode = select_changed(files, root, a.only_changed, state)
+    corpus_cache = a.corpus_cache if a.corpus_cache else None
+
+    results, bad = [], 0
+    with metrics.stage("validate"):
+        it = iter_validated(files, a.workers, corpus_cache)
+        for r in it:
+            metrics.merge_file(r.pop("perf"))
+            results.append(r)
+            if r["status"] == "no-front":
+                print("[NO-FRONT]", r["path"])
+            elif r["status"] == "invalid":
+                print("[INVALID]", r["path"], r["message"])
+            if r["status"] != "ok":
+                bad += 1
+                if a.fail_fast:
+                    it.close()
+                    break
+    metrics.counters.update(checked=len(results), invalid=bad)
+
+    if a.json:
+        doc = {
+            "tool": "validate_front_matter",
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "root": str(root), "glob": a.glob, "mode": mode,
+            "selected": len(files), "checked": len(results), "invalid": bad,
+            "stopped_early": len(results) < len(files),
+            "results": [{"path": r["path"], "status": r["status"],
+                         "errors": [r["message"]] if r["message"] else []} for r in results],
+        }
+        Path(a.json).parent.mkdir(parents=True, exist_ok=True)
+        Path(a.json).write_text(json.dumps(doc, indent=1), encoding="utf-8")
+    if not bad:
+        # only an all-valid run moves the mtime baseline, so broken files keep being re-checked
+        Path(a.state).parent.mkdir(parents=True, exist_ok=True)
+        Path(a.state).write_text(json.dumps({"last_ok_ns": started_ns}), encoding="utf-8")
+    instrument.finish(metrics)
     if bad:
         print(f"Invalid files: {bad}")
         sys.exit(1)
+    if mode != "all":
+        print(f"Checked {len(results)} changed files ({mode}).")
     print("All files valid.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
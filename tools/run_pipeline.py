@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Run the tools/ stages as one dependency-ordered pipeline in a single process.
+
+Stages (in order):
+  convert    preprocess/convert_yaml_to_toml.py  (YAML -> TOML front matter, in place)
+  normalize  preprocess/normalize_markdown.py    (.norm.txt beside each input)
+  vocab      analyze/build_vocab.py              (outputs/vocab)
+  synonyms   analyze/cluster_synonyms.py         (outputs/vocab/synonyms.csv, if enabled)
+  report     export/generate_reports.py          (outputs/reports/REPORT.md)
+  chunks     export/export_chunks.py             (outputs/chunks: vector_chunks bulk load + embeddings)
+
+Each stage's main() is called in-process with the same argv the README shows,
+so pandas/yaml are imported once. All stages share one parsed-corpus cache
+that keeps documents in memory, so a file is read and parsed at most once per
+run.
+
+Make-style skipping: a stage's fingerprint covers its arguments, the config
+file, the stat signatures of its input files and the stages it depends on.
+If the fingerprint matches the last successful run (outputs/.pipeline_state.json)
+and its outputs exist, the stage is skipped. A per-stage timing summary is
+printed at the end.
+
+With --profile [DIR] each stage writes its own cProfile dumps into DIR, and
+--metrics-json PATH writes the pipeline timings together with every stage's
+own metrics (files/sec, bytes read, parse time, slowest files) under
+"children"; neither flag affects the fingerprints.
+
+Usage:
+  python tools/run_pipeline.py                       # normalize .. chunks
+  python tools/run_pipeline.py --from convert        # include in-place conversion
+  python tools/run_pipeline.py --from vocab --to vocab --force
+"""
+from __future__ import annotations
+import argparse, hashlib, importlib, json, os, sys, time
+from pathlib import Path
+
+TOOLS = Path(__file__).resolve().parent
+sys.path.insert(0, str(TOOLS))
+from common import instrument  # noqa: E402
+from common.corpus import DEFAULT_CACHE, shared_cache  # noqa: E402
+
+STAGES = ["convert", "normalize", "vocab", "synonyms", "report", "chunks"]
+MODULES = {
+    "convert": "preprocess/convert_yaml_to_toml.py",
+    "normalize": "preprocess/normalize_markdown.py",
+    "vocab": "analyze/build_vocab.py",
+    "synonyms": "analyze/cluster_synonyms.py",
+    "report": "export/generate_reports.py",
+    "chunks": "export/export_chunks.py",
+}
+DEPENDS = {"convert": [], "normalize": ["convert"], "vocab": ["convert"],
+           "synonyms": ["vocab"], "report": ["vocab", "synonyms"], "chunks": ["convert"]}
+STATE_FILE = ".pipeline_state.json"
+
+
+def load_stage(name: str):
+    rel = Path(MODULES[name])
+    sys.path.insert(0, str(TOOLS / rel.parent))
+    return importlib.import_module(rel.stem)
+
+
+def stage_plan(a) -> dict:
+    """argv, input globs (root, pattern) and expected outputs per stage."""
+    vocab, reports, chunks = Path(a.outputs) / "vocab", Path(a.outputs) / "reports", Path(a.outputs) / "chunks"
+    corpus = [(a.root, a.glob)]
+    common = ["--root", a.root, "--glob", a.glob, "--corpus-cache", a.corpus_cache]
+    return {
+        "convert": (common + ["--inplace", "--backup-dir", a.backup_dir, "--workers", str(a.workers)], corpus, []),
+        "normalize": (common + ["--workers", str(a.workers)], corpus, []),
+        "vocab": (common + ["--out", str(vocab), "--config", a.config, "--workers", str(a.workers)],
+                  corpus, [vocab / "terms.csv", vocab / "overlap_jaccard.csv"]),
+        "synonyms": (["--in", str(vocab), "--out", str(vocab), "--config", a.config],
+                     [(str(vocab), "*.csv")], []),
+        "report": (["--in", str(vocab), "--out", str(reports)],
+                   [(str(vocab), "*.csv"), (str(vocab), "*.parquet")], [reports / "REPORT.md"]),
+        "chunks": (common + ["--templates", a.templates, "--out", str(chunks)],
+                   corpus + ([(a.templates, "**/*.md")] if a.templates else []), [chunks / "manifest.json"]),
+    }
+
+
+def fingerprint(argv: list[str], inputs, config: Path, upstream: list[str]) -> str:
+    h = hashlib.sha256()
+    h.update(json.dumps(argv).encode())
+    h.update(config.read_bytes() if config.exists() else b"")
+    for root, pattern in inputs:
+        for p in sorted(Path(root).glob(pattern)):
+            if p.name == "synonyms.csv":  # output of a downstream-facing stage, not an input
+                continue
+            st = p.stat()
+            h.update(f"{p}\0{st.st_mtime_ns}\0{st.st_size}\n".encode())
+    for u in upstream:
+        h.update(u.encode())
+    return h.hexdigest()
+
+
+def instrument_argv(a, name: str) -> list[str]:
+    """--profile/--metrics-json flags forwarded to a stage (not fingerprinted)."""
+    extra = []
+    if a.profile:
+        extra += ["--profile", a.profile]
+    if a.metrics_json:
+        extra += ["--metrics-json", str(stage_metrics_path(a.metrics_json, name)), "--slowest", str(a.slowest)]
+    return extra
+
+
+def stage_metrics_path(path: str, name: str) -> Path:
+    p = Path(path)
+    return p.with_name(f"{p.stem}.{name}{p.suffix}")
+
+
+def run_stage(name: str, argv: list[str]) -> None:
+    try:
+        load_stage(name).main(argv)
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            raise RuntimeError(f"stage {name} exited with {e.code}") from None
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--root", default="data/corpus")
+    ap.add_argument("--glob", default="**/*.md")
+    ap.add_argument("--templates", default="ai-backend/templates/standards", help="Standards templates to chunk")
+    ap.add_argument("--outputs", default="outputs")
+    ap.add_argument("--config", default=str(TOOLS / "config" / "config.toml"))
+    ap.add_argument("--corpus-cache", default=DEFAULT_CACHE)
+    ap.add_argument("--backup-dir", default="backups/frontmatter")
+    ap.add_argument("--workers", type=int, default=1)
+    ap.add_argument("--from", dest="start", choices=STAGES, default="normalize")
+    ap.add_argument("--to", dest="stop", choices=STAGES, default="chunks")
+    ap.add_argument("--force", action="store_true", help="Run selected stages even if up to date")
+    instrument.add_arguments(ap)
+    a = ap.parse_args(argv)
+
+    selected = STAGES[STAGES.index(a.start):STAGES.index(a.stop) + 1]
+    if not selected:
+        ap.error("--from must not come after --to")
+    state_path = Path(a.outputs) / STATE_FILE
+    try:
+        state = json.loads(state_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        state = {}
+    if a.workers == 1:
+        # stages run in-process and share parsed documents; with --workers N the
+        # parent stays free of an open connection before the stages fork pools
+        shared_cache(a.corpus_cache, keep_docs=True)
+    plan = stage_plan(a)
+    # stages profile themselves; the pipeline only records their wall time
+    metrics = instrument.Metrics("run_pipeline")
+    metrics.metrics_json = a.metrics_json
+
+    timings, failed = [], None
+    for name in selected:
+        argv_s, inputs, outputs = plan[name]
+        upstream = [state.get(d, "") for d in DEPENDS[name]]
+        fp = fingerprint(argv_s, inputs, Path(a.config), upstream)
+        if not a.force and state.get(name) == fp and all(o.exists() for o in outputs):
+            timings.append((name, "skipped", 0.0))
+            continue
+        print(f"== {name}")
+        child = stage_metrics_path(a.metrics_json, name) if a.metrics_json else None
+        if child is not None:
+            child.unlink(missing_ok=True)
+        t0 = time.perf_counter()
+        try:
+            with metrics.stage(name):
+                run_stage(name, argv_s + instrument_argv(a, name))
+        except Exception as e:
+            timings.append((name, "failed", time.perf_counter() - t0))
+            failed = e
+            break
+        timings.append((name, "ran", time.perf_counter() - t0))
+        if child is not None and child.exists():
+            metrics.children[name] = json.loads(child.read_text(encoding="utf-8"))
+        # fingerprint after the run: convert rewrites its own inputs
+        state[name] = fingerprint(argv_s, inputs, Path(a.config), upstream)
+        state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = state_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(state, indent=2), encoding="utf-8")
+        os.replace(tmp, state_path)
+
+    print("\nstage       status    seconds")
+    for name, status, secs in timings:
+        print(f"{name:<11} {status:<9} {secs:8.2f}")
+    print(f"{'total':<11} {'':<9} {sum(t for _, _, t in timings):8.2f}")
+    metrics.counters.update({status: sum(1 for _, s, _ in timings if s == status)
+                             for status in ("ran", "skipped", "failed")})
+    instrument.finish(metrics)
+    if failed is not None:
+        print(f"error: {failed}", file=sys.stderr)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()